@@ -0,0 +1,5 @@
+"""
+Benchmarks for repo_helper_pycharm.
+
+Run with ``python -m benchmarks``.
+"""
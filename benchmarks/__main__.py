@@ -0,0 +1,242 @@
+"""
+Run the benchmarks and write the results as JSON.
+
+.. code-block:: bash
+
+	python -m benchmarks --output bench.json
+	python -m benchmarks --quick
+
+Each benchmark runs against a fresh synthetic project in a temporary directory.
+On Linux the user's cache directory is replaced with a temporary one for the duration of the run.
+"""
+
+# stdlib
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from io import StringIO
+from typing import Any, Callable, Dict, Iterator, List, Sequence
+
+# 3rd party
+from domdf_python_tools.paths import PathPlus
+
+# this package
+from benchmarks.project import make_project, make_schema_mappings
+
+Timings = Dict[str, List[float]]
+
+
+def summarise(timings: Timings) -> Dict[str, Dict[str, float]]:
+	"""
+	Returns the minimum, median and maximum of each phase's timings, in seconds.
+
+	:param timings:
+	"""
+
+	return {
+			phase: {"min": min(times), "median": statistics.median(times), "max": max(times)}
+			for phase, times in timings.items()
+			}
+
+
+def timed(timings: Timings, phase: str, function: Callable[[], Any]) -> Any:
+	"""
+	Call ``function`` and record how long it took.
+
+	:param timings:
+	:param phase: The name to record the time under.
+	:param function:
+	"""
+
+	start = time.perf_counter()
+	result = function()
+	timings.setdefault(phase, []).append(time.perf_counter() - start)
+	return result
+
+
+def fresh_project(tmpdir: PathPlus, **kwargs: int) -> Iterator[PathPlus]:
+	"""
+	Yields a newly generated project each time it is iterated.
+
+	:param tmpdir:
+	:param kwargs: Passed to :func:`~benchmarks.project.make_project`.
+	"""
+
+	idx = 0
+	while True:
+		idx += 1
+		yield make_project(tmpdir / f"project_{idx}", **kwargs)
+
+
+def bench_iml_manager(tmpdir: PathPlus, repeat: int, **kwargs: int) -> Timings:
+	"""
+	Time each phase of :meth:`ImlManager.run <repo_helper_pycharm.iml_manager.ImlManager.run>`,
+	as recorded by :func:`repo_helper_pycharm.profiling.profiling`.
+
+	Phases run concurrently for each module file are counted in full, so may add up to more than the total.
+
+	:param tmpdir:
+	:param repeat:
+	:param kwargs: Passed to :func:`~benchmarks.project.make_project`.
+	"""  # noqa: D400
+
+	# this package
+	from repo_helper_pycharm.iml_manager import ImlManager
+	from repo_helper_pycharm.profiling import profiling
+
+	timings: Timings = {}
+	projects = fresh_project(tmpdir, **kwargs)
+
+	for _ in range(repeat):
+		repo_dir = next(projects)
+
+		with redirect_stdout(StringIO()), profiling(report=False) as profiler:
+			ImlManager(repo_dir).run(show_diff=True)
+
+		for name, seconds in profiler.timings.items():
+			timings.setdefault(name, []).append(seconds)
+		timings.setdefault("total", []).append(profiler.elapsed or 0.0)
+
+		# Running again on the updated project makes no changes.
+		timed(timings, "total_unchanged", lambda: ImlManager(repo_dir).run())
+
+	return timings
+
+
+def bench_register_schema(tmpdir: PathPlus, repeat: int, existing_entries: int) -> Timings:
+	"""
+	Time :func:`~repo_helper_pycharm.register_schema.register_schema`.
+
+	:param tmpdir:
+	:param repeat:
+	:param existing_entries: The number of entries in an existing ``jsonSchemas.xml`` file,
+		or ``-1`` for the file not to exist.
+	"""
+
+	# this package
+	from repo_helper_pycharm.register_schema import register_schema
+
+	timings: Timings = {}
+	projects = fresh_project(tmpdir, excludes=0, components=0)
+
+	with redirect_stdout(StringIO()):
+		# The first call generates the schema itself.
+		timed(timings, "first_call", lambda: register_schema(next(projects)))
+
+		for _ in range(repeat):
+			repo_dir = next(projects)
+			if existing_entries >= 0:
+				make_schema_mappings(repo_dir, existing_entries)
+
+			timed(timings, "register", lambda: register_schema(repo_dir))
+			timed(timings, "register_unchanged", lambda: register_schema(repo_dir))
+
+	return timings
+
+
+def bench_cli(tmpdir: PathPlus, repeat: int, args: Sequence[str]) -> Timings:
+	"""
+	Time running a ``pycharm`` subcommand in a new interpreter.
+
+	The command is run once before timing starts, so the project has already been configured.
+
+	:param tmpdir:
+	:param repeat:
+	:param args: The arguments to the ``pycharm`` command.
+	"""
+
+	# this package
+	import repo_helper_pycharm
+
+	timings: Timings = {}
+	repo_dir = make_project(tmpdir)
+	code = f"from repo_helper_pycharm import pycharm; pycharm({list(args)!r}, prog_name='pycharm')"
+
+	# Ensure the interpreter imports the same copy of the package as this one.
+	env = dict(os.environ)
+	source_dir = os.path.dirname(os.path.dirname(os.path.abspath(repo_helper_pycharm.__file__)))
+	env["PYTHONPATH"] = os.pathsep.join(filter(None, [source_dir, env.get("PYTHONPATH")]))
+
+	def run() -> int:
+		command = [sys.executable, "-c", code]
+		return subprocess.run(command, cwd=repo_dir, env=env, stdout=subprocess.DEVNULL, check=False).returncode
+
+	if run() not in {0, 1}:
+		raise RuntimeError(f"'pycharm {' '.join(args)}' failed")
+
+	for _ in range(repeat):
+		timed(timings, "startup", run)
+
+	return timings
+
+
+def main(argv: Sequence[str] = ()) -> int:  # noqa: D103
+	parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__.strip().splitlines()[0])
+	parser.add_argument("-o", "--output", default=None, help="The file to write the results to. Defaults to stdout.")
+	parser.add_argument("-r", "--repeat", type=int, default=5, help="The number of times to run each benchmark.")
+	parser.add_argument("--quick", action="store_true", help="Skip the largest projects.")
+	args = parser.parse_args(argv or None)
+
+	# this package
+	from repo_helper_pycharm import __version__
+
+	results = []
+
+	def record(name: str, params: Dict[str, Any], timings: Timings) -> None:
+		times = timings.get("total", next(iter(timings.values())))
+		print(f"{name} {params}: {statistics.median(times):.6f}s", file=sys.stderr)
+		results.append({"name": name, "params": params, "phases": summarise(timings)})
+
+	with tempfile.TemporaryDirectory() as tmp:
+		tmpdir = PathPlus(tmp)
+		os.environ["XDG_CACHE_HOME"] = str(tmpdir / "cache")
+
+		sizes: List[Dict[str, int]] = [
+				{"excludes": 10, "components": 10, "modules": 1},
+				{"excludes": 1000, "components": 10, "modules": 1},
+				{"excludes": 10, "components": 1000, "modules": 1},
+				{"excludes": 10, "components": 10, "modules": 50},
+				]
+		if not args.quick:
+			sizes.append({"excludes": 50000, "components": 10, "modules": 1})
+
+		for idx, params in enumerate(sizes):
+			record("iml_manager", params, bench_iml_manager(tmpdir / f"iml_{idx}", args.repeat, **params))
+
+		for existing_entries in (-1, 0, 500):
+			params = {"existing_entries": existing_entries}
+			timings = bench_register_schema(tmpdir / f"schema_{existing_entries}", args.repeat, existing_entries)
+			record("register_schema", params, timings)
+
+		for cli_args in (["--help"], ["configure", "--no-cache"], ["configure"]):
+			timings = bench_cli(tmpdir / f"cli_{'_'.join(cli_args)}", args.repeat, cli_args)
+			record("cli", {"args": cli_args}, timings)
+
+	output = {
+			"version": __version__,
+			"python": platform.python_version(),
+			"implementation": platform.python_implementation(),
+			"platform": platform.platform(),
+			"date": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+			"repeat": args.repeat,
+			"results": results,
+			}
+
+	if args.output:
+		PathPlus(args.output).write_clean(json.dumps(output, indent=2))
+	else:
+		print(json.dumps(output, indent=2))
+
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
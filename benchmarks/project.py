@@ -0,0 +1,151 @@
+"""
+Generate synthetic PyCharm projects for benchmarking.
+"""
+
+# stdlib
+from typing import List
+
+# 3rd party
+from domdf_python_tools.paths import PathPlus
+
+__all__ = ("repo_helper_yml", "make_module", "make_project", "make_schema_mappings")
+
+repo_helper_yml = """\
+modname: benchmark_project
+copyright_years: "2020"
+author: "Joe Bloggs"
+email: "joe@example.com"
+username: "joebloggs"
+version: "0.1.0"
+license: "MIT"
+short_desc: "A synthetic project for benchmarking."
+"""
+
+
+def make_module(excludes: int = 10, components: int = 10) -> str:
+	"""
+	Returns the content of a synthetic ``*.iml`` module file.
+
+	:param excludes: The number of ``excludeFolder`` elements.
+	:param components: The number of unrelated components, each with a few options.
+	"""
+
+	lines: List[str] = [
+			'<?xml version="1.0" encoding="UTF-8"?>',
+			'<module type="PYTHON_MODULE" version="4">',
+			'  <component name="NewModuleRootManager">',
+			'    <content url="file://$MODULE_DIR$">',
+			]
+
+	for idx in range(excludes):
+		lines.append(f'      <excludeFolder url="file://$MODULE_DIR$/excluded/dir_{idx:06d}" />')
+
+	lines.extend([
+			"    </content>",
+			'    <orderEntry type="inheritedJdk" />',
+			'    <orderEntry type="sourceFolder" forTests="false" />',
+			"  </component>",
+			])
+
+	for idx in range(components):
+		lines.extend([
+				f'  <component name="SyntheticComponent{idx:06d}">',
+				f'    <option name="first" value="{idx}" />',
+				'    <option name="second" value="some text &amp; an entity" />',
+				"    <list>",
+				'      <item value="a" />',
+				'      <item value="b" />',
+				"    </list>",
+				"  </component>",
+				])
+
+	lines.extend([
+			'  <component name="PyDocumentationSettings">',
+			'    <option name="format" value="PLAIN" />',
+			'    <option name="myDocStringFormat" value="Plain" />',
+			"  </component>",
+			'  <component name="TestRunnerService">',
+			'    <option name="PROJECT_TEST_RUNNER" value="nose" />',
+			"  </component>",
+			"</module>",
+			])
+
+	return '\n'.join(lines) + '\n'
+
+
+def make_project(
+		repo_dir: PathPlus,
+		excludes: int = 10,
+		components: int = 10,
+		modules: int = 1,
+		) -> PathPlus:
+	"""
+	Create a synthetic PyCharm project.
+
+	:param repo_dir: The directory to create the project in.
+	:param excludes: The number of ``excludeFolder`` elements in each module.
+	:param components: The number of unrelated components in each module.
+	:param modules: The number of modules.
+
+	:returns: The project directory.
+	"""
+
+	idea_dir = repo_dir / ".idea"
+	idea_dir.maybe_make(parents=True)
+	(repo_dir / "repo_helper.yml").write_text(repo_helper_yml)
+
+	module_content = make_module(excludes, components)
+	module_lines = []
+
+	for idx in range(modules):
+		name = f"module_{idx:04d}.iml"
+		(idea_dir / name).write_text(module_content)
+		module_lines.append(
+				f'      <module fileurl="file://$PROJECT_DIR$/.idea/{name}" filepath="$PROJECT_DIR$/.idea/{name}" />'
+				)
+
+	(idea_dir / "modules.xml").write_lines([
+			'<?xml version="1.0" encoding="UTF-8"?>',
+			'<project version="4">',
+			'  <component name="ProjectModuleManager">',
+			"    <modules>",
+			*module_lines,
+			"    </modules>",
+			"  </component>",
+			"</project>",
+			])
+
+	return repo_dir
+
+
+def make_schema_mappings(repo_dir: PathPlus, entries: int = 100) -> None:
+	"""
+	Write a ``.idea/jsonSchemas.xml`` file with unrelated schema mappings.
+
+	:param repo_dir: The project directory.
+	:param entries: The number of mappings.
+	"""
+
+	lines = [
+			'<?xml version="1.0" encoding="UTF-8"?>',
+			'<project version="4">',
+			'  <component name="JsonSchemaMappingsProjectConfiguration">',
+			"    <state>",
+			"      <map>",
+			]
+
+	for idx in range(entries):
+		lines.extend([
+				f'        <entry key="schema_{idx:04d}">',
+				"          <value>",
+				"            <SchemaInfo>",
+				f'              <option name="name" value="schema_{idx:04d}" />',
+				f'              <option name="relativePathToSchema" value="schemas/schema_{idx:04d}.json" />',
+				"            </SchemaInfo>",
+				"          </value>",
+				"        </entry>",
+				])
+
+	lines.extend(["      </map>", "    </state>", "  </component>", "</project>"])
+
+	(repo_dir / ".idea" / "jsonSchemas.xml").write_lines(lines)
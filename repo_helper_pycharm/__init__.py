@@ -27,12 +27,14 @@ repo_helper extension to manage PyCharm's configuration.
 #
 
 # stdlib
-from functools import partial, reduce
+import importlib
+from typing import TYPE_CHECKING, Any
 
-# 3rd party
-import click  # type: ignore[import-untyped]
-from consolekit import CONTEXT_SETTINGS
-from repo_helper.cli import cli_group
+if TYPE_CHECKING:
+	# this package
+	from repo_helper_pycharm.batch import configure_many
+	from repo_helper_pycharm.cli import pycharm
+	from repo_helper_pycharm.commands import configure, docs_command, schema, watch
 
 __author__: str = "Dominic Davis-Foster"
 __copyright__: str = "2020 Dominic Davis-Foster"
@@ -40,99 +42,22 @@ __license__: str = "MIT License"
 __version__: str = "0.3.1"
 __email__: str = "dominic@davis-foster.co.uk"
 
-__all__ = ("configure", "pycharm", "schema", "docs_command")
-
-
-@cli_group()
-def pycharm() -> None:
-	"""
-	Manage PyCharm config.
-	"""
-
-
-pycharm_command = partial(pycharm.command, context_settings=CONTEXT_SETTINGS)
-
-
-@pycharm_command()
-def schema() -> None:
-	"""
-	Register the schema mapping for 'repo_helper.yml' with PyCharm.
-	"""
-
-	# 3rd party
-	from consolekit.utils import abort
-	from domdf_python_tools.paths import PathPlus
-
-	# this package
-	from repo_helper_pycharm.register_schema import register_schema
-
-	try:
-		register_schema(PathPlus.cwd())
-	except FileNotFoundError as e:
-		raise abort(str(e))
-
-
-@click.option("--diff", is_flag=True, default=False, help="Show a diff if changes are made.")
-@pycharm_command()
-def configure(diff: bool = False) -> None:
-	"""
-	Set the basic configuration for PyCharm.
-	"""
-
-	# stdlib
-	import sys
-
-	# 3rd party
-	from consolekit.utils import abort
-	from domdf_python_tools.paths import PathPlus
-
-	# this package
-	from repo_helper_pycharm.iml_manager import ImlManager
-
-	try:
-		iml_manager = ImlManager(PathPlus.cwd())
-	except FileNotFoundError as e:
-		raise abort(str(e))
-
-	sys.exit(iml_manager.run(diff))
-
-
-@pycharm_command()
-def docs_command() -> None:
-	"""
-	Open the documentation using PyCharm's built-in web server.
-	"""
-
-	# stdlib
-	import operator
-
-	# 3rd party
-	from apeye import URL
-	from consolekit.utils import abort
-	from domdf_python_tools.paths import PathPlus
-	from repo_helper.core import RepoHelper
-
-	# this package
-	from repo_helper_pycharm.docs import get_docs_port, open_in_browser
-
-	rh = RepoHelper(PathPlus.cwd())
-	rh.load_settings()
+__all__ = ("configure", "pycharm", "schema", "docs_command", "watch", "configure_many")
 
-	if not rh.templates.globals["enable_docs"]:
-		raise abort("The current project has no documentation!")
-	else:  # pragma: no cover
-		url = reduce(
-				operator.truediv,
-				[
-						URL(f"http://localhost:{get_docs_port()}"),
-						rh.target_repo.name,
-						rh.templates.globals["docs_dir"],
-						"build",
-						"html",
-						]
-				)
+# The command line interface is only imported when it is used,
+# as ``repo_helper`` loads the ``pycharm`` group on every invocation.
+_lazy_attributes = {
+		"pycharm": "repo_helper_pycharm.cli",
+		"configure": "repo_helper_pycharm.commands",
+		"schema": "repo_helper_pycharm.commands",
+		"docs_command": "repo_helper_pycharm.commands",
+		"watch": "repo_helper_pycharm.commands",
+		"configure_many": "repo_helper_pycharm.batch",
+		}
 
-		open_in_browser(url)
 
+def __getattr__(name: str) -> Any:
+	if name in _lazy_attributes:
+		return getattr(importlib.import_module(_lazy_attributes[name]), name)
 
-docs_command.name = "docs"
+	raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
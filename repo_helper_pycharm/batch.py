@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+#
+#  batch.py
+"""
+Configure many PyCharm projects at once.
+
+.. versionadded:: 0.4.0
+"""
+#
+#  Copyright © 2020 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+#  EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+#  MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+#  IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+#  DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+#  OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+#  OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+# stdlib
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Tuple
+
+# 3rd party
+from domdf_python_tools.paths import PathPlus
+from domdf_python_tools.typing import PathLike
+
+if TYPE_CHECKING:
+	# this package
+	from repo_helper_pycharm.cache import FingerprintCache
+	from repo_helper_pycharm.transforms import Transform
+
+__all__ = ("ConfigureOptions", "ConfigureResult", "configure_many")
+
+
+class ConfigureOptions(NamedTuple):
+	"""
+	Options for :func:`~.configure_many`.
+	"""
+
+	#: Whether to return a diff of the changes.
+	show_diff: bool = False
+
+	#: If given, only the transforms with these names are applied.
+	only: Tuple[str, ...] = ()
+
+	#: The names of transforms not to apply.
+	skip: Tuple[str, ...] = ()
+
+	#: Whether to rewrite the files without parsing them fully. See :meth:`.ImlManager.run_streaming`.
+	stream: bool = False
+
+	#: If given, search each repository for additional directories to exclude for up to this many seconds.
+	#: See :meth:`.ImlManager.detect_excludes`. The cache is not used in this case.
+	detect_budget: Optional[float] = None
+
+	#: Glob patterns for the names of files and directories to exclude.
+	exclude_patterns: Tuple[str, ...] = ()
+
+	#: Whether to also exclude the directories which git ignores. See :meth:`.ImlManager.add_git_ignored`.
+	#: The cache is not used in this case.
+	git_ignored: bool = False
+
+	#: Whether to also register the schema for ``repo_helper.yml``. See :func:`~.register_schema`.
+	register_schema: bool = False
+
+
+class ConfigureResult(NamedTuple):
+	"""
+	The outcome of configuring a single repository with :func:`~.configure_many`.
+	"""
+
+	#: The root of the repository.
+	repo_dir: PathPlus
+
+	#: Whether the configuration was changed, or :py:obj:`None` if configuring the repository failed.
+	changed: Optional[bool]
+
+	#: Mapping of the phases of configuring the repository to the time they took, in seconds.
+	timings: Dict[str, float]
+
+	#: The module files which were changed.
+	changed_files: Tuple[PathPlus, ...] = ()
+
+	#: The diff of the changes, if :attr:`ConfigureOptions.show_diff <.ConfigureOptions.show_diff>` is set.
+	diff: str = ''
+
+	#: The error message if configuring the repository failed.
+	error: Optional[str] = None
+
+	#: Whether the module files were skipped as they had not changed since they were last configured.
+	#: The schema mappings are still registered if :attr:`ConfigureOptions.register_schema
+	#: <.ConfigureOptions.register_schema>` is set.
+	cached: bool = False
+
+
+class _SharedState(NamedTuple):
+	# State computed once and shared by every repository. It must be picklable and never modified.
+
+	options: ConfigureOptions
+	transforms: Tuple["Transform", ...]
+	excluded_dirs: FrozenSet[str]
+	schema_file: Optional[PathPlus]
+	cache: Optional["FingerprintCache"]
+	cache_key: Tuple[str, ...]
+
+
+def _configure_one(repo_dir: PathPlus, state: _SharedState) -> ConfigureResult:
+	# this package
+	from repo_helper_pycharm.iml_manager import ImlManager
+	from repo_helper_pycharm.transaction import IdeaTransaction
+
+	options = state.options
+	timings: Dict[str, float] = {}
+	start = time.perf_counter()
+
+	def lap(name: str) -> None:
+		nonlocal start
+		now = time.perf_counter()
+		timings[name] = now - start
+		start = now
+
+	if state.cache is not None and state.cache.is_fresh(repo_dir, *state.cache_key):
+		lap("cache")
+
+		if not options.register_schema:
+			return ConfigureResult(repo_dir, False, timings, cached=True)
+
+		# The schema mappings don't depend on the files in the fingerprint,
+		# so they are compared with jsonSchemas.xml even if the module files are up to date.
+		try:
+			# this package
+			from repo_helper_pycharm.register_schema import register_schema
+
+			changed = register_schema(repo_dir, state.schema_file)
+			lap("schema")
+		except Exception as e:
+			return ConfigureResult(repo_dir, None, timings, error=f"{type(e).__name__}: {e}", cached=True)
+
+		return ConfigureResult(repo_dir, changed, timings, cached=True)
+
+	schema_changed = False
+
+	try:
+		iml_manager = ImlManager(repo_dir, excluded_dirs=state.excluded_dirs)
+		lap("load")
+
+		if options.detect_budget is not None:
+			iml_manager.detect_excludes(options.detect_budget)
+			lap("detect")
+
+		if options.git_ignored:
+			iml_manager.add_git_ignored()
+			lap("git")
+
+		iml_manager.exclude_patterns.update(options.exclude_patterns)
+
+		# The module files and the schema mappings are written together.
+		with IdeaTransaction(iml_manager.settings.target_repo / ".idea") as transaction:
+			changed_files, diff = iml_manager.update(state.transforms, options.show_diff, options.stream, transaction)
+			lap("update")
+
+			if options.register_schema:
+				# this package
+				from repo_helper_pycharm.register_schema import register_schema
+
+				schema_changed = register_schema(
+						iml_manager.settings.target_repo,
+						state.schema_file,
+						transaction=transaction,
+						)
+				lap("schema")
+
+		lap("write")
+
+	except Exception as e:
+		return ConfigureResult(repo_dir, None, timings, error=f"{type(e).__name__}: {e}")
+
+	if state.cache is not None:
+		state.cache.update(repo_dir, *state.cache_key)
+		lap("cache")
+
+	return ConfigureResult(repo_dir, bool(changed_files) or schema_changed, timings, tuple(changed_files), diff)
+
+
+def configure_many(
+		repo_dirs: Iterable[PathLike],
+		options: ConfigureOptions = ConfigureOptions(),
+		jobs: Optional[int] = None,
+		executor: Optional[Executor] = None,
+		cache: Optional["FingerprintCache"] = None,
+		) -> List[ConfigureResult]:
+	"""
+	Update the PyCharm configuration for each of the given repositories.
+
+	The transforms, the default excluded directories and the path to the schema
+	are worked out once and shared by every repository.
+	Nothing is printed, and errors are returned rather than raised.
+
+	.. versionadded:: 0.4.0
+
+	:param repo_dirs:
+	:param options:
+	:param jobs: The number of repositories to configure at once, using a pool of threads.
+		Ignored if ``executor`` is given.
+	:param executor: An executor to configure the repositories with, such as a :class:`~.ProcessPoolExecutor`.
+	:param cache: If given, repositories which have not changed since they were last configured are skipped.
+
+	:raises: :exc:`ValueError` if :attr:`~.ConfigureOptions.only` or :attr:`~.ConfigureOptions.skip`
+		name an unknown transform.
+
+	:returns: The results, in the same order as ``repo_dirs``.
+	"""
+
+	# this package
+	from repo_helper_pycharm.cache import options_fingerprint
+	from repo_helper_pycharm.iml_manager import ImlManager
+	from repo_helper_pycharm.transforms import select_transforms
+
+	schema_file = None
+	if options.register_schema:
+		# this package
+		from repo_helper_pycharm.register_schema import get_schema_file
+
+		schema_file = get_schema_file()
+
+	state = _SharedState(
+			options=options,
+			transforms=tuple(select_transforms(options.only, options.skip)),
+			excluded_dirs=frozenset(ImlManager.excluded_dirs),
+			schema_file=schema_file,
+			# The directories found depend on the whole tree, which the fingerprint doesn't cover.
+			cache=cache if options.detect_budget is None and not options.git_ignored else None,
+			cache_key=options_fingerprint(options.only, options.skip, options.stream, options.exclude_patterns),
+			)
+
+	repo_paths: List[PathPlus] = [PathPlus(repo_dir) for repo_dir in repo_dirs]
+
+	if executor is not None:
+		return [future.result() for future in [executor.submit(_configure_one, d, state) for d in repo_paths]]
+
+	if jobs == 1:
+		return [_configure_one(repo_dir, state) for repo_dir in repo_paths]
+
+	with ThreadPoolExecutor(max_workers=jobs) as thread_executor:
+		return list(thread_executor.map(_configure_one, repo_paths, [state] * len(repo_paths)))
+
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+#
+#  cache.py
+"""
+Persistent caches stored in the user's cache directory.
+
+.. versionadded:: 0.4.0
+"""
+#
+#  Copyright © 2020 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+#  EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+#  MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+#  IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+#  DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+#  OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+#  OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+# This module must not import lxml or repo_helper, as it is used to skip loading them entirely.
+
+# stdlib
+import hashlib
+import json
+import os
+import shutil
+import sys
+from functools import lru_cache
+from typing import Dict, Iterable, Optional, Tuple
+
+# 3rd party
+import platformdirs
+from domdf_python_tools.paths import PathPlus, traverse_to_file, unwanted_dirs
+from domdf_python_tools.typing import PathLike
+
+# this package
+from repo_helper_pycharm.transaction import atomic_write
+
+__all__ = ("get_cache_dir", "options_fingerprint", "FingerprintCache")
+
+
+def get_cache_dir() -> PathPlus:
+	"""
+	Returns the path to the directory where ``repo_helper_pycharm`` stores its caches.
+
+	The directory is not created if it does not exist.
+	"""
+
+	return PathPlus(platformdirs.user_cache_dir("repo_helper_pycharm"))
+
+
+def options_fingerprint(
+		only: Iterable[str] = (),
+		skip: Iterable[str] = (),
+		stream: bool = False,
+		exclude_patterns: Iterable[str] = (),
+		) -> Tuple[str, ...]:
+	"""
+	Returns the command line options which affect the outcome of ``configure``,
+	for passing as the ``extra`` argument to the methods of :class:`~.FingerprintCache`.
+
+	:param only: The names of the only transforms to apply.
+	:param skip: The names of transforms not to apply.
+	:param stream: Whether the file is rewritten in streaming mode.
+	:param exclude_patterns: Additional glob patterns of files and directories to exclude.
+	"""  # noqa: D400
+
+	options = [
+			*(f"--only={name}" for name in sorted(only)),
+			*(f"--skip={name}" for name in sorted(skip)),
+			*(f"--exclude-pattern={pattern}" for pattern in sorted(exclude_patterns)),
+			]
+
+	if stream:
+		options.append("--stream")
+
+	return tuple(options)
+
+
+def _sys_path_stamps() -> Dict[str, Optional[int]]:
+	# The modification times of the directories on sys.path, which change when distributions are added or removed.
+	# The current directory is left out, as it changes far more often than packages are installed.
+	stamps: Dict[str, Optional[int]] = {}
+
+	for entry in sys.path:
+		if entry:
+			try:
+				stamps[entry] = os.stat(entry).st_mtime_ns
+			except OSError:
+				stamps[entry] = None
+
+	return stamps
+
+
+@lru_cache()
+def _transform_entry_points() -> Tuple[str, ...]:
+	# The names and versions of the distributions providing transforms, read without importing them.
+	# Enumerating the distributions is slow, so the result is cached until one of the directories on sys.path changes.
+
+	stamps = _sys_path_stamps()
+	key = hashlib.sha1('\0'.join(stamps).encode("UTF-8")).hexdigest()  # nosec: B303
+	cache_file = get_cache_dir() / "entry-points" / f"{key}.json"
+
+	try:
+		cached = json.loads(cache_file.read_text())
+		if cached["stamps"] == stamps:
+			return tuple(cached["entry_points"])
+	except (OSError, ValueError, KeyError, TypeError):
+		pass
+
+	# 3rd party
+	from domdf_python_tools.compat import importlib_metadata
+
+	entry_points = set()
+
+	for dist in importlib_metadata.distributions():
+		for entry_point in dist.entry_points:
+			if entry_point.group == "repo_helper_pycharm.transforms":
+				entry_points.add(f"{entry_point.name}={entry_point.value} ({dist.metadata['Name']} {dist.version})")
+
+	try:
+		atomic_write(cache_file, json.dumps({"stamps": stamps, "entry_points": sorted(entry_points)}))
+	except OSError:  # pragma: no cover
+		pass
+
+	return tuple(sorted(entry_points))
+
+
+class FingerprintCache:
+	"""
+	Records the state of each repository after it was last configured,
+	so repositories which have not changed since can be skipped.
+
+	The fingerprint is a hash of the ``repo_helper.yml`` file, the project's ``*.iml`` files, the version of ``repo_helper_pycharm``, the default excluded directories,
+	and the transforms provided by third-party packages.
+
+	:param cache_dir: The directory to store the cache in. Defaults to a subdirectory of :func:`~.get_cache_dir`.
+	"""  # noqa: D400
+
+	def __init__(self, cache_dir: Optional[PathLike] = None):
+		if cache_dir is None:
+			self.cache_dir = get_cache_dir() / "fingerprints"
+		else:
+			self.cache_dir = PathPlus(cache_dir)
+
+	@staticmethod
+	def fingerprint(repo_dir: PathLike, *extra: str) -> Optional[str]:
+		r"""
+		Returns the fingerprint of the repository containing ``repo_dir``.
+
+		:param repo_dir:
+		:param \*extra: Additional strings to include in the fingerprint, such as command line options.
+
+		:returns: The fingerprint, or :py:obj:`None` if the repository is not a PyCharm project.
+		"""
+
+		# this package
+		from repo_helper_pycharm import __version__
+
+		# this package
+		from repo_helper_pycharm.modules import get_module_files
+
+		try:
+			repo_dir = traverse_to_file(PathPlus(repo_dir), "repo_helper.yml")
+		except FileNotFoundError:
+			return None
+
+		module_files = get_module_files(repo_dir)
+		if not module_files:
+			return None
+
+		sha = hashlib.sha256()
+		sha.update((repo_dir / "repo_helper.yml").read_bytes())
+
+		for module_file in module_files:
+			sha.update(b'\0')
+			sha.update(module_file.as_posix().encode("UTF-8"))
+			sha.update(b'\0')
+			sha.update(module_file.read_bytes())
+
+		for part in (__version__, *sorted(unwanted_dirs), *_transform_entry_points(), *extra):
+			sha.update(b'\0')
+			sha.update(part.encode("UTF-8"))
+
+		return sha.hexdigest()
+
+	def _entry_for(self, repo_dir: PathLike) -> PathPlus:
+		try:
+			repo_dir = traverse_to_file(PathPlus(repo_dir), "repo_helper.yml")
+		except FileNotFoundError:
+			pass
+
+		key = hashlib.sha1(os.path.abspath(repo_dir).encode("UTF-8")).hexdigest()  # nosec: B303
+		return self.cache_dir / key
+
+	def is_fresh(self, repo_dir: PathLike, *extra: str) -> bool:
+		r"""
+		Returns whether the repository is unchanged since it was last recorded with :meth:`~.update`.
+
+		:param repo_dir:
+		:param \*extra: Additional strings to include in the fingerprint, such as command line options.
+		"""
+
+		entry = self._entry_for(repo_dir)
+
+		try:
+			recorded = entry.read_text()
+		except FileNotFoundError:
+			return False
+
+		return recorded == self.fingerprint(repo_dir, *extra)
+
+	def update(self, repo_dir: PathLike, *extra: str) -> None:
+		r"""
+		Record the current state of the repository.
+
+		:param repo_dir:
+		:param \*extra: Additional strings to include in the fingerprint, such as command line options.
+		"""
+
+		fingerprint = self.fingerprint(repo_dir, *extra)
+
+		if fingerprint is not None:
+			atomic_write(self._entry_for(repo_dir), fingerprint)
+
+	def clear(self) -> None:
+		"""
+		Remove all recorded fingerprints.
+		"""
+
+		shutil.rmtree(self.cache_dir, ignore_errors=True)
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+#
+#  cli.py
+"""
+The ``repo-helper pycharm`` command group.
+
+The subcommands are only imported when they are invoked,
+or when the help text listing them is shown.
+
+.. versionadded:: 0.4.0
+"""
+#
+#  Copyright © 2020 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+#  EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+#  MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+#  IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+#  DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+#  OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+#  OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+# stdlib
+import importlib
+from typing import Any, Dict, List, Optional
+
+# 3rd party
+import click  # type: ignore[import-untyped]
+from consolekit.commands import SuggestionGroup
+from repo_helper.cli import cli_group
+
+__all__ = ("LazyGroup", "pycharm")
+
+
+class LazyGroup(SuggestionGroup):
+	"""
+	A :class:`click.Group` whose subcommands are imported the first time they are requested.
+
+	:param lazy_commands: Mapping of command names to ``'<module>:<attribute>'`` strings.
+	"""
+
+	def __init__(self, *args: Any, lazy_commands: Optional[Dict[str, str]] = None, **kwargs: Any):
+		super().__init__(*args, **kwargs)
+		self.lazy_commands: Dict[str, str] = dict(lazy_commands or {})
+
+	def list_commands(self, ctx: click.Context) -> List[str]:  # noqa: D102
+		return sorted({*super().list_commands(ctx), *self.lazy_commands})
+
+	def get_command(self, ctx: click.Context, cmd_name: str) -> Optional[click.Command]:  # noqa: D102
+		if cmd_name not in self.commands and cmd_name in self.lazy_commands:
+			module_name, attribute = self.lazy_commands[cmd_name].split(':')
+			self.add_command(getattr(importlib.import_module(module_name), attribute), cmd_name)
+
+		return super().get_command(ctx, cmd_name)
+
+
+@cli_group(
+		cls=LazyGroup,
+		lazy_commands={
+				"configure": "repo_helper_pycharm.commands:configure",
+				"docs": "repo_helper_pycharm.commands:docs_command",
+				"schema": "repo_helper_pycharm.commands:schema",
+				"watch": "repo_helper_pycharm.commands:watch",
+				},
+		)
+def pycharm() -> None:
+	"""
+	Manage PyCharm config.
+	"""
@@ -0,0 +1,645 @@
+#!/usr/bin/env python3
+#
+#  commands.py
+"""
+The ``repo-helper pycharm`` subcommands.
+
+These are loaded on demand by :data:`repo_helper_pycharm.pycharm`.
+
+.. versionadded:: 0.4.0
+"""
+#
+#  Copyright © 2020 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+#  EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+#  MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+#  IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+#  DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+#  OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+#  OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+# stdlib
+from functools import partial, reduce
+from typing import TYPE_CHECKING, List, NoReturn, Optional, Tuple
+
+# 3rd party
+import click  # type: ignore[import-untyped]
+from consolekit import CONTEXT_SETTINGS
+
+# this package
+from repo_helper_pycharm.profiling import phase, profile_options
+
+if TYPE_CHECKING:
+	# 3rd party
+	from domdf_python_tools.paths import PathPlus
+
+	# this package
+	from repo_helper_pycharm.cache import FingerprintCache
+	from repo_helper_pycharm.docs import IDEConfig
+	from repo_helper_pycharm.iml_manager import Change, ImlManager
+	from repo_helper_pycharm.transforms import Transform
+	from repo_helper_pycharm.xml_diff import StructuralChange
+
+__all__ = ("configure", "schema", "docs_command", "watch")
+
+pycharm_command = partial(click.command, context_settings=CONTEXT_SETTINGS)
+
+# Exit codes for ``configure --check``. Click uses ``2`` for usage errors.
+CHECK_UP_TO_DATE = 0
+CHECK_OUT_OF_DATE = 1
+CHECK_FAILED = 3
+
+
+@click.option(
+		"--force",
+		is_flag=True,
+		default=False,
+		help="Replace mappings which are already registered, even if they have been changed in PyCharm.",
+		)
+@pycharm_command()
+@profile_options
+def schema(force: bool = False) -> None:
+	"""
+	Register the schema mappings for 'repo_helper.yml' and other configuration files with PyCharm.
+	"""
+
+	with phase("imports"):
+		# 3rd party
+		from consolekit.utils import abort
+		from domdf_python_tools.paths import PathPlus
+
+		# this package
+		from repo_helper_pycharm.register_schema import register_schema
+
+	try:
+		register_schema(PathPlus.cwd(), force=force)
+	except (FileNotFoundError, ValueError) as e:
+		raise abort(str(e))
+
+
+@click.option(
+		"--format",
+		"output_format",
+		type=click.Choice(["text", "json"]),
+		default="text",
+		show_default=True,
+		help="The output format for '--check' and '--structural-diff'.",
+		)
+@click.option(
+		"--structural-diff",
+		is_flag=True,
+		default=False,
+		help="Show the changed elements and attributes of each component, rather than a diff of the file.",
+		)
+@click.option(
+		"--check",
+		is_flag=True,
+		default=False,
+		help="Don't change anything, but exit with 1 if the configuration is out of date, "
+		"or 3 if it could not be checked. Only changes to the components are checked for, "
+		"so files which 'configure' would only reformat are reported as up to date.",
+		)
+@click.option(
+		"--exclude-pattern",
+		type=click.STRING,
+		metavar="PATTERN",
+		multiple=True,
+		help="Exclude files and directories whose names match the glob pattern, e.g. '*.egg-info'. "
+		"May be given multiple times.",
+		)
+@click.option(
+		"--detect-budget",
+		type=click.FLOAT,
+		default=1.0,
+		show_default=True,
+		metavar="SECONDS",
+		help="The maximum time to spend searching for directories with '--detect-excludes'.",
+		)
+@click.option(
+		"--git-ignored",
+		is_flag=True,
+		default=False,
+		help="Exclude the directories which git ignores.",
+		)
+@click.option(
+		"--detect-excludes",
+		is_flag=True,
+		default=False,
+		help="Search the repository for virtualenvs, caches and similar directories to exclude.",
+		)
+@click.option(
+		"--clear-cache",
+		is_flag=True,
+		default=False,
+		help="Discard the record of which repositories are already configured.",
+		)
+@click.option(
+		"--no-cache",
+		is_flag=True,
+		default=False,
+		help="Configure repositories even if they have not changed since they were last configured.",
+		)
+@click.option(
+		"-j",
+		"--jobs",
+		type=click.IntRange(min=1),
+		default=None,
+		help="The number of repositories to configure in parallel with '--recursive'.",
+		)
+@click.option(
+		"-r",
+		"--recursive",
+		is_flag=True,
+		default=False,
+		help="Configure every repository below the current directory.",
+		)
+@click.option(
+		"--skip",
+		type=click.STRING,
+		metavar="TRANSFORM",
+		multiple=True,
+		help="Don't apply the given transform. May be given multiple times.",
+		)
+@click.option(
+		"--only",
+		type=click.STRING,
+		metavar="TRANSFORM",
+		multiple=True,
+		help="Only apply the given transform. May be given multiple times.",
+		)
+@click.option(
+		"--stream",
+		is_flag=True,
+		default=False,
+		help="Rewrite only the affected parts of the file, without parsing all of it.",
+		)
+@click.option("--diff", is_flag=True, default=False, help="Show a diff if changes are made.")
+@pycharm_command()
+@profile_options
+def configure(
+		diff: bool = False,
+		stream: bool = False,
+		only: Tuple[str, ...] = (),
+		skip: Tuple[str, ...] = (),
+		recursive: bool = False,
+		jobs: Optional[int] = None,
+		no_cache: bool = False,
+		clear_cache: bool = False,
+		detect_excludes: bool = False,
+		detect_budget: float = 1.0,
+		exclude_pattern: Tuple[str, ...] = (),
+		check: bool = False,
+		output_format: str = "text",
+		structural_diff: bool = False,
+		git_ignored: bool = False,
+		) -> None:
+	"""
+	Set the basic configuration for PyCharm.
+	"""
+
+	# stdlib
+	import sys
+
+	# 3rd party
+	from consolekit.utils import abort
+	from domdf_python_tools.paths import PathPlus
+
+	# this package
+	from repo_helper_pycharm.cache import FingerprintCache, options_fingerprint
+
+	cache = FingerprintCache()
+	cache_key = options_fingerprint(only, skip, stream, exclude_pattern)
+
+	if clear_cache:
+		cache.clear()
+
+	# The directories found depend on the whole tree, which the fingerprint doesn't cover.
+	if detect_excludes or git_ignored:
+		no_cache = True
+
+	if recursive and check:
+		raise click.UsageError("'--check' cannot be used with '--recursive'")
+	if recursive and structural_diff:
+		raise click.UsageError("'--structural-diff' cannot be used with '--recursive'")
+	if output_format != "text" and not (check or structural_diff):
+		raise click.UsageError("'--format' can only be used with '--check' or '--structural-diff'")
+
+	if recursive:
+		sys.exit(_configure_recursive(
+				PathPlus.cwd(),
+				diff,
+				jobs,
+				None if no_cache else cache,
+				only,
+				skip,
+				stream,
+				detect_budget if detect_excludes else None,
+				exclude_pattern,
+				git_ignored,
+				))
+
+	if not no_cache and cache.is_fresh(PathPlus.cwd(), *cache_key):
+		if check and output_format == "json":
+			_echo_check_json([])
+		elif structural_diff and output_format == "json":
+			_echo_structural_json([])
+		sys.exit(0)
+
+	with phase("imports"):
+		# this package
+		from repo_helper_pycharm.iml_manager import ImlManager
+		from repo_helper_pycharm.transforms import select_transforms
+
+	def fail(message: str) -> NoReturn:
+		if check:
+			click.echo(message, err=True)
+			sys.exit(CHECK_FAILED)
+
+		raise abort(message)
+
+	try:
+		transforms = select_transforms(only, skip)
+	except ValueError as e:
+		fail(str(e))
+
+	try:
+		iml_manager = ImlManager(PathPlus.cwd())
+	except FileNotFoundError as e:
+		fail(str(e))
+
+	if detect_excludes:
+		iml_manager.detect_excludes(detect_budget)
+	if git_ignored:
+		iml_manager.add_git_ignored()
+
+	iml_manager.exclude_patterns.update(exclude_pattern)
+
+	if check:
+		sys.exit(_check(iml_manager, transforms, output_format))
+
+	if structural_diff:
+		ret = _structural_diff(iml_manager, transforms, stream, output_format)
+	elif stream:
+		ret = iml_manager.run_streaming(diff, transforms)
+	else:
+		ret = iml_manager.run(diff, transforms)
+
+	if not no_cache:
+		cache.update(iml_manager.settings.target_repo, *cache_key)
+
+	sys.exit(ret)
+
+
+def _echo_check_json(changes: List["Change"], root: Optional["PathPlus"] = None) -> None:
+	# stdlib
+	import json
+
+	entries = [{
+			"module": change.module_file.relative_to(root).as_posix() if root else change.module_file.as_posix(),
+			"transform": change.transform,
+			"component": change.component,
+			} for change in changes]
+
+	click.echo(json.dumps({"up_to_date": not changes, "changes": entries}, indent=2))
+
+
+def _echo_structural_json(changes: List["StructuralChange"], root: Optional["PathPlus"] = None) -> None:
+	# stdlib
+	import json
+
+	# this package
+	from repo_helper_pycharm.xml_diff import changes_to_json
+
+	click.echo(json.dumps({"changed": bool(changes), "changes": changes_to_json(changes, root)}, indent=2))
+
+
+def _structural_diff(iml_manager: "ImlManager", transforms: List["Transform"], stream: bool, output_format: str) -> int:
+	changed_files, diff = iml_manager.update(transforms, output_format == "text", stream, structural=True)
+
+	if output_format == "json":
+		_echo_structural_json(iml_manager.structural_changes, iml_manager.settings.target_repo)
+	elif diff:
+		click.echo(diff, nl=False)
+
+	return int(bool(changed_files))
+
+
+def _check(iml_manager: "ImlManager", transforms: List["Transform"], output_format: str) -> int:
+	# 3rd party
+	from lxml.etree import XMLSyntaxError  # type: ignore[import-untyped]
+
+	root = iml_manager.settings.target_repo
+
+	try:
+		changes = iml_manager.check(transforms, first_only=output_format != "json")
+	except (XMLSyntaxError, OSError) as e:
+		click.echo(f"{type(e).__name__}: {e}", err=True)
+		return CHECK_FAILED
+
+	if output_format == "json":
+		_echo_check_json(changes, root)
+	else:
+		for change in changes:
+			module = change.module_file.relative_to(root).as_posix()
+			click.echo(f"{module}: {change.transform!r} would change the {change.component!r} component")
+
+	return CHECK_OUT_OF_DATE if changes else CHECK_UP_TO_DATE
+
+
+def _find_repositories(root: "PathPlus") -> List["PathPlus"]:
+	# Find the repositories which contain both a repo_helper.yml file and a .idea/*.iml file,
+	# without searching inside the repositories which have been found.
+
+	# stdlib
+	import os
+
+	# 3rd party
+	from domdf_python_tools.paths import PathPlus, unwanted_dirs
+
+	repo_dirs = []
+
+	for dirpath, dirnames, filenames in os.walk(root):
+		if "repo_helper.yml" in filenames and ".idea" in dirnames:
+			if any((PathPlus(dirpath) / ".idea").glob("*.iml")):
+				dirnames.clear()
+				repo_dirs.append(PathPlus(dirpath))
+				continue
+
+		dirnames[:] = sorted(d for d in dirnames if d not in unwanted_dirs and d != ".idea")
+
+	return repo_dirs
+
+
+def _configure_recursive(
+		root: "PathPlus",
+		diff: bool,
+		jobs: Optional[int],
+		cache: Optional["FingerprintCache"],
+		only: Tuple[str, ...],
+		skip: Tuple[str, ...],
+		stream: bool,
+		detect_budget: Optional[float] = None,
+		exclude_patterns: Tuple[str, ...] = (),
+		git_ignored: bool = False,
+		) -> int:
+	# stdlib
+	from concurrent.futures import ProcessPoolExecutor
+
+	# 3rd party
+	from consolekit.utils import abort
+
+	# this package
+	from repo_helper_pycharm.batch import ConfigureOptions, configure_many
+
+	repo_dirs = _find_repositories(root)
+	if not repo_dirs:
+		raise abort(f"No PyCharm projects found in {root}")
+
+	options = ConfigureOptions(
+			show_diff=diff,
+			only=only,
+			skip=skip,
+			stream=stream,
+			detect_budget=detect_budget,
+			exclude_patterns=exclude_patterns,
+			git_ignored=git_ignored,
+			)
+
+	changed, unchanged, failed = [], [], []
+
+	try:
+		with ProcessPoolExecutor(max_workers=jobs) as executor:
+			results = configure_many(repo_dirs, options, executor=executor, cache=cache)
+	except ValueError as e:
+		raise abort(str(e))
+
+	for result in results:
+		if result.diff:
+			click.echo(result.diff, nl=False)
+
+		if result.error is not None:
+			failed.append(result)
+			click.echo(f"{result.repo_dir}: {result.error}", err=True)
+		elif result.changed:
+			changed.append(result)
+		else:
+			unchanged.append(result)
+
+	click.echo(f"{len(changed)} changed, {len(unchanged)} unchanged, {len(failed)} failed")
+
+	return int(bool(changed or failed))
+
+
+@click.option(
+		"--build",
+		is_flag=True,
+		default=False,
+		help="Build the documentation first, if the sources have changed since the last build.",
+		)
+@click.option(
+		"--port",
+		type=click.INT,
+		default=0,
+		help="The port for the fallback web server. If 0 a free port is chosen.",
+		)
+@click.option(
+		"--ide",
+		type=click.STRING,
+		default=None,
+		metavar="NAME",
+		help="The JetBrains IDE whose web server to use, e.g. 'PyCharm', 'PyCharmCE' or 'PyCharm2020.2'.",
+		)
+@pycharm_command()
+@profile_options
+def docs_command(ide: Optional[str] = None, port: int = 0, build: bool = False) -> None:
+	"""
+	Open the documentation using PyCharm's built-in web server.
+
+	If PyCharm's web server isn't running the documentation is served by a local web server instead,
+	until interrupted with Ctrl+C.
+	"""
+
+	with phase("imports"):
+		# stdlib
+		import operator
+
+		# 3rd party
+		from apeye import URL
+		from consolekit.utils import abort
+		from domdf_python_tools.paths import PathPlus
+
+		# this package
+		from repo_helper_pycharm.docs import default_port, get_docs_port, get_ide_config, parse_ide
+		from repo_helper_pycharm.docs_server import is_port_open
+		from repo_helper_pycharm.settings import load_settings
+
+	with phase("settings"):
+		settings = load_settings(PathPlus.cwd())
+
+	if not settings.enable_docs:
+		raise abort("The current project has no documentation!")
+
+	if build:
+		_build_docs(settings.target_repo / settings.docs_dir)
+
+	config = None
+
+	try:
+		with phase("ide"):
+			config = get_ide_config(*parse_ide(ide)) if ide else get_ide_config()
+	except (ValueError, FileNotFoundError) as e:
+		# Without an explicit choice of IDE, use the fallback server.
+		if ide:
+			raise abort(str(e))
+
+	if config is not None:
+		with phase("port"):
+			try:
+				ide_port = get_docs_port(config)
+			except FileNotFoundError:
+				# The IDE only writes 'other.xml' once one of its settings has been changed.
+				ide_port = default_port
+
+			ide_running = is_port_open(ide_port)
+
+		if ide_running:  # pragma: no cover
+			url: str = str(
+					reduce(
+							operator.truediv,
+							[
+									URL(f"http://localhost:{ide_port}"),
+									settings.target_repo.name,
+									settings.docs_dir,
+									"build",
+									"html",
+									]
+							)
+					)
+
+			with phase("browser"):
+				_open_in_browser(url, config)
+
+			return
+
+	html_dir = settings.target_repo / settings.docs_dir / "build" / "html"
+	if not html_dir.is_dir():
+		raise abort(f"The documentation has not been built: {html_dir} does not exist.")
+
+	_serve_docs(html_dir, port, config)
+
+
+def _build_docs(docs_dir: "PathPlus") -> None:
+	# stdlib
+	import subprocess  # nosec: B404
+
+	# 3rd party
+	from consolekit.utils import abort
+
+	# this package
+	from repo_helper_pycharm.docs_build import build_docs
+
+	try:
+		with phase("build"):
+			built = build_docs(docs_dir)
+	except subprocess.CalledProcessError as e:
+		raise abort(f"Building the documentation failed with exit code {e.returncode}.")
+
+	if not built:
+		click.echo("The documentation is up to date.")
+
+
+def _open_in_browser(url: str, config: Optional["IDEConfig"]) -> None:  # pragma: no cover
+	# stdlib
+	import webbrowser
+
+	# this package
+	from repo_helper_pycharm.docs import open_in_browser
+
+	if config is not None:
+		try:
+			open_in_browser(url, config)
+			return
+		except FileNotFoundError:
+			# The IDE only writes 'web-browsers.xml' once the browser settings have been changed.
+			pass
+
+	webbrowser.open(url)
+
+
+def _serve_docs(html_dir: "PathPlus", port: int, config: Optional["IDEConfig"]) -> None:  # pragma: no cover
+	# this package
+	from repo_helper_pycharm.docs_server import make_server
+
+	with phase("server"):
+		server = make_server(html_dir, port)
+
+	with server:
+		url = f"http://localhost:{server.server_address[1]}/"
+		click.echo(f"Serving {html_dir} at {url}")
+		click.echo("Press Ctrl+C to stop.")
+
+		with phase("browser"):
+			_open_in_browser(url, config)
+
+		try:
+			server.serve_forever()
+		except KeyboardInterrupt:
+			pass
+
+
+docs_command.name = "docs"
+
+
+@click.option(
+		"--debounce",
+		type=click.FLOAT,
+		default=0.5,
+		show_default=True,
+		help="Wait until no files have changed for this many seconds before reconfiguring.",
+		)
+@click.option("--diff", is_flag=True, default=False, help="Show a diff if changes are made.")
+@click.argument(
+		"repos",
+		type=click.STRING,
+		nargs=-1,
+		metavar="[REPO]...",
+		)
+@pycharm_command()
+@profile_options
+def watch(repos: Tuple[str, ...] = (), diff: bool = False, debounce: float = 0.5) -> None:
+	"""
+	Reconfigure PyCharm whenever 'repo_helper.yml' or PyCharm's configuration changes.
+
+	Watches the current repository if no repositories are given.
+	"""
+
+	# 3rd party
+	from consolekit.utils import abort
+	from domdf_python_tools.paths import PathPlus
+
+	# this package
+	from repo_helper_pycharm.watch import Watcher
+
+	try:
+		watcher = Watcher(repos or [PathPlus.cwd()], debounce=debounce, show_diff=diff)
+	except OSError as e:
+		raise abort(str(e))
+
+	click.echo("Watching for changes. Press Ctrl+C to stop.")
+
+	try:
+		watcher.run()
+	except KeyboardInterrupt:  # pragma: no cover
+		pass
@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+#
+#  detect.py
+"""
+Find directories within a repository which PyCharm should not index.
+
+Directories can be found by walking the repository with :func:`~.detect_excluded_dirs`,
+or by asking git which directories it ignores with :func:`~.git_ignored_dirs`.
+
+.. versionadded:: 0.4.0
+"""
+#
+#  Copyright © 2020 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+#  EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+#  MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+#  IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+#  DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+#  OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+#  OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+# stdlib
+import fnmatch
+import hashlib
+import json
+import os
+import subprocess  # nosec: B404
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# 3rd party
+from domdf_python_tools.typing import PathLike
+
+# this package
+from repo_helper_pycharm.cache import get_cache_dir
+from repo_helper_pycharm.transaction import atomic_write
+
+__all__ = ("detect_excluded_dirs", "classify_directory", "git_ignored_dirs")
+
+#: Files or directories whose presence marks a directory as one to exclude.
+marker_files = frozenset({
+		"pyvenv.cfg",  # virtualenvs
+		"CACHEDIR.TAG",  # https://bford.info/cachedir/
+		"conda-meta",  # conda environments
+		})
+
+#: Patterns for the names of directories to exclude.
+excluded_names = (
+		"node_modules",
+		".nox",
+		".tox",
+		".eggs",
+		"*.egg-info",
+		".mypy_cache",
+		".pytest_cache",
+		".ruff_cache",
+		".hypothesis",
+		".ipynb_checkpoints",
+		"__pycache__",
+		"htmlcov",
+		"site-packages",
+		)
+
+# Directories which are never descended into, and never reported.
+_ignored_names = frozenset({".git", ".hg", ".svn", ".idea"})
+
+
+def classify_directory(name: str, entries: Iterable[os.DirEntry], large_dir_threshold: int = 5000) -> bool:
+	"""
+	Returns whether a directory should be excluded from indexing.
+
+	:param name: The name of the directory.
+	:param entries: The contents of the directory.
+	:param large_dir_threshold: Directories with at least this many entries and no Python files are excluded.
+	"""
+
+	if any(fnmatch.fnmatchcase(name, pattern) for pattern in excluded_names):
+		return True
+
+	count = 0
+	has_python = False
+
+	for entry in entries:
+		if entry.name in marker_files:
+			return True
+
+		count += 1
+		if entry.name.endswith(".py"):
+			has_python = True
+
+	return count >= large_dir_threshold and not has_python
+
+
+def _scan(path: str, large_dir_threshold: Optional[int]) -> Tuple[bool, List[str]]:
+	# Returns whether the directory should be excluded, and if not its subdirectories.
+	# If large_dir_threshold is None the directory is not classified.
+
+	try:
+		with os.scandir(path) as it:
+			entries = list(it)
+	except OSError:
+		return False, []
+
+	if large_dir_threshold is not None:
+		if classify_directory(os.path.basename(path), entries, large_dir_threshold):
+			return True, []
+
+	subdirs = []
+	for entry in entries:
+		try:
+			if entry.name not in _ignored_names and entry.is_dir(follow_symlinks=False):
+				subdirs.append(entry.path)
+		except OSError:  # pragma: no cover
+			pass
+
+	return False, subdirs
+
+
+def detect_excluded_dirs(
+		repo_dir: PathLike,
+		time_budget: float = 1.0,
+		max_workers: Optional[int] = None,
+		large_dir_threshold: int = 5000,
+		) -> Set[str]:
+	"""
+	Walk the repository and return the directories which should be excluded from indexing.
+
+	A directory is excluded if its name matches one of :data:`~.excluded_names`,
+	if it contains one of :data:`~.marker_files`, or if it is very large and contains no Python files.
+	Excluded directories are not searched any further.
+
+	:param repo_dir:
+	:param time_budget: The maximum time to spend searching, in seconds.
+		When it runs out no more directories are scanned, and the directories found so far are returned.
+	:param max_workers: The number of threads used to scan directories.
+	:param large_dir_threshold: Directories with at least this many entries and no Python files are excluded.
+
+	:returns: The paths of the directories to exclude, relative to ``repo_dir`` and using forward slashes.
+	"""
+
+	deadline = time.monotonic() + time_budget
+	root = os.path.abspath(repo_dir)
+	found: Set[str] = set()
+
+	with ThreadPoolExecutor(max_workers=max_workers) as executor:
+		pending: Dict[Future, str] = {}
+
+		def submit(path: str) -> None:
+			if time.monotonic() < deadline:
+				pending[executor.submit(_scan, path, large_dir_threshold)] = path
+
+		# The repository root itself is never excluded.
+		for subdir in _scan(root, large_dir_threshold=None)[1]:
+			submit(subdir)
+
+		while pending:
+			remaining = deadline - time.monotonic()
+			if remaining <= 0:
+				break
+
+			done, _ = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+
+			for future in done:
+				path = pending.pop(future)
+				excluded, subdirs = future.result()
+
+				if excluded:
+					found.add(os.path.relpath(path, root).replace(os.sep, '/'))
+				else:
+					for subdir in subdirs:
+						submit(subdir)
+
+		# Directories which have not been scanned yet are skipped.
+		for future in pending:
+			future.cancel()
+
+	return found
+
+
+def _find_git_dir(path: str) -> Optional[Tuple[str, str]]:
+	# Returns the top of the working tree containing ``path`` and its git directory.
+
+	while True:
+		dot_git = os.path.join(path, ".git")
+
+		if os.path.isdir(dot_git):
+			return path, dot_git
+
+		if os.path.isfile(dot_git):
+			# A worktree or submodule, where .git is a file pointing to the git directory.
+			with open(dot_git, encoding="UTF-8") as fp:
+				content = fp.read().strip()
+			if content.startswith("gitdir:"):
+				return path, os.path.join(path, content[len("gitdir:"):].strip())
+
+		parent = os.path.dirname(path)
+		if parent == path:
+			return None
+		path = parent
+
+
+def _git(args: List[str], cwd: str) -> List[str]:
+	process = subprocess.run(  # nosec: B603, B607
+			["git", *args],
+			cwd=cwd,
+			stdout=subprocess.PIPE,
+			stderr=subprocess.DEVNULL,
+			check=True,
+			)
+	return [entry for entry in process.stdout.decode("UTF-8").split('\0') if entry]
+
+
+def _mtime(path: str) -> Optional[int]:
+	try:
+		return os.stat(path).st_mtime_ns
+	except OSError:
+		return None
+
+
+def _stamps(paths: Iterable[str]) -> Dict[str, Optional[int]]:
+	return {path: _mtime(path) for path in paths}
+
+
+def _config_files(git_dir: str) -> List[str]:
+	# The git configuration files which may set core.excludesFile, in the order git reads them.
+	xdg_config_home = os.environ.get("XDG_CONFIG_HOME") or os.path.expanduser("~/.config")
+
+	return [
+			os.path.join(xdg_config_home, "git", "config"),
+			os.path.expanduser("~/.gitconfig"),
+			os.path.join(git_dir, "config"),
+			]
+
+
+def _excludes_file(config_files: Iterable[str]) -> str:
+	# Returns the value of core.excludesFile, without running git.
+	xdg_config_home = os.environ.get("XDG_CONFIG_HOME") or os.path.expanduser("~/.config")
+	excludes_file = os.path.join(xdg_config_home, "git", "ignore")
+
+	for config_file in config_files:
+		try:
+			with open(config_file, encoding="UTF-8") as fp:
+				lines = fp.readlines()
+		except (OSError, UnicodeDecodeError):
+			continue
+
+		section = ''
+		for line in lines:
+			line = line.strip()
+			if line.startswith('['):
+				section = line[1:].split(']', 1)[0].strip().lower()
+			elif section == "core" and '=' in line:
+				name, value = line.split('=', 1)
+				if name.strip().lower() == "excludesfile":
+					excludes_file = os.path.expanduser(value.strip().strip('"'))
+
+	return excludes_file
+
+
+def git_ignored_dirs(repo_dir: PathLike, use_cache: bool = True) -> Set[str]:
+	"""
+	Returns the directories in the repository which git ignores, using a single call to
+	``git ls-files --others --ignored --exclude-standard --directory``.
+
+	Only the outermost ignored directories are returned, as excluding a directory also excludes its contents.
+
+	The result is cached, and reused until the modification time of ``repo_dir``, the git index,
+	``.git/info/exclude``, the file named by ``core.excludesFile``, the git configuration,
+	or the ``.gitignore`` file in ``repo_dir`` or the top of the working tree changes.
+	Ignored directories created below the top level of ``repo_dir``,
+	and changes to other ``.gitignore`` files, may therefore not be noticed until one of those changes.
+
+	:param repo_dir:
+	:param use_cache: Whether to use the cached result if it is still valid.
+
+	:returns: The paths of the ignored directories, relative to ``repo_dir`` and using forward slashes,
+		or an empty set if ``repo_dir`` isn't in a git repository or git isn't installed.
+	"""  # noqa: D400
+
+	repo_dir = os.path.abspath(repo_dir)
+	git_dirs = _find_git_dir(repo_dir)
+
+	if git_dirs is None:
+		return set()
+
+	top_level, git_dir = git_dirs
+	key = hashlib.sha1(repo_dir.encode("UTF-8")).hexdigest()  # nosec: B303
+	cache_file = get_cache_dir() / "git-ignored" / f"{key}.json"
+
+	if use_cache:
+		try:
+			cached = json.loads(cache_file.read_text())
+			if cached["stamps"] == _stamps(cached["stamps"]):
+				return set(cached["dirs"])
+		except (OSError, ValueError, KeyError, TypeError, AttributeError):
+			pass
+
+	try:
+		entries = _git(["ls-files", "-z", "--others", "--ignored", "--exclude-standard", "--directory"], repo_dir)
+	except (OSError, subprocess.CalledProcessError):
+		return set()
+
+	found = set()
+
+	for entry in entries:
+		# Directories are listed with a trailing slash.
+		if entry.endswith('/') and entry.split('/', 1)[0] not in _ignored_names:
+			found.add(entry.rstrip('/'))
+
+	config_files = _config_files(git_dir)
+	stamp_paths = {
+			repo_dir,
+			os.path.join(repo_dir, ".gitignore"),
+			os.path.join(top_level, ".gitignore"),
+			os.path.join(git_dir, "index"),
+			os.path.join(git_dir, "info", "exclude"),
+			_excludes_file(config_files),
+			*config_files,
+			}
+
+	try:
+		atomic_write(cache_file, json.dumps({"stamps": _stamps(stamp_paths), "dirs": sorted(found)}))
+	except OSError:  # pragma: no cover
+		pass
+
+	return found
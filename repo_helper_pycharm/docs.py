@@ -4,6 +4,9 @@
 """
 Parse PyCharm configuration and open a project's documentation in the default web browser.
 
+The configuration directories of the installed JetBrains IDEs are recorded in an index in the user's cache directory,
+which is rebuilt when the modification time of any of the directories changes.
+
 .. versionadded:: 0.2.0
 """
 #
@@ -29,73 +32,329 @@ Parse PyCharm configuration and open a project's documentation in the default we
 #
 
 # stdlib
+import json
 import os
+import re
 import webbrowser
-from typing import Optional
+from typing import Dict, List, NamedTuple, Optional, Tuple
 
 # 3rd party
+import lxml.etree  # type: ignore[import-untyped]
 import platformdirs
-from domdf_python_tools.iterative import natmax
 from domdf_python_tools.paths import PathPlus
-from lxml import objectify  # type: ignore[import-untyped]
+
+# this package
+from repo_helper_pycharm.cache import get_cache_dir
+from repo_helper_pycharm.transaction import atomic_write
 
 __all__ = (
+		"IDEConfig",
+		"get_config_roots",
+		"find_ide_configs",
+		"parse_ide",
+		"get_ide_config",
 		"get_config_dir",
 		"open_in_browser",
 		"get_docs_port",
+		"default_port",
 		)
 
+#: The port used by the IDE's built-in web server if it has not been changed.
+default_port = 63342
+
+#: The options files which are recorded in the index.
+options_files = ("other.xml", "web-browsers.xml")
+
+_config_dir_re = re.compile(r"^([A-Za-z]+?)(\d{4}\.\d+)$")
+_index_version = 1
+
+
+class IDEConfig(NamedTuple):
+	"""
+	The configuration directory of an installed JetBrains IDE.
+
+	.. versionadded:: 0.4.0
+	"""
+
+	#: The name of the product, such as ``PyCharm``, ``PyCharmCE`` or ``IntelliJIdea``.
+	product: str
+
+	#: The version of the product, such as ``2020.2``.
+	version: str
+
+	#: The path to the configuration directory.
+	path: PathPlus
+
+	#: Mapping of the names of the files in :data:`~.options_files` which exist to their paths.
+	options: Dict[str, PathPlus]
+
+	def get_options_file(self, filename: str) -> PathPlus:
+		"""
+		Returns the path to the given file in the IDE's ``options`` directory.
+
+		:param filename:
+
+		:raises: :exc:`FileNotFoundError` if the file does not exist.
+		"""
+
+		if filename in self.options:
+			return self.options[filename]
+		elif filename not in options_files:
+			path = self.path / "options" / filename
+			if path.is_file():
+				return path
+
+		raise FileNotFoundError(self.path / "options" / filename)
+
+
+def get_config_roots() -> List[PathPlus]:
+	"""
+	Returns the directories which may contain JetBrains IDEs' configuration directories.
+
+	IDEs installed with the JetBrains Toolbox App also keep their configuration in these directories.
+
+	.. versionadded:: 0.4.0
+	"""
+
+	roots = [PathPlus(platformdirs.user_config_dir("JetBrains"))]
+
+	# On Windows the configuration is in the roaming profile.
+	roaming = PathPlus(platformdirs.user_config_dir("JetBrains", None, None, True))
+	if roaming not in roots:
+		roots.append(roaming)
+
+	return roots
+
+
+def _mtime(path: str) -> Optional[int]:
+	try:
+		return os.stat(path).st_mtime_ns
+	except FileNotFoundError:
+		return None
+
+
+def _scan_roots(roots: List[PathPlus]) -> Tuple[List[IDEConfig], Dict[str, Optional[int]]]:
+	# Returns the IDE configuration directories, and the modification times of the directories searched.
+
+	configs = []
+	mtimes: Dict[str, Optional[int]] = {}
+
+	for root in roots:
+		mtimes[str(root)] = _mtime(str(root))
+		if mtimes[str(root)] is None:
+			continue
+
+		with os.scandir(root) as it:
+			for entry in it:
+				match = _config_dir_re.match(entry.name)
+				if not match or not entry.is_dir():
+					continue
+
+				options_dir = os.path.join(entry.path, "options")
+				mtimes[options_dir] = _mtime(options_dir)
+
+				options = {}
+				for filename in options_files:
+					path = os.path.join(options_dir, filename)
+					if os.path.isfile(path):
+						options[filename] = PathPlus(path)
+
+				configs.append(IDEConfig(match.group(1), match.group(2), PathPlus(entry.path), options))
+
+	return configs, mtimes
+
+
+def _load_index(index_file: PathPlus, roots: List[PathPlus]) -> Optional[List[IDEConfig]]:
+	try:
+		index = json.loads(index_file.read_text())
+	except (FileNotFoundError, ValueError):
+		return None
+
+	if index.get("version") != _index_version or index.get("roots") != list(map(str, roots)):
+		return None
+
+	for path, mtime in index["mtimes"].items():
+		if _mtime(path) != mtime:
+			return None
+
+	return [
+			IDEConfig(
+					config["product"],
+					config["version"],
+					PathPlus(config["path"]),
+					{filename: PathPlus(path) for filename, path in config["options"].items()},
+					) for config in index["configs"]
+			]
+
+
+def find_ide_configs(use_index: bool = True) -> List[IDEConfig]:
+	"""
+	Returns the configuration directories of the installed JetBrains IDEs.
+
+	.. versionadded:: 0.4.0
+
+	:param use_index: Whether to use the index of configuration directories, rather than searching for them.
+	"""
+
+	roots = get_config_roots()
+	index_file = get_cache_dir() / "ide-index.json"
+
+	if use_index:
+		configs = _load_index(index_file, roots)
+		if configs is not None:
+			return configs
+
+	configs, mtimes = _scan_roots(roots)
+
+	index = {
+			"version": _index_version,
+			"roots": list(map(str, roots)),
+			"mtimes": mtimes,
+			"configs": [{
+					"product": config.product,
+					"version": config.version,
+					"path": str(config.path),
+					"options": {filename: str(path) for filename, path in config.options.items()},
+					} for config in configs],
+			}
+
+	try:
+		atomic_write(index_file, json.dumps(index, indent=2))
+	except OSError:  # pragma: no cover
+		pass
+
+	return configs
+
+
+def parse_ide(name: str) -> Tuple[str, Optional[str]]:
+	"""
+	Split the name of an IDE, such as ``PyCharm`` or ``PyCharmCE2020.2``, into the product and the version.
+
+	.. versionadded:: 0.4.0
+
+	:param name:
+
+	:raises: :exc:`ValueError` if the name is invalid.
+	"""
+
+	match = re.match(r"^([A-Za-z]+?)-?(\d{4}\.\d+)?$", name)
+
+	if not match:
+		raise ValueError(f"Invalid IDE name {name!r}. Expected e.g. 'PyCharm' or 'PyCharmCE2020.2'")
+
+	return match.group(1), match.group(2)
+
+
+def _version_key(version: str) -> Tuple[int, ...]:
+	return tuple(map(int, version.split('.')))
+
 
-def get_config_dir() -> PathPlus:
+def get_ide_config(product: Optional[str] = None, version: Optional[str] = None) -> IDEConfig:
+	"""
+	Returns the configuration of the newest matching IDE.
+
+	If ``product`` is not given the newest version of PyCharm or PyCharm Community Edition is preferred,
+	followed by any other JetBrains IDE. PyCharm is preferred over the Community Edition of the same version.
+
+	.. versionadded:: 0.4.0
+
+	:param product: The name of the product, such as ``PyCharm`` or ``PyCharmCE``. Case insensitive.
+	:param version: The version of the product, such as ``2020.2``.
+
+	:raises: :exc:`FileNotFoundError` if no matching IDE can be found.
+	"""
+
+	roots = get_config_roots()
+
+	if not any(root.is_dir() for root in roots):
+		raise FileNotFoundError(roots[0])
+
+	configs = find_ide_configs()
+
+	if product is not None:
+		configs = [c for c in configs if c.product.lower() == product.lower()]
+	if version is not None:
+		configs = [c for c in configs if c.version == version]
+
+	if not configs:
+		raise FileNotFoundError(roots[0] / f"{product or 'PyCharm'}{version or '[0-9]{4}.[0-9]'}")
+
+	def preference(config: IDEConfig) -> Tuple[bool, Tuple[int, ...], bool]:
+		# A stale configuration directory for one edition shouldn't win over a current one for the other.
+		return config.product.startswith("PyCharm"), _version_key(config.version), config.product == "PyCharm"
+
+	return max(configs, key=preference)
+
+
+def get_config_dir(product: Optional[str] = None, version: Optional[str] = None) -> PathPlus:
 	"""
 	Returns the path to the PyCharm configuration directory.
 
 	.. versionadded:: 0.2.0
 
+	.. versionchanged:: 0.4.0
+
+		* Added the ``product`` and ``version`` arguments. See :func:`~.get_ide_config`.
+		* The directories are looked up in an index rather than searched for each time.
+
 	:raises: :exc:`FileNotFoundError` if the directory can't be found.
 	"""
 
-	config_dir = PathPlus(platformdirs.user_config_dir("JetBrains"))
+	return get_ide_config(product, version).path
 
-	if not config_dir.is_dir():
-		raise FileNotFoundError(config_dir)
 
-	try:
-		return config_dir / natmax([p.name for p in config_dir.glob("PyCharm*")])
-	except (ValueError, IndexError):
-		raise FileNotFoundError(config_dir / "PyCharm[0-9]{4}.[0-9]") from None
+def _find_component(filename: PathPlus, name: str) -> Optional[lxml.etree._Element]:
+	"""
+	Returns the first component in the file with the given name, or :py:obj:`None` if there isn't one.
 
+	The file is only parsed as far as the component, and the preceding components are discarded as they are parsed.
 
-def open_in_browser(url: str) -> None:  # pragma: no cover
+	:param filename:
+	:param name:
+	"""
+
+	with open(filename, "rb") as fp:
+		for _, element in lxml.etree.iterparse(fp, events=("end", ), tag="component"):
+			if element.get("name") == name:
+				return element
+
+			element.clear(keep_tail=True)
+			while element.getprevious() is not None:
+				del element.getparent()[0]
+
+	return None
+
+
+def open_in_browser(url: str, config: Optional[IDEConfig] = None) -> None:  # pragma: no cover
 	"""
 	Opens the URL in the browser configured in the PyCharm settings.
 
+	If no browser is configured the system's default browser is used.
+
 	.. versionadded:: 0.2.0
 
 	:param url:
-	"""
+	:param config: The IDE to read the settings from. Defaults to the value of :func:`~.get_ide_config`.
 
-	config_dir = get_config_dir()
-	browser_config_file = config_dir / "options" / "web-browsers.xml"
+	.. versionchanged:: 0.4.0  Added the ``config`` argument.
+	"""
 
-	if not browser_config_file.is_file():
-		raise FileNotFoundError(browser_config_file)
+	if config is None:
+		config = get_ide_config()
 
-	browser_config = objectify.parse(str(browser_config_file))
-	root = browser_config.getroot()
+	browser_config_file = config.get_options_file("web-browsers.xml")
+	component = _find_component(browser_config_file, "WebBrowsersConfiguration")
 
-	assert root.component.attrib["name"] == "WebBrowsersConfiguration"
-	default = root.component.attrib["default"]
+	default = "system" if component is None else component.get("default", "system")
+	browsers = [] if component is None else component.findall("browser")
 
-	browsers = [browser for browser in root.component.findall("browser")]
+	if default == "system" or not browsers:
+		webbrowser.open(url)
 
-	if default == "first":
-		browser_name = browsers[0].attrib["name"].lower()
+	elif default == "first":
+		browser_name = browsers[0].get("name").lower()
 		if browser_name == "firefox":
-			try:
-				profile: Optional[str] = str(browsers[0].settings.profile)
-			except AttributeError:
-				profile = None
+			profile: Optional[str] = browsers[0].findtext("settings/profile")
 
 			if profile is not None:
 				os.system(f"firefox -P {profile} {url}")
@@ -103,31 +362,35 @@ def open_in_browser(url: str) -> None:  # pragma: no cover
 				os.system(f"firefox {url}")
 
 		else:
-			webbrowser.get(browsers[0].attrib["name"].lower())
+			webbrowser.get(browser_name).open(url)
 
 	else:
 		raise NotImplementedError(default)
 
 
-def get_docs_port() -> int:
+def get_docs_port(config: Optional[IDEConfig] = None) -> int:
 	"""
 	Returns the number of the port used by the PyCharm web server.
 
 	.. versionadded:: 0.2.0
-	"""
 
-	config_dir = get_config_dir()
-	other_config_file = config_dir / "options" / "other.xml"
+	:param config: The IDE to read the settings from. Defaults to the value of :func:`~.get_ide_config`.
+
+	.. versionchanged:: 0.4.0
 
-	if not other_config_file.is_file():
-		raise FileNotFoundError(other_config_file)
+		* Added the ``config`` argument.
+		* The IDE's default port is returned if it has not been changed,
+		  rather than raising a :exc:`ValueError`.
+		* The configuration file is only parsed as far as the web server's settings.
+	"""
 
-	other_config = objectify.parse(str(other_config_file))
+	if config is None:
+		config = get_ide_config()
 
-	root = other_config.getroot()
+	other_config_file = config.get_options_file("other.xml")
+	component = _find_component(other_config_file, "BuiltInServerOptions")
 
-	for tag in root.getchildren():
-		if tag.tag == "component" and tag.attrib["name"] == "BuiltInServerOptions":
-			return int(tag.attrib["builtInServerPort"])
+	if component is None:
+		return default_port
 
-	raise ValueError
+	return int(component.get("builtInServerPort", default_port))
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+#
+#  docs_build.py
+"""
+Build a project's documentation with Sphinx, skipping the build if the sources are unchanged.
+
+The state of the sources after each build is recorded in a manifest in the ``build`` directory.
+Files are first compared by modification time and size, and only files whose modification time
+has changed are hashed.
+
+.. versionadded:: 0.4.0
+"""
+#
+#  Copyright © 2020 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+#  EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+#  MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+#  IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+#  DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+#  OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+#  OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+# stdlib
+import hashlib
+import json
+import os
+import subprocess  # nosec: B404
+import sys
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# 3rd party
+from domdf_python_tools.paths import PathPlus
+from domdf_python_tools.typing import PathLike
+
+# this package
+from repo_helper_pycharm.transaction import atomic_write
+
+__all__ = ("manifest_file", "scan_sources", "sources_changed", "sphinx_command", "build_docs")
+
+_manifest_version = 1
+
+#: Directories within the documentation directory which are not sources.
+_ignored_dirs = {"build", "__pycache__", ".ipynb_checkpoints"}
+
+Stats = Dict[str, Tuple[int, int]]
+
+
+def manifest_file(docs_dir: PathLike) -> PathPlus:
+	"""
+	Returns the path to the manifest of the sources at the time of the last build.
+
+	:param docs_dir: The directory containing the documentation.
+	"""
+
+	return PathPlus(docs_dir) / "build" / ".source-manifest.json"
+
+
+def sphinx_command(docs_dir: PathLike) -> List[str]:
+	"""
+	Returns the command used to build the HTML documentation.
+
+	The build is incremental, reusing the doctrees from the previous build, and runs in parallel.
+	The doctrees are kept in ``build/doctrees``, as with ``sphinx-build -M html``.
+
+	:param docs_dir: The directory containing the documentation.
+	"""
+
+	docs_dir = PathPlus(docs_dir)
+	build_dir = docs_dir / "build"
+
+	return [
+			sys.executable,
+			"-m",
+			"sphinx",
+			"-b",
+			"html",
+			"-d",
+			str(build_dir / "doctrees"),
+			"-j",
+			"auto",
+			str(docs_dir),
+			str(build_dir / "html"),
+			]
+
+
+def scan_sources(docs_dir: PathLike) -> Stats:
+	"""
+	Returns the modification time (in nanoseconds) and size of each source file in the documentation directory.
+
+	:param docs_dir: The directory containing the documentation.
+
+	:returns: A mapping of POSIX paths relative to ``docs_dir`` to ``(mtime, size)`` tuples.
+	"""
+
+	docs_dir = os.fspath(docs_dir)
+	stats: Stats = {}
+
+	for dirpath, dirnames, filenames in os.walk(docs_dir):
+		dirnames[:] = [name for name in dirnames if name not in _ignored_dirs]
+
+		for filename in filenames:
+			path = os.path.join(dirpath, filename)
+			try:
+				stat = os.stat(path)
+			except OSError:  # pragma: no cover
+				continue
+			stats[os.path.relpath(path, docs_dir).replace(os.sep, '/')] = (stat.st_mtime_ns, stat.st_size)
+
+	return stats
+
+
+def _hash(path: PathPlus) -> str:
+	sha = hashlib.sha256()
+
+	with path.open("rb") as fp:
+		for chunk in iter(lambda: fp.read(1 << 16), b''):
+			sha.update(chunk)
+
+	return sha.hexdigest()
+
+
+def _load_manifest(docs_dir: PathPlus, command: Sequence[str]) -> Optional[Dict[str, List]]:
+	try:
+		manifest = json.loads(manifest_file(docs_dir).read_text())
+	except (FileNotFoundError, ValueError):
+		return None
+
+	if manifest.get("version") != _manifest_version or manifest.get("command") != list(command):
+		return None
+
+	return manifest["files"]
+
+
+def _write_manifest(docs_dir: PathPlus, command: Sequence[str], files: Dict[str, List]) -> None:
+	manifest = {"version": _manifest_version, "command": list(command), "files": files}
+	atomic_write(manifest_file(docs_dir), json.dumps(manifest, sort_keys=True))
+
+
+def sources_changed(docs_dir: PathLike, stats: Optional[Stats] = None) -> bool:
+	"""
+	Returns whether the documentation sources have changed since the last build,
+	or if the documentation has not been built.
+
+	Files whose modification time has changed but whose content has not are recorded in the manifest,
+	so they need not be hashed again.
+
+	:param docs_dir: The directory containing the documentation.
+	:param stats: The output of :func:`~.scan_sources`, if already known.
+	"""  # noqa: D400
+
+	docs_dir = PathPlus(docs_dir)
+	command = sphinx_command(docs_dir)
+	recorded = _load_manifest(docs_dir, command)
+
+	if recorded is None or not (docs_dir / "build" / "html" / "index.html").is_file():
+		return True
+
+	if stats is None:
+		stats = scan_sources(docs_dir)
+
+	if stats.keys() != recorded.keys():
+		return True
+
+	touched = False
+
+	for filename, (mtime, size) in stats.items():
+		recorded_mtime, recorded_size, digest = recorded[filename]
+
+		if size != recorded_size:
+			return True
+		if mtime == recorded_mtime:
+			continue
+		if _hash(docs_dir / filename) != digest:
+			return True
+
+		recorded[filename] = [mtime, size, digest]
+		touched = True
+
+	if touched:
+		_write_manifest(docs_dir, command, recorded)
+
+	return False
+
+
+def build_docs(docs_dir: PathLike, force: bool = False) -> bool:
+	"""
+	Build the HTML documentation with Sphinx, unless the sources have not changed since the last build.
+
+	:param docs_dir: The directory containing the documentation.
+	:param force: Build the documentation even if the sources have not changed.
+
+	:returns: Whether the documentation was built.
+
+	:raises: :exc:`subprocess.CalledProcessError` if Sphinx fails.
+	"""
+
+	docs_dir = PathPlus(docs_dir)
+
+	# The sources are recorded before building so that changes made during the build are picked up next time.
+	stats = scan_sources(docs_dir)
+
+	if not force and not sources_changed(docs_dir, stats):
+		return False
+
+	# Hash the sources before building, reusing the recorded hashes of files which haven't been touched.
+	command = sphinx_command(docs_dir)
+	recorded = _load_manifest(docs_dir, command) or {}
+	files = {}
+
+	for filename, (mtime, size) in stats.items():
+		previous = recorded.get(filename)
+		if previous is not None and previous[:2] == [mtime, size]:
+			files[filename] = previous
+		else:
+			files[filename] = [mtime, size, _hash(docs_dir / filename)]
+
+	subprocess.run(command, check=True)  # nosec: B603
+	_write_manifest(docs_dir, command, files)
+
+	return True
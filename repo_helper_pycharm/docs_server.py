@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+#
+#  docs_server.py
+"""
+A static web server for a project's built documentation.
+
+The server is used when PyCharm's built-in web server isn't running.
+
+.. versionadded:: 0.4.0
+"""
+#
+#  Copyright © 2020 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+#  EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+#  MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+#  IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+#  DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+#  OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+#  OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+# stdlib
+import os
+import socket
+import threading
+from email.utils import formatdate, parsedate_to_datetime
+from functools import partial
+from http import HTTPStatus
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, BinaryIO, Optional, Tuple
+
+# 3rd party
+from domdf_python_tools.typing import PathLike
+
+__all__ = ("DocsRequestHandler", "is_port_open", "make_server", "serve_in_thread")
+
+
+def is_port_open(port: int, host: str = "localhost", timeout: float = 0.2) -> bool:
+	"""
+	Returns whether a server is accepting connections on the given port.
+
+	:param port:
+	:param host:
+	:param timeout: The maximum time to wait for a connection, in seconds.
+	"""
+
+	try:
+		with socket.create_connection((host, port), timeout=timeout):
+			return True
+	except OSError:
+		return False
+
+
+class DocsRequestHandler(SimpleHTTPRequestHandler):
+	"""
+	Serves static files from a directory.
+
+	Files are sent with :meth:`socket.socket.sendfile`, which avoids copying them through Python where possible.
+	Responses carry ``ETag`` and ``Last-Modified`` headers,
+	and conditional requests for unchanged files receive ``304 Not Modified``.
+	"""
+
+	protocol_version = "HTTP/1.1"
+
+	def log_message(self, format: str, *args: Any) -> None:  # noqa: A002  # pylint: disable=redefined-builtin
+		"""
+		Requests are not logged.
+		"""
+
+	def do_GET(self) -> None:  # noqa: D102
+		fp = self.send_head()
+
+		if fp is not None:
+			try:
+				self.connection.sendfile(fp)
+			except (BrokenPipeError, ConnectionResetError):  # pragma: no cover
+				pass
+			finally:
+				fp.close()
+
+	def do_HEAD(self) -> None:  # noqa: D102
+		fp = self.send_head()
+
+		if fp is not None:
+			fp.close()
+
+	def send_head(self) -> Optional[BinaryIO]:
+		"""
+		Send the response headers, and return the file to send as the body, if any.
+		"""
+
+		path = self.translate_path(self.path)
+
+		if os.path.isdir(path):
+			if not self.path.split('?', 1)[0].endswith('/'):
+				self.send_response(HTTPStatus.MOVED_PERMANENTLY)
+				self.send_header("Location", self.path.split('?', 1)[0] + '/')
+				self.send_header("Content-Length", '0')
+				self.end_headers()
+				return None
+
+			path = os.path.join(path, "index.html")
+
+		try:
+			fp = open(path, "rb")
+		except OSError:
+			self.send_error(HTTPStatus.NOT_FOUND, "File not found")
+			return None
+
+		try:
+			stat = os.fstat(fp.fileno())
+			etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+			if self._not_modified(etag, int(stat.st_mtime)):
+				self.send_response(HTTPStatus.NOT_MODIFIED)
+				self.send_header("ETag", etag)
+				self.end_headers()
+				fp.close()
+				return None
+
+			self.send_response(HTTPStatus.OK)
+			self.send_header("Content-Type", self.guess_type(path))
+			self.send_header("Content-Length", str(stat.st_size))
+			self.send_header("Last-Modified", formatdate(stat.st_mtime, usegmt=True))
+			self.send_header("ETag", etag)
+			self.send_header("Cache-Control", "no-cache")
+			self.end_headers()
+			return fp
+
+		except Exception:  # pragma: no cover
+			fp.close()
+			raise
+
+	def _not_modified(self, etag: str, mtime: int) -> bool:
+		if "If-None-Match" in self.headers:
+			return etag in {tag.strip() for tag in self.headers["If-None-Match"].split(',')}
+
+		if "If-Modified-Since" in self.headers:
+			try:
+				since = parsedate_to_datetime(self.headers["If-Modified-Since"])
+			except (TypeError, ValueError, IndexError):
+				return False
+
+			return since is not None and mtime <= since.timestamp()
+
+		return False
+
+
+def make_server(directory: PathLike, port: int = 0, host: str = "localhost") -> ThreadingHTTPServer:
+	"""
+	Create a threaded web server for the files in ``directory``.
+
+	:param directory:
+	:param port: The port to listen on. If ``0`` a free port is chosen.
+	:param host: The address to listen on.
+	"""
+
+	handler = partial(DocsRequestHandler, directory=os.fspath(directory))
+	server = ThreadingHTTPServer((host, port), handler)
+	server.daemon_threads = True
+	return server
+
+
+def serve_in_thread(
+		directory: PathLike,
+		port: int = 0,
+		host: str = "localhost",
+		) -> Tuple[ThreadingHTTPServer, threading.Thread]:
+	"""
+	Start a web server for the files in ``directory`` in a background thread.
+
+	Call :meth:`~socketserver.BaseServer.shutdown` on the returned server to stop it.
+
+	:param directory:
+	:param port: The port to listen on. If ``0`` a free port is chosen.
+	:param host: The address to listen on.
+	"""
+
+	server = make_server(directory, port, host)
+	thread = threading.Thread(target=server.serve_forever, daemon=True)
+	thread.start()
+	return server, thread
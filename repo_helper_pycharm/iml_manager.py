@@ -27,7 +27,12 @@ Class to update PyCharm's ``*.iml`` configuration files.
 #
 
 # stdlib
+import copy
+import os
 import posixpath
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Iterable, List, NamedTuple, Optional, Set, Tuple
 
 # 3rd party
 import click  # type: ignore[import-untyped]
@@ -35,19 +40,82 @@ import lxml  # type: ignore[import-untyped]
 import lxml.etree  # type: ignore[import-untyped]
 from consolekit.utils import coloured_diff
 from domdf_python_tools.paths import PathPlus, unwanted_dirs
-from domdf_python_tools.stringlist import StringList
 from domdf_python_tools.typing import PathLike
 from lxml import objectify
-from repo_helper.core import RepoHelper
 
-__all__ = ("ImlManager", )
+# this package
+from repo_helper_pycharm.modules import get_module_files
+from repo_helper_pycharm.profiling import phase
+from repo_helper_pycharm.settings import PycharmSettings, load_settings
+from repo_helper_pycharm.streaming import stream_transforms
+from repo_helper_pycharm.transaction import IdeaTransaction
+from repo_helper_pycharm.transforms import (
+		ChangeCallback,
+		Transform,
+		apply_transforms,
+		find_changes,
+		get_transforms
+		)
+from repo_helper_pycharm.xml_diff import StructuralChange, diff_components, format_changes
+
+if TYPE_CHECKING:
+	# 3rd party
+	from repo_helper.core import RepoHelper
+
+__all__ = ("ImlManager", "Change")
+
+_trailing_whitespace = re.compile(rb"[^\S\n]+$", flags=re.MULTILINE)
+
+
+def _split_lines(content: bytes) -> List[str]:
+	return content.decode("UTF-8").replace("\r\n", "\n").split("\n")
+
+
+def _diff(filename: str, original: List[str], updated: List[str]) -> str:
+	with phase("diff"):
+		return coloured_diff(original, updated, filename, filename, "(original)", "(updated)", lineterm='')
+
+
+class Change(NamedTuple):
+	"""
+	A change to a module file found by :meth:`ImlManager.check <.ImlManager.check>`.
+
+	.. versionadded:: 0.4.0
+	"""
+
+	#: The module file which would be changed.
+	module_file: PathPlus
+
+	#: The name of the transform which would change the component.
+	transform: str
+
+	#: The name of the component which would be changed.
+	component: str
+
+
+class _WriteTransaction(IdeaTransaction):
+	# Records the time taken to commit in the "write" phase.
+
+	def commit(self) -> List[PathPlus]:
+		with phase("write"):
+			return super().commit()
 
 
 class ImlManager:
 	"""
 	Class to update PyCharm's ``*.iml`` configuration files.
 
+	Every module listed in ``.idea/modules.xml`` is updated.
+
 	:param repo_dir:
+	:param settings: The settings from ``repo_helper.yml``. If not given they are loaded from ``repo_dir``.
+	:param excluded_dirs: The directories to exclude from indexing, in addition to the documentation build directory
+		and any already excluded. Defaults to :attr:`ImlManager.excluded_dirs <.ImlManager.excluded_dirs>`.
+
+	.. versionchanged:: 0.4.0
+
+		* Added the ``settings`` and ``excluded_dirs`` arguments.
+		* All modules in the project are now updated, not only the first ``*.iml`` file found.
 	"""
 
 	excluded_dirs = {
@@ -58,127 +126,432 @@ class ImlManager:
 			"htmlcov",
 			}
 
-	def __init__(self, repo_dir: PathLike):
-		self.rh = RepoHelper(repo_dir)
-		self.rh.load_settings()
-
-		if not (self.rh.target_repo / ".idea").is_dir():  # pragma: no cover
+	#: Glob patterns for the names of files and directories to exclude from indexing.
+	#:
+	#: .. versionadded:: 0.4.0
+	exclude_patterns: Set[str] = set()
+
+	def __init__(
+			self,
+			repo_dir: PathLike,
+			settings: Optional[PycharmSettings] = None,
+			excluded_dirs: Optional[Iterable[str]] = None,
+			):
+		if settings is None:
+			with phase("settings"):
+				settings = load_settings(repo_dir)
+
+		#: The settings from ``repo_helper.yml``.
+		self.settings: PycharmSettings = settings
+
+		if not (self.settings.target_repo / ".idea").is_dir():  # pragma: no cover
 			raise FileNotFoundError("'.idea' directory not found. Perhaps this isn't a PyCharm project?")
 
-		try:
-			self.module_file: PathPlus = next((self.rh.target_repo / ".idea").glob("*.iml"))
-		except StopIteration:
+		#: The ``*.iml`` files of the project's modules.
+		with phase("modules"):
+			self.module_files: List[PathPlus] = get_module_files(self.settings.target_repo)
+
+		if not self.module_files:
 			raise FileNotFoundError("No '.idea/*.iml' file found. Perhaps this isn't a PyCharm project?")
 
-		module_config = objectify.parse(str(self.module_file))
-		self.root = module_config.getroot()
+		#: The module file which :attr:`~.root` refers to.
+		self.module_file: PathPlus = self.module_files[0]
+
+		#: The module files which were changed by the last call to :meth:`~.run` or :meth:`~.run_streaming`.
+		self.changed_files: List[PathPlus] = []
+
+		#: The changes made by the last call to :meth:`~.update` with ``structural=True``.
+		#:
+		#: .. versionadded:: 0.4.0
+		self.structural_changes: List[StructuralChange] = []
+
+		self._root: Optional[objectify.ObjectifiedElement] = None
+		self._rh: Optional["RepoHelper"] = None
+
+		self.excluded_dirs = set(self.excluded_dirs if excluded_dirs is None else excluded_dirs)
+		self.exclude_patterns = set(self.exclude_patterns)
+		self.excluded_dirs.add(posixpath.join(self.settings.docs_dir, "build"))
+
+	@property
+	def root(self) -> objectify.ObjectifiedElement:
+		"""
+		The root element of the module file.
+
+		.. versionchanged:: 0.4.0  The file is now only parsed when this is first accessed.
+		"""
+
+		if self._root is None:
+			with phase("parse"):
+				self._root = objectify.parse(str(self.module_file)).getroot()
+
+		return self._root
+
+	@property
+	def rh(self) -> "RepoHelper":
+		"""
+		A :class:`~repo_helper.core.RepoHelper` for the repository, with its settings loaded.
+
+		.. versionchanged:: 0.4.0  This is now only created when first accessed.
+		"""
+
+		if self._rh is None:
+			# 3rd party
+			from repo_helper.core import RepoHelper
+
+			with phase("repo_helper"):
+				self._rh = RepoHelper(self.settings.target_repo)
+				self._rh.load_settings()
 
-		self.excluded_dirs = set(self.excluded_dirs)
-		self.excluded_dirs.add(posixpath.join(self.rh.templates.globals["docs_dir"], "build"))
+		return self._rh
 
-	def run(self, show_diff: bool = False) -> int:
+	def run(self, show_diff: bool = False, transforms: Optional[Iterable["Transform"]] = None) -> int:
 		"""
-		Update the configuration in the file.
+		Update the configuration in each module file.
+
+		The module files are processed concurrently.
 
 		:param show_diff: Whether to show a diff if changes are made.
+		:param transforms: The transforms to apply. Defaults to all registered transforms.
+
+		:returns: ``1`` if any module file was changed, otherwise ``0``.
+
+		.. versionchanged:: 0.4.0  Added the ``transforms`` argument.
 		"""
 
-		self.update_excludes()
-		self.update_runner()
-		self.remove_docstring_format()
-		return self.write_out(show_diff)
+		changed_files, diff = self.update(transforms, show_diff)
 
-	def write_out(self, show_diff: bool = False) -> int:
+		if diff:
+			click.echo(diff, nl=False)
+
+		return int(bool(changed_files))
+
+	def run_streaming(self, show_diff: bool = False, transforms: Optional[Iterable["Transform"]] = None) -> int:
 		"""
-		Write the modified output to file.
+		Update the configuration in each module file without parsing the whole file.
+
+		Only the components targeted by the transforms are parsed and rewritten;
+		the rest of the file is copied through unchanged.
+		This keeps memory use low for very large files.
+
+		.. versionadded:: 0.4.0
 
 		:param show_diff: Whether to show a diff if changes are made.
+		:param transforms: The transforms to apply. Defaults to all registered transforms.
+
+		:returns: ``1`` if any module file was changed, otherwise ``0``.
+		"""
+
+		changed_files, diff = self.update(transforms, show_diff, stream=True)
+
+		if diff:
+			click.echo(diff, nl=False)
+
+		return int(bool(changed_files))
+
+	def update(
+			self,
+			transforms: Optional[Iterable["Transform"]] = None,
+			show_diff: bool = False,
+			stream: bool = False,
+			transaction: Optional[IdeaTransaction] = None,
+			structural: bool = False,
+			) -> Tuple[List[PathPlus], str]:
+		"""
+		Update the configuration in each module file, without printing anything.
+
+		The module files are processed concurrently, and the changed files are written together
+		in a single :class:`~.IdeaTransaction`. The ``.idea`` directory is locked while the files
+		are read, transformed and written, so concurrent runs don't overwrite each other's changes.
+
+		.. versionadded:: 0.4.0
+
+		:param transforms: The transforms to apply. Defaults to all registered transforms.
+		:param show_diff: Whether to return a diff of the changes.
+		:param stream: Whether to rewrite the files without parsing them fully. See :meth:`~.run_streaming`.
+		:param transaction: If given, the changes are added to this transaction rather than written immediately.
+		:param structural: Whether to compare the changed components structurally rather than diffing the files.
+			The changes are stored in :attr:`~.structural_changes`, and the diff is a summary of them.
+
+		:returns: The module files which were changed, and the diff if ``show_diff`` is :py:obj:`True`.
 		"""
 
-		modified_xml = StringList(['<?xml version="1.0" encoding="UTF-8"?>'])
-		modified_xml.append(lxml.etree.tostring(self.root, pretty_print=True).decode("UTF-8"))
-		modified_xml.blankline(ensure_single=True)
+		transforms = list(get_transforms().values() if transforms is None else transforms)
+
+		if transaction is None:
+			with self._transaction() as transaction:
+				return self.update(transforms, show_diff, stream, transaction, structural)
+
+		with transaction.locked():
+			# Read the module files while the lock is held, so no other process can change them
+			# between being read and being written.
+			self._root = None
+			return self._update(transforms, show_diff, stream, transaction, structural)
+
+	def _update(
+			self,
+			transforms: List["Transform"],
+			show_diff: bool,
+			stream: bool,
+			transaction: IdeaTransaction,
+			structural: bool,
+			) -> Tuple[List[PathPlus], str]:
+		def process(manager: ImlManager) -> Tuple[int, str]:
+			changes: Optional[List[StructuralChange]] = [] if structural else None
+			unified_diff = show_diff and not structural
+
+			if stream:
+				status, diff = manager._stream_module(unified_diff, transforms, transaction, changes)
+			else:
+				manager.apply_transforms(transforms, changes)
+				status, diff = manager._write_module(unified_diff, transaction)
+
+			if changes is not None and status:
+				manager.structural_changes = changes
+				if show_diff:
+					diff = format_changes(changes, self.settings.target_repo).rstrip('\n')
+
+			return status, diff
+
+		managers = self._module_managers()
+
+		if len(managers) == 1:
+			results = [process(self)]
+		else:
+			with ThreadPoolExecutor(max_workers=min(len(managers), os.cpu_count() or 1)) as executor:
+				results = list(executor.map(process, managers))
+
+		self.changed_files = [manager.module_file for manager, (status, _) in zip(managers, results) if status]
+		self.structural_changes = [
+				change for manager, (status, _) in zip(managers, results) if status
+				for change in manager.structural_changes
+				]
+		diff = ''.join(f"{diff}\n" for _, diff in results if diff)
+
+		return list(self.changed_files), diff
+
+	def _transaction(self) -> IdeaTransaction:
+		return _WriteTransaction(self.settings.target_repo / ".idea")
+
+	def _module_managers(self) -> List["ImlManager"]:
+		# Returns a manager for each module file, with this manager for the first.
+		# Each has its own copy of the excluded directories, as the excludes transform adds to them.
+
+		managers = [self]
+
+		for module_file in self.module_files[1:]:
+			manager = copy.copy(self)
+			manager.module_file = module_file
+			manager._root = None
+			manager.structural_changes = []
+			manager.excluded_dirs = set(self.excluded_dirs)
+			manager.exclude_patterns = set(self.exclude_patterns)
+			managers.append(manager)
+
+		return managers
+
+	def _stream_module(
+			self,
+			show_diff: bool,
+			transforms: Iterable["Transform"],
+			transaction: IdeaTransaction,
+			changes: Optional[List[StructuralChange]] = None,
+			) -> Tuple[int, str]:
+		tmp_file = self.module_file.with_name(f".{self.module_file.name}.{os.getpid()}.stream.tmp")
+		diff = ''
 
-		current_content = self.module_file.read_lines()
+		try:
+			with phase("stream"), tmp_file.open("wb") as fp:
+				changed = stream_transforms(
+						self,
+						self.module_file,
+						fp,
+						transforms,
+						on_change=self._change_recorder(changes),
+						)
 
-		changed = current_content != list(modified_xml)
+			if changed and show_diff:
+				diff = _diff(self.module_file.name, self.module_file.read_lines(), tmp_file.read_lines())
+
+		except BaseException:
+			tmp_file.unlink(missing_ok=True)
+			raise
 
 		if not changed:
-			return 0
+			tmp_file.unlink()
+			return 0, diff
 
-		if show_diff:
-			click.echo(
-					coloured_diff(
-							current_content,
-							list(modified_xml),
-							self.module_file.name,
-							self.module_file.name,
-							"(original)",
-							"(updated)",
-							lineterm='',
-							)
-					)
-
-		self.module_file.write_lines(modified_xml)
-
-		return 1
+		transaction.replace(self.module_file, tmp_file)
+		return 1, diff
 
-	def update_excludes(self) -> None:
+	def apply_transforms(
+			self,
+			transforms: Optional[Iterable["Transform"]] = None,
+			changes: Optional[List[StructuralChange]] = None,
+			) -> None:
 		"""
-		Update the list of directories which should be excluded from indexing.
+		Apply the given transforms to the file's components in a single pass.
+
+		.. versionadded:: 0.4.0
+
+		:param transforms: Defaults to all registered transforms.
+		:param changes: If given, the changes made to the components are appended to this list.
 		"""
 
-		file_module_dir = "file://$MODULE_DIR$/"
-		mypy_cache_dir = f"{file_module_dir}.mypy_cache"
+		if transforms is None:
+			transforms = get_transforms().values()
 
-		for component in self.root.findall("component"):
-			if component.attrib["name"] != "NewModuleRootManager":
-				continue
+		root = self.root
 
-			# TODO: handle component not existing
+		with phase("transforms"):
+			apply_transforms(self, root, transforms, self._change_recorder(changes))
 
-			for exclude_node in component.content.findall("excludeFolder"):
-				self.excluded_dirs.add(
-						exclude_node.attrib.get(
-								"url",
-								mypy_cache_dir,
-								).split(file_module_dir)[-1],
-						)
-				component.content.remove(exclude_node)
+	def _change_recorder(self, changes: Optional[List[StructuralChange]]) -> Optional[ChangeCallback]:
+		if changes is None:
+			return None
+
+		def on_change(original: objectify.ObjectifiedElement, component: Optional[objectify.ObjectifiedElement]) -> None:
+			with phase("diff"):
+				changes.extend(diff_components(self.module_file, original, component))
 
-			# print(excluded_dirs)
+		return on_change
 
-			for directory in sorted(self.excluded_dirs):
-				node = lxml.objectify.StringElement()  # pylint: disable=loop-invariant-statement
-				node.tag = "excludeFolder"
-				node.attrib["url"] = file_module_dir + directory
-				component.content.append(node)
+	def check(self, transforms: Optional[Iterable["Transform"]] = None, first_only: bool = True) -> List[Change]:
+		"""
+		Returns the changes the transforms would make to the module files, without writing them.
 
-		return
+		The components are compared before and after each transform, so unlike :meth:`~.run`
+		nothing is serialised, and changes to the files' formatting alone are not reported.
+		The parsed files are modified in memory.
 
-	def update_runner(self) -> None:
+		.. versionadded:: 0.4.0
+
+		:param transforms: The transforms to apply. Defaults to all registered transforms.
+		:param first_only: Whether to stop at the first change found.
 		"""
-		Set the project's test runner to pytest.
+
+		transforms = list(get_transforms().values() if transforms is None else transforms)
+		changes = []
+
+		for manager in self._module_managers():
+			root = manager.root
+
+			with phase("check"):
+				for t, component in find_changes(manager, root, transforms, first_only):
+					changes.append(Change(manager.module_file, t.name, component))
+
+			if first_only and changes:
+				break
+
+		return changes
+
+	def detect_excludes(self, time_budget: float = 1.0, max_workers: Optional[int] = None) -> Set[str]:
+		"""
+		Search the repository for directories which should not be indexed, such as virtualenvs and caches,
+		and add them to :attr:`~.excluded_dirs`.
+
+		.. versionadded:: 0.4.0
+
+		:param time_budget: The maximum time to spend searching, in seconds.
+		:param max_workers: The number of threads used to search.
+
+		:returns: The directories which were found.
+
+		.. seealso:: :func:`repo_helper_pycharm.detect.detect_excluded_dirs`
+		"""  # noqa: D400
+
+		# this package
+		from repo_helper_pycharm.detect import detect_excluded_dirs
+
+		with phase("detect"):
+			found = detect_excluded_dirs(self.settings.target_repo, time_budget=time_budget, max_workers=max_workers)
+		self.excluded_dirs.update(found)
+		return found
+
+	def add_git_ignored(self, use_cache: bool = True) -> Set[str]:
+		"""
+		Add the directories which git ignores to :attr:`~.excluded_dirs`.
+
+		.. versionadded:: 0.4.0
+
+		:param use_cache: Whether to use the cached list of ignored directories if it is still valid.
+
+		:returns: The directories which were found.
+
+		.. seealso:: :func:`repo_helper_pycharm.detect.git_ignored_dirs`
+		"""
+
+		# this package
+		from repo_helper_pycharm.detect import git_ignored_dirs
+
+		with phase("git"):
+			found = git_ignored_dirs(self.settings.target_repo, use_cache=use_cache)
+		self.excluded_dirs.update(found)
+		return found
+
+	def to_bytes(self) -> bytes:
+		"""
+		Returns the modified file as it would be written to disk.
+
+		Lines have no trailing whitespace, and the file ends with a single newline.
+
+		.. versionadded:: 0.4.0
+		"""
+
+		root = self.root
+
+		with phase("tostring"):
+			body = _trailing_whitespace.sub(b'', lxml.etree.tostring(root, pretty_print=True))
+		return b'<?xml version="1.0" encoding="UTF-8"?>\n' + body.rstrip() + b'\n'
+
+	def write_out(self, show_diff: bool = False) -> int:
+		"""
+		Write the modified output to file.
+
+		:param show_diff: Whether to show a diff if changes are made.
+		"""
+
+		with self._transaction() as transaction:
+			status, diff = self._write_module(show_diff, transaction)
+
+		if diff:
+			click.echo(diff)
+
+		return status
+
+	def _write_module(self, show_diff: bool, transaction: IdeaTransaction) -> Tuple[int, str]:
+		modified_xml = self.to_bytes()
+		current_content = self.module_file.read_bytes()
+
+		if current_content == modified_xml:
+			return 0, ''
+		elif b"\r\n" in current_content and current_content.replace(b"\r\n", b"\n") == modified_xml:
+			return 0, ''
+
+		diff = ''
+		if show_diff:
+			diff = _diff(self.module_file.name, _split_lines(current_content), _split_lines(modified_xml))
+
+		transaction.write(self.module_file, modified_xml)
+
+		return 1, diff
+
+	def update_excludes(self) -> None:
+		"""
+		Update the list of directories which should be excluded from indexing.
 		"""
 
-		for component in self.root.findall("component"):
-			if component.attrib["name"] != "TestRunnerService":
-				continue
+		self.apply_transforms([get_transforms()["excludes"]])
 
-			for option in component.findall("option"):
-				if option.attrib["name"] == "PROJECT_TEST_RUNNER":
-					option.attrib["value"] = "pytest"
+	def update_runner(self) -> None:
+		"""
+		Set the project's test runner to pytest.
+		"""
 
-		return
+		self.apply_transforms([get_transforms()["test-runner"]])
 
 	def remove_docstring_format(self) -> None:
 		"""
 		Remove any existing option for "PyDocumentationSettings", to revert to the default of reStructuredText.
 		"""
 
-		for component in self.root.findall("component"):
-			if component.attrib["name"] == "PyDocumentationSettings":
-				self.root.remove(component)
-				return
-
-		return
+		self.apply_transforms([get_transforms()["docstring-format"]])
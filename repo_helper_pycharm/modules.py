@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+#
+#  modules.py
+"""
+Find the modules of a PyCharm project.
+
+.. versionadded:: 0.4.0
+"""
+#
+#  Copyright © 2020 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+#  EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+#  MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+#  IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+#  DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+#  OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+#  OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+# This module must not import lxml or repo_helper, as it is used by :mod:`repo_helper_pycharm.cache`.
+
+# stdlib
+from typing import List
+from xml.etree.ElementTree import ParseError, iterparse
+
+# 3rd party
+from domdf_python_tools.paths import PathPlus
+from domdf_python_tools.typing import PathLike
+
+__all__ = ("get_module_files", )
+
+
+def get_module_files(repo_dir: PathLike) -> List[PathPlus]:
+	"""
+	Returns the ``*.iml`` files of the modules in the PyCharm project in ``repo_dir``.
+
+	The modules are listed in ``.idea/modules.xml``.
+	If that file does not exist, or lists no existing modules,
+	the ``*.iml`` files in the ``.idea`` directory are returned instead.
+
+	:param repo_dir:
+	"""
+
+	repo_dir = PathPlus(repo_dir)
+	idea_dir = repo_dir / ".idea"
+	module_files: List[PathPlus] = []
+
+	try:
+		for _, element in iterparse(str(idea_dir / "modules.xml")):
+			if element.tag == "module" and element.get("filepath"):
+				filepath = element.get("filepath", '').replace("$PROJECT_DIR$", str(repo_dir))
+				module_file = PathPlus(filepath)
+
+				if module_file.is_file() and module_file not in module_files:
+					module_files.append(module_file)
+
+	except (FileNotFoundError, ParseError):
+		pass
+
+	if not module_files:
+		module_files = sorted(idea_dir.glob("*.iml"))
+
+	return module_files
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+#
+#  profiling.py
+"""
+Lightweight timing of the phases of ``pycharm`` commands.
+
+Code which may be slow is wrapped in :func:`~.phase`,
+which does nothing unless a :class:`~.Profiler` is active.
+
+.. versionadded:: 0.4.0
+"""
+#
+#  Copyright © 2020 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+#  EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+#  MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+#  IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+#  DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+#  OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+#  OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+# stdlib
+import functools
+import json
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, Callable, ContextManager, Dict, Iterator, List, Optional, TypeVar
+
+# 3rd party
+import click  # type: ignore[import-untyped]
+
+__all__ = ("Profiler", "phase", "profiling", "profile_options")
+
+_C = TypeVar("_C", bound=Callable)
+
+#: The active profiler, if any.
+_active: Optional["Profiler"] = None
+
+_disabled: ContextManager = nullcontext()
+
+
+class Profiler:
+	"""
+	Records the total time spent in, and the number of entries to, each phase.
+
+	Phases entered from several threads at once are each counted in full,
+	so the total of the phases may exceed the elapsed time.
+	"""
+
+	def __init__(self):
+		self.start = time.perf_counter()
+		self.elapsed: Optional[float] = None
+
+		#: Mapping of phase names to the total time spent in each, in seconds.
+		self.timings: Dict[str, float] = {}
+
+		#: Mapping of phase names to the number of times each was entered.
+		self.calls: Dict[str, int] = {}
+
+		self._lock = threading.Lock()
+
+	def add(self, name: str, seconds: float) -> None:
+		"""
+		Record time spent in a phase.
+
+		:param name:
+		:param seconds:
+		"""
+
+		with self._lock:
+			self.timings[name] = self.timings.get(name, 0.0) + seconds
+			self.calls[name] = self.calls.get(name, 0) + 1
+
+	def stop(self) -> None:
+		"""
+		Record the total elapsed time.
+		"""
+
+		self.elapsed = time.perf_counter() - self.start
+
+	def to_dict(self) -> Dict[str, Any]:
+		"""
+		Returns the timings as a JSON-serialisable dictionary.
+		"""
+
+		return {
+				"total": self.elapsed,
+				"phases": {
+						name: {"seconds": seconds, "calls": self.calls[name]}
+						for name, seconds in self.timings.items()
+						},
+				}
+
+	def format(self) -> str:
+		"""
+		Returns the timings formatted as a table.
+		"""
+
+		width = max([len("total"), *map(len, self.timings)])
+		lines: List[str] = [f"{'Phase':<{width}}  {'Time (ms)':>10}  {'Calls':>6}"]
+
+		for name, seconds in self.timings.items():
+			lines.append(f"{name:<{width}}  {seconds * 1000:>10.3f}  {self.calls[name]:>6}")
+
+		if self.elapsed is not None:
+			lines.append(f"{'total':<{width}}  {self.elapsed * 1000:>10.3f}")
+
+		return '\n'.join(lines)
+
+
+class _Phase:
+
+	def __init__(self, profiler: Profiler, name: str):
+		self.profiler = profiler
+		self.name = name
+
+	def __enter__(self) -> None:
+		self.start = time.perf_counter()
+
+	def __exit__(self, *args: Any) -> None:
+		self.profiler.add(self.name, time.perf_counter() - self.start)
+
+
+def phase(name: str) -> ContextManager:
+	"""
+	Returns a context manager which records the time spent within it under ``name``.
+
+	If profiling is not enabled the context manager does nothing.
+
+	:param name:
+	"""
+
+	if _active is None:
+		return _disabled
+
+	return _Phase(_active, name)
+
+
+@contextmanager
+def profiling(
+		report: bool = True,
+		json_file: Optional[str] = None,
+		cprofile_file: Optional[str] = None,
+		) -> Iterator[Profiler]:
+	"""
+	Context manager to enable profiling within its body.
+
+	:param report: Whether to print a breakdown of the timings to stderr at the end.
+	:param json_file: If given, the timings are written to this file as JSON.
+	:param cprofile_file: If given, the body is also run under :mod:`cProfile`
+		and the statistics are written to this file.
+	"""
+
+	global _active
+
+	profiler = Profiler()
+	previous, _active = _active, profiler
+
+	if cprofile_file:
+		# stdlib
+		import cProfile
+
+		cprofiler: Optional[cProfile.Profile] = cProfile.Profile()
+		cprofiler.enable()  # type: ignore[union-attr]
+	else:
+		cprofiler = None
+
+	try:
+		yield profiler
+	finally:
+		profiler.stop()
+		_active = previous
+
+		if cprofiler is not None and cprofile_file:
+			cprofiler.disable()
+			cprofiler.dump_stats(cprofile_file)
+
+		if json_file:
+			with open(json_file, 'w', encoding="UTF-8") as fp:
+				json.dump(profiler.to_dict(), fp, indent=2)
+
+		if report:
+			click.echo(profiler.format(), err=True)
+
+
+def profile_options(f: _C) -> _C:
+	"""
+	Decorator to add ``--profile`` options to a command.
+
+	Profiling is only set up if one of the options is given.
+
+	:param f: The command's callback.
+	"""
+
+	@functools.wraps(f)
+	def wrapper(
+			*args: Any,
+			profile: bool = False,
+			profile_json: Optional[str] = None,
+			profile_cprofile: Optional[str] = None,
+			**kwargs: Any,
+			) -> Any:
+		if not (profile or profile_json or profile_cprofile):
+			return f(*args, **kwargs)
+
+		with profiling(profile, profile_json, profile_cprofile):
+			return f(*args, **kwargs)
+
+	click.option(
+			"--profile-cprofile",
+			type=click.Path(dir_okay=False, writable=True),
+			default=None,
+			metavar="FILE",
+			help="Run the command under cProfile and write the statistics to FILE.",
+			)(wrapper)
+	click.option(
+			"--profile-json",
+			type=click.Path(dir_okay=False, writable=True),
+			default=None,
+			metavar="FILE",
+			help="Write the time taken by each phase of the command to FILE as JSON.",
+			)(wrapper)
+	click.option(
+			"--profile",
+			is_flag=True,
+			default=False,
+			help="Show the time taken by each phase of the command.",
+			)(wrapper)
+
+	return wrapper  # type: ignore[return-value]
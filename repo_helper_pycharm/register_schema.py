@@ -2,7 +2,12 @@
 #
 #  register_schema.py
 """
-Register the schema mapping for ``repo_helper.yml`` with PyCharm.
+Register JSON schema mappings, such as the one for ``repo_helper.yml``, with PyCharm.
+
+.. versionchanged:: 0.4.0
+
+	Mappings for other files can be registered,
+	from the ``repo_helper_pycharm.schemas`` entry point group and the repository's ``pycharm_schemas.yml`` file.
 """
 #
 #  Copyright © 2020 Dominic Davis-Foster <dominic@davis-foster.co.uk>
@@ -27,83 +32,390 @@ Register the schema mapping for ``repo_helper.yml`` with PyCharm.
 #
 
 # stdlib
-from textwrap import dedent, indent
+import hashlib
+import importlib.util
+import json
+from functools import lru_cache
+from textwrap import indent
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+from xml.sax.saxutils import quoteattr
 
 # 3rd party
+import click  # type: ignore[import-untyped]
 import repo_helper
-from domdf_python_tools.compat import importlib_resources
+from domdf_python_tools.import_tools import discover_entry_points
+from domdf_python_tools.paths import PathPlus, traverse_to_file
 from domdf_python_tools.typing import PathLike
 from domdf_python_tools.words import TAB
 from lxml import etree, objectify  # type: ignore[import-untyped]
-from repo_helper.configuration import dump_schema
-from repo_helper.core import RepoHelper
 
-__all__ = ("register_schema", )
+# this package
+from repo_helper_pycharm.cache import get_cache_dir
+from repo_helper_pycharm.profiling import phase
+from repo_helper_pycharm.transaction import IdeaTransaction
+from repo_helper_pycharm.transforms import _signature
+
+__all__ = (
+		"SchemaMapping",
+		"builtin_mappings",
+		"mappings_filename",
+		"get_schema_mappings",
+		"load_schema_mappings",
+		"register_schema",
+		"get_schema_file",
+		)
+
+
+class SchemaMapping(NamedTuple):
+	"""
+	A mapping between a JSON schema and the files it applies to.
+
+	.. versionadded:: 0.4.0
+	"""
+
+	#: The name of the mapping, which is also used as its key in ``jsonSchemas.xml``.
+	name: str
+
+	#: The path or URL of the schema.
+	schema: str
+
+	#: The paths of the files the schema applies to, relative to the project. These may be glob patterns.
+	patterns: Tuple[str, ...]
+
+
+#: Mappings for files commonly found in ``repo_helper`` projects, in addition to ``repo_helper.yml``.
+#: These are only registered if they are named in the repository's ``pycharm_schemas.yml`` file.
+builtin_mappings: Tuple[SchemaMapping, ...] = (
+		SchemaMapping(
+				"github_workflow",
+				"https://json.schemastore.org/github-workflow.json",
+				(".github/workflows/*.yml", ".github/workflows/*.yaml"),
+				),
+		SchemaMapping(
+				"pre_commit_config",
+				"https://json.schemastore.org/pre-commit-config.json",
+				(".pre-commit-config.yaml", ),
+				),
+		)
+
+
+#: The name of the file in the root of the repository, alongside ``repo_helper.yml``,
+#: which contains additional schema mappings. See :func:`~.load_schema_mappings`.
+mappings_filename = "pycharm_schemas.yml"
+
+
+def _config_digest() -> str:
+	# A digest of the source of repo_helper's configuration definitions, from which the schema is generated.
+	spec = importlib.util.find_spec("repo_helper.configuration")
+	sha = hashlib.sha256()
+
+	if spec is not None and spec.submodule_search_locations:
+		for location in spec.submodule_search_locations:
+			for source_file in sorted(PathPlus(location).glob("*.py")):
+				sha.update(source_file.name.encode("UTF-8"))
+				sha.update(source_file.read_bytes())
+
+	return sha.hexdigest()[:16]
+
+
+def get_schema_file() -> PathPlus:
+	"""
+	Returns the path to the JSON schema for ``repo_helper.yml``.
+
+	The schema is stored in the user's cache directory, and is only regenerated when
+	the version of ``repo_helper`` or its configuration definitions change.
+
+	Nothing is printed; :func:`~.register_schema` reports when the schema is written.
+
+	.. versionadded:: 0.4.0
+	"""
+
+	schema_file = _schema_file_path()
 
+	if not schema_file.is_file():
+		# 3rd party
+		from configconfig.utils import make_schema
+		from repo_helper.configuration import all_values
 
-def register_schema(repo_dir: PathLike) -> None:
+		schema_file.parent.maybe_make(parents=True)
+		schema_file.write_clean(json.dumps(make_schema(*all_values), indent=2))
+
+	return schema_file
+
+
+def _schema_file_path() -> PathPlus:
+	# The path get_schema_file writes the schema to, which may not exist yet.
+	key = f"{repo_helper.__version__}-{_config_digest()}"
+	return get_cache_dir() / "schema" / key / "repo_helper_schema.json"
+
+
+@lru_cache(1)
+def _entry_point_mappings() -> Tuple[SchemaMapping, ...]:
+	return tuple(discover_entry_points("repo_helper_pycharm.schemas", lambda obj: isinstance(obj, SchemaMapping)))
+
+
+def load_schema_mappings(repo_dir: PathLike) -> List[SchemaMapping]:
 	"""
-	Register the schema mapping for ``repo_helper.yml`` with PyCharm.
+	Returns the schema mappings from the repository's ``pycharm_schemas.yml`` file.
+
+	The file is kept separate from ``repo_helper.yml``, which ``repo_helper`` validates against its own schema.
+	It contains a list of mappings with the keys ``name``, ``schema`` and ``patterns``,
+	or the names of :py:data:`~.builtin_mappings` to register:
+
+	.. code-block:: yaml
+
+		- github_workflow
+		- name: tox_ini
+		  schema: https://example.com/tox-schema.json
+		  patterns:
+		    - tox.ini
+
+	.. versionadded:: 0.4.0
 
 	:param repo_dir:
+
+	:returns: The mappings, or an empty list if the file does not exist.
+
+	:raises: :exc:`ValueError` if the content of the file is invalid.
+	"""
+
+	try:
+		target_repo = traverse_to_file(PathPlus(repo_dir), "repo_helper.yml")
+	except FileNotFoundError:
+		target_repo = PathPlus(repo_dir)
+
+	mappings_file = target_repo / mappings_filename
+
+	if not mappings_file.is_file():
+		return []
+
+	# 3rd party
+	from ruamel.yaml import YAML
+
+	items = YAML(typ="safe").load(mappings_file.read_bytes()) or []
+	expected = "expected a list of mappings with the keys 'name', 'schema' and 'patterns'"
+
+	if not isinstance(items, list):
+		raise ValueError(f"Invalid schema mappings in {mappings_file}: {expected}, got {items!r}")
+
+	builtins = {mapping.name: mapping for mapping in builtin_mappings}
+	mappings = []
+
+	for item in items:
+		if isinstance(item, str):
+			if item not in builtins:
+				raise ValueError(
+						f"Unknown schema mapping {item!r} in {mappings_file}. "
+						f"Expected one of {', '.join(map(repr, builtins))}"
+						)
+
+			mappings.append(builtins[item])
+			continue
+
+		try:
+			patterns = item["patterns"]
+			if isinstance(patterns, str):
+				patterns = [patterns]
+			mappings.append(SchemaMapping(str(item["name"]), str(item["schema"]), tuple(map(str, patterns))))
+		except (TypeError, KeyError):
+			raise ValueError(f"Invalid schema mappings in {mappings_file}: {expected}, got {item!r}") from None
+
+	return mappings
+
+
+def get_schema_mappings(repo_dir: PathLike, schema_file: Optional[PathPlus] = None) -> List[SchemaMapping]:
 	"""
+	Returns the schema mappings to register for the repository.
 
-	rh = RepoHelper(repo_dir)
+	These are the mapping for ``repo_helper.yml``, mappings from the ``repo_helper_pycharm.schemas`` entry point group,
+	and mappings from the repository's ``pycharm_schemas.yml`` file (see :func:`~.load_schema_mappings`), in that order.
+	Later mappings replace earlier ones with the same name.
 
-	schema_mapping_file = rh.target_repo / ".idea/jsonSchemas.xml"
+	.. versionadded:: 0.4.0
+
+	:param repo_dir:
+	:param schema_file: The path to the schema for ``repo_helper.yml``. Defaults to the value of :func:`~.get_schema_file`.
+	"""
+
+	if schema_file is None:
+		with phase("schema"):
+			schema_file = get_schema_file()
+
+	mappings: Dict[str, SchemaMapping] = {}
+
+	for mapping in (
+			SchemaMapping("repo_helper_schema", str(schema_file), ("repo_helper.yml", )),
+			*_entry_point_mappings(),
+			*load_schema_mappings(repo_dir),
+			):
+		mappings[mapping.name] = mapping
+
+	return list(mappings.values())
+
+
+def _is_pattern(path: str) -> bool:
+	return any(char in path for char in "*?[")
+
+
+def _entry_xml(mapping: SchemaMapping) -> str:
+	items = []
+
+	for path in mapping.patterns:
+		if _is_pattern(path):
+			items.extend([
+					"<Item>",
+					'\t<option name="pattern" value="true" />',
+					f'\t<option name="path" value={quoteattr(path)} />',
+					'\t<option name="mappingKind" value="Pattern" />',
+					"</Item>",
+					])
+		else:
+			items.extend(["<Item>", f'\t<option name="path" value={quoteattr(path)} />', "</Item>"])
+
+	entry_xml = f"""\
+<entry key={quoteattr(mapping.name)}>
+	<value>
+		<SchemaInfo>
+			<option name="name" value={quoteattr(mapping.name)} />
+			<option name="relativePathToSchema" value={quoteattr(mapping.schema)} />
+			<option name="patterns">
+				<list>
+{indent(chr(10).join(items), TAB * 5)}
+				</list>
+			</option>
+		</SchemaInfo>
+	</value>
+</entry>
+"""
+
+	return indent(entry_xml, '\t').expandtabs(4)
+
+
+def _is_generated(entry: Any) -> bool:
+	# Whether the entry points to a schema generated by get_schema_file, which the user won't have chosen.
+	schema_dir = get_cache_dir() / "schema"
+
+	for option in entry.iter("option"):
+		if option.get("name") == "relativePathToSchema":
+			return PathPlus(option.get("value", '')).is_relative_to(schema_dir)
+
+	return False
+
+
+def _upsert(map_element: Any, mappings: Iterable[SchemaMapping], force: bool = False) -> bool:
+	# Add the entries for the mappings, returning whether any were changed.
+	# Existing entries may have been edited in PyCharm, so they are only replaced if ``force`` is True,
+	# or if they point to an outdated copy of the generated schema for repo_helper.yml.
+	index = {entry.get("key"): entry for entry in map_element.iterchildren("entry")}
+	changed = False
+
+	for mapping in mappings:
+		new_entry = objectify.fromstring(_entry_xml(mapping))
+		entry = index.get(mapping.name)
+
+		if entry is None:
+			map_element.append(new_entry)
+		elif (force or _is_generated(entry)) and _signature(entry) != _signature(new_entry):
+			map_element.replace(entry, new_entry)
+		else:
+			continue
+
+		index[mapping.name] = new_entry
+		changed = True
+
+	return changed
+
+
+def register_schema(
+		repo_dir: PathLike,
+		schema_file: Optional[PathPlus] = None,
+		mappings: Optional[Iterable[SchemaMapping]] = None,
+		transaction: Optional[IdeaTransaction] = None,
+		force: bool = False,
+		) -> bool:
+	"""
+	Register the schema mappings for the repository with PyCharm.
+
+	``.idea/jsonSchemas.xml`` is parsed once, and only written if any of the mappings are added or changed.
+	If ``schema_file`` and ``mappings`` are not given and the schema has not been generated yet,
+	the path to the new schema is printed.
+	Mappings which are already registered are left alone, as they may have been edited in PyCharm,
+	unless ``force`` is :py:obj:`True`. Other mappings in the file are always left alone.
+
+	:param repo_dir:
+	:param schema_file: The path to the schema for ``repo_helper.yml``. Defaults to the value of :func:`~.get_schema_file`.
+	:param mappings: The mappings to register. Defaults to the value of :func:`~.get_schema_mappings`.
+	:param transaction: If given, the file is added to this transaction rather than written immediately.
+	:param force: Whether to replace mappings which are already registered but differ.
+
+	:returns: Whether ``jsonSchemas.xml`` was changed.
+
+	.. versionchanged:: 0.4.0
+
+		* Added the ``schema_file``, ``mappings``, ``transaction`` and ``force`` arguments.
+		* Mappings for other files are registered too.
+		* The function now returns whether the file was changed.
+	"""
+
+	target_repo = traverse_to_file(PathPlus(repo_dir), "repo_helper.yml", "git_helper.yml")
+	schema_mapping_file = target_repo / ".idea/jsonSchemas.xml"
 
 	if not schema_mapping_file.parent.is_dir():  # pragma: no cover
 		raise FileNotFoundError("'.idea' directory not found. Perhaps this isn't a PyCharm project?")
 
-	dump_schema()
-
-	with importlib_resources.path(repo_helper, "repo_helper_schema.json") as schema_file:
-
-		entry_xml = f"""\
-		<entry key="repo_helper_schema">
-			<value>
-				<SchemaInfo>
-					<option name="name" value="repo_helper_schema" />
-					<option name="relativePathToSchema" value="{str(schema_file)}" />
-					<option name="patterns">
-						<list>
-							<Item>
-								<option name="path" value="repo_helper.yml" />
-							</Item>
-						</list>
-					</option>
-				</SchemaInfo>
-			</value>
-		</entry>
-		"""
-
-		entry_xml = indent(dedent(entry_xml), '\t').expandtabs(4)
+	if mappings is None:
+		if schema_file is None and not _schema_file_path().is_file():
+			with phase("schema"):
+				schema_file = get_schema_file()
+			click.echo(f"Wrote schema to {schema_file}")
+
+		mappings = get_schema_mappings(target_repo, schema_file)
+	else:
+		mappings = list(mappings)
+
+	if transaction is None:
+		with IdeaTransaction(schema_mapping_file.parent) as transaction:
+			changed = register_schema(target_repo, schema_file, mappings, transaction, force)
+			with phase("write"):
+				transaction.commit()
+
+		return changed
+
+	# Read the file while the lock is held, so no other process can change it before it is written.
+	with transaction.locked():
+		content = _updated_content(schema_mapping_file, mappings, force)
+
+	if content is None:
+		return False
+
+	transaction.write(schema_mapping_file, content)
+	return True
+
+
+def _updated_content(schema_mapping_file: PathPlus, mappings: List[SchemaMapping], force: bool) -> Optional[str]:
+	# Returns the new content of jsonSchemas.xml, or None if it is unchanged.
 
 	if not schema_mapping_file.is_file():
+		entries_xml = ''.join(_entry_xml(mapping) for mapping in mappings)
 		mapping_xml = f"""\
-	<?xml version="1.0" encoding="UTF-8"?>
-	<project version="4">
-		<component name="JsonSchemaMappingsProjectConfiguration">
-			<state>
-				<map>
-	{indent(entry_xml, TAB*4)[1:-1]}
-				</map>
-			</state>
-		</component>
-	</project>
-	"""
+<?xml version="1.0" encoding="UTF-8"?>
+<project version="4">
+	<component name="JsonSchemaMappingsProjectConfiguration">
+		<state>
+			<map>
+{indent(entries_xml, TAB * 3).expandtabs(4)}\
+			</map>
+		</state>
+	</component>
+</project>
+"""
 
-		schema_mapping_file.write_clean(dedent(mapping_xml).expandtabs(4))
+		return mapping_xml.expandtabs(4)
 
-	else:
-		schema = objectify.parse(str(schema_mapping_file))
-		root = schema.getroot()
-		# printr(root)
-
-		for entry in root.component.state.map.findall("entry"):
-			# printr(entry)
-			if entry.attrib["key"] == "repo_helper_schema":
-				break
-		else:
-			root.component.state.map.append(objectify.fromstring(entry_xml))
-			schema_mapping_file.write_clean(etree.tostring(root, pretty_print=True).decode("UTF-8"))
+	with phase("parse"):
+		root = objectify.parse(str(schema_mapping_file)).getroot()
+
+	if not _upsert(root.component.state.map, mappings, force):
+		return None
+
+	return '<?xml version="1.0" encoding="UTF-8"?>\n' + etree.tostring(root, pretty_print=True).decode("UTF-8")
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+#
+#  settings.py
+"""
+Read the settings needed by the ``pycharm`` commands from ``repo_helper.yml``.
+
+This is much faster than :meth:`repo_helper.core.RepoHelper.load_settings`,
+which parses and validates the whole configuration.
+
+The settings are cached in the user's cache directory, keyed by a hash of the content of ``repo_helper.yml``
+and the versions of ``repo_helper`` and ``repo_helper_pycharm``,
+so the file is only parsed the first time a given version of it is seen.
+
+.. versionadded:: 0.4.0
+"""
+#
+#  Copyright © 2020 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+#  EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+#  MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+#  IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+#  DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+#  OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+#  OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+# stdlib
+import hashlib
+import importlib.util
+import json
+import re
+from typing import Any, Dict, NamedTuple, Optional
+
+# 3rd party
+from domdf_python_tools.paths import PathPlus, traverse_to_file
+from domdf_python_tools.typing import PathLike
+
+# this package
+from repo_helper_pycharm.cache import get_cache_dir
+from repo_helper_pycharm.transaction import atomic_write
+
+__all__ = ("PycharmSettings", "load_settings", "load_settings_full")
+
+# The defaults used by repo_helper.
+_defaults: Dict[str, Any] = {"docs_dir": "doc-source", "enable_docs": True}
+
+
+class PycharmSettings(NamedTuple):
+	"""
+	The settings from ``repo_helper.yml`` which are used by the ``pycharm`` commands.
+	"""
+
+	#: The root of the repository, containing the ``repo_helper.yml`` file.
+	target_repo: PathPlus
+
+	#: The directory containing the documentation.
+	docs_dir: str
+
+	#: Whether the repository has documentation.
+	enable_docs: bool
+
+
+def _is_templated(value: Any) -> bool:
+	return isinstance(value, str) and ("{{" in value or "{%" in value)
+
+
+def _repo_helper_version() -> str:
+	# Read the version from the source, as importing repo_helper is slow.
+	spec = importlib.util.find_spec("repo_helper")
+
+	if spec is None or spec.origin is None:  # pragma: no cover
+		return ''
+
+	with open(spec.origin, encoding="UTF-8") as fp:
+		match = re.search(r"^__version__(?:\s*:\s*str)?\s*=\s*[\"']([^\"']+)[\"']", fp.read(), flags=re.MULTILINE)
+
+	return match.group(1) if match else ''
+
+
+def _cache_file(content: bytes) -> PathPlus:
+	# this package
+	from repo_helper_pycharm import __version__
+
+	sha = hashlib.sha256(content)
+
+	for part in (_repo_helper_version(), __version__):
+		sha.update(b'\0')
+		sha.update(part.encode("UTF-8"))
+
+	return get_cache_dir() / "settings" / f"{sha.hexdigest()}.json"
+
+
+def _read_cache(cache_file: PathPlus) -> Optional[Dict[str, Any]]:
+	try:
+		values = json.loads(cache_file.read_text())
+	except (OSError, ValueError):
+		return None
+
+	if not isinstance(values, dict) or values.keys() != _defaults.keys():
+		return None
+
+	return values
+
+
+def load_settings(repo_dir: PathLike, use_cache: bool = True) -> PycharmSettings:
+	"""
+	Load the settings for the repository containing ``repo_dir``.
+
+	Only the required keys are read from ``repo_helper.yml``, without validating the rest of the file.
+	The full loader (:func:`~.load_settings_full`) is used if the values need to be rendered or
+	converted by ``repo_helper``, or if the legacy ``git_helper.yml`` file is present.
+
+	:param repo_dir:
+	:param use_cache: Whether to use the cached settings if ``repo_helper.yml`` has been read before.
+
+	:raises: :exc:`FileNotFoundError` if the repository has no ``repo_helper.yml`` file.
+	"""
+
+	target_repo = traverse_to_file(PathPlus(repo_dir), "repo_helper.yml", "git_helper.yml")
+	config_file = target_repo / "repo_helper.yml"
+
+	if not config_file.is_file():
+		return load_settings_full(target_repo)
+
+	content = config_file.read_bytes()
+	cache_file = _cache_file(content)
+
+	if use_cache:
+		values = _read_cache(cache_file)
+		if values is not None:
+			return PycharmSettings(target_repo=target_repo, **values)
+
+	settings = _parse_settings(target_repo, content)
+	values = settings._asdict()
+	del values["target_repo"]
+
+	try:
+		atomic_write(cache_file, json.dumps(values))
+	except (OSError, TypeError, ValueError):  # pragma: no cover
+		# The values can't be cached, for example if they aren't JSON serialisable.
+		pass
+
+	return settings
+
+
+def _parse_settings(target_repo: PathPlus, content: bytes) -> PycharmSettings:
+	# 3rd party
+	from ruamel.yaml import YAML
+
+	config = YAML(typ="safe").load(content)
+
+	if not isinstance(config, dict):
+		return load_settings_full(target_repo)
+
+	values = {key: config.get(key, default) for key, default in _defaults.items()}
+
+	if not isinstance(values["docs_dir"], str) or _is_templated(values["docs_dir"]):
+		return load_settings_full(target_repo)
+	if not isinstance(values["enable_docs"], bool):
+		return load_settings_full(target_repo)
+
+	return PycharmSettings(target_repo=target_repo, **values)
+
+
+def load_settings_full(repo_dir: PathLike) -> PycharmSettings:
+	"""
+	Load the settings for the repository containing ``repo_dir`` using
+	:meth:`repo_helper.core.RepoHelper.load_settings`.
+
+	:param repo_dir:
+	"""  # noqa: D400
+
+	# 3rd party
+	from repo_helper.core import RepoHelper
+
+	rh = RepoHelper(repo_dir)
+	rh.load_settings()
+
+	return PycharmSettings(
+			target_repo=rh.target_repo,
+			docs_dir=rh.templates.globals["docs_dir"],
+			enable_docs=rh.templates.globals["enable_docs"],
+			)
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+#
+#  streaming.py
+"""
+Rewrite PyCharm's XML configuration files without building a tree of the whole file.
+
+Only the top-level components targeted by a transform are parsed.
+Everything else, including the untouched components, is copied through byte for byte,
+so memory use depends on the size of the largest targeted component rather than the size of the file.
+
+.. versionadded:: 0.4.0
+"""
+#
+#  Copyright © 2020 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+#  EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+#  MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+#  IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+#  DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+#  OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+#  OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+# stdlib
+import xml.parsers.expat
+from typing import IO, TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+
+# 3rd party
+import lxml.etree  # type: ignore[import-untyped]
+from domdf_python_tools.typing import PathLike
+from lxml import objectify
+
+if TYPE_CHECKING:
+	# this package
+	from repo_helper_pycharm.iml_manager import ImlManager
+	from repo_helper_pycharm.transforms import ChangeCallback, Transform
+
+__all__ = ("stream_transforms", )
+
+_parser = objectify.makeparser(remove_blank_text=True)
+
+
+def _tag_end(buf: bytes, pos: int) -> Tuple[int, bool]:
+	"""
+	Returns the offset just past the end of the tag starting at ``pos``, and whether it is self-closing.
+	"""
+
+	quote = None
+
+	for idx in range(pos, len(buf)):
+		char = buf[idx:idx + 1]
+		if quote is not None:
+			if char == quote:
+				quote = None
+		elif char in {b'"', b"'"}:
+			quote = char
+		elif char == b'>':
+			return idx + 1, buf[idx - 1:idx] == b'/'
+
+	raise ValueError("Unterminated tag")  # pragma: no cover
+
+
+def _serialise(component: objectify.ObjectifiedElement, indent: bytes) -> bytes:
+	lines = lxml.etree.tostring(component, pretty_print=True).rstrip(b"\n").split(b"\n")
+	return b"\n".join([lines[0], *(indent + line for line in lines[1:])])
+
+
+def stream_transforms(
+		manager: "ImlManager",
+		source: PathLike,
+		dest: IO[bytes],
+		transforms: Iterable["Transform"],
+		chunk_size: int = 65536,
+		on_change: Optional["ChangeCallback"] = None,
+		) -> bool:
+	"""
+	Apply the transforms to the top-level components of ``source`` and write the result to ``dest``.
+
+	:param manager:
+	:param source: The XML file to read.
+	:param dest: A file opened for writing in binary mode.
+	:param transforms:
+	:param chunk_size: The number of bytes to read from ``source`` at a time.
+	:param on_change: A function called with the original version of each component changed by the transforms
+		and the component as modified, or :py:obj:`None` if it was removed.
+		The original is only parsed again for components which changed.
+
+	:returns: Whether the output differs from the input.
+	"""
+
+	by_component: Dict[str, List["Transform"]] = {}
+	for t in transforms:
+		by_component.setdefault(t.component, []).append(t)
+
+	# The input which has not been written yet, starting at ``offset`` in the file.
+	buf = b''
+	offset = 0
+	depth = 0
+	changed = False
+
+	# The output from the last newline onwards, held back so a removed component's indentation can be dropped.
+	held = b''
+
+	# Whether a targeted component is currently being read, and the transforms to apply to it.
+	in_target = False
+	target_transforms: List["Transform"] = []
+
+	parser = xml.parsers.expat.ParserCreate()
+
+	def emit(data: bytes) -> None:
+		nonlocal held
+		data = held + data
+		idx = data.rfind(b"\n")
+
+		if idx == -1:
+			held = data
+		else:
+			dest.write(data[:idx])
+			held = data[idx:]
+
+	def flush(upto: int) -> None:
+		nonlocal buf, offset
+		emit(buf[:upto - offset])
+		buf = buf[upto - offset:]
+		offset = upto
+
+	def replace(upto: int) -> None:
+		nonlocal buf, offset, changed, held, in_target
+		original = buf[:upto - offset]
+		buf = buf[upto - offset:]
+		offset = upto
+		in_target = False
+
+		component = objectify.fromstring(original, _parser)
+		before = lxml.etree.tostring(component)
+
+		for t in target_transforms:
+			if t.function(manager, component) is False:
+				changed = True
+				if not held.strip():
+					held = b''
+				if on_change is not None:
+					on_change(objectify.fromstring(original, _parser), None)
+				return
+
+		if lxml.etree.tostring(component) == before:
+			emit(original)
+		else:
+			changed = True
+			if on_change is not None:
+				on_change(objectify.fromstring(original, _parser), component)
+			indent = held.lstrip(b"\n") if not held.strip() else b''
+			emit(_serialise(component, indent))
+
+	def start(name: str, attrs: Dict[str, str]) -> None:
+		nonlocal depth, in_target, target_transforms
+		depth += 1
+
+		if in_target:
+			return
+
+		pos = parser.CurrentByteIndex
+		flush(pos)
+
+		if depth == 2 and name == "component" and attrs.get("name") in by_component:
+			in_target = True
+			target_transforms = by_component[attrs["name"]]
+
+			end, self_closing = _tag_end(buf, 0)
+			if self_closing:
+				replace(end + offset)
+
+	def end(name: str) -> None:
+		nonlocal depth
+		depth -= 1
+
+		if not in_target:
+			flush(parser.CurrentByteIndex)
+		elif depth == 1:
+			replace(_tag_end(buf, parser.CurrentByteIndex - offset)[0] + offset)
+
+	parser.StartElementHandler = start
+	parser.EndElementHandler = end
+
+	with open(source, "rb") as fp:
+		while True:
+			chunk = fp.read(chunk_size)
+			buf += chunk
+			parser.Parse(chunk, not chunk)
+			if not chunk:
+				break
+
+	emit(buf)
+	dest.write(held)
+
+	return changed
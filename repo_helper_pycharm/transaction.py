@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+#
+#  transaction.py
+"""
+Batch the writes to the files in a project's ``.idea`` directory.
+
+The writes are made while holding an advisory lock on the ``.idea`` directory,
+so concurrent runs of ``repo_helper_pycharm`` don't interleave their changes.
+Each file is written to a temporary file which then replaces the original,
+so PyCharm never sees a partially written file.
+Files whose content is unchanged are not written at all.
+
+File locking requires :mod:`fcntl`, and so is not available on Windows.
+
+.. versionadded:: 0.4.0
+"""
+#
+#  Copyright © 2020 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+#  EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+#  MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+#  IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+#  DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+#  OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+#  OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+# stdlib
+import os
+import shutil
+import threading
+from contextlib import ExitStack, contextmanager
+from types import TracebackType
+from typing import Dict, Iterator, List, Optional, Type, Union
+
+# 3rd party
+from domdf_python_tools.paths import PathPlus
+from domdf_python_tools.typing import PathLike
+
+try:
+	# stdlib
+	import fcntl
+except ImportError:  # pragma: no cover (!Windows)
+	fcntl = None  # type: ignore[assignment]
+
+__all__ = ("IdeaTransaction", "atomic_write", "lock_directory")
+
+
+@contextmanager
+def lock_directory(directory: PathLike) -> Iterator[None]:
+	"""
+	Context manager to hold an exclusive advisory lock on ``directory``, waiting for it if necessary.
+
+	On platforms without :mod:`fcntl` no lock is taken.
+
+	:param directory:
+	"""
+
+	if fcntl is None:  # pragma: no cover (!Windows)
+		yield
+		return
+
+	fd = os.open(os.fspath(directory), os.O_RDONLY)
+
+	try:
+		fcntl.flock(fd, fcntl.LOCK_EX)
+		yield
+	finally:
+		# Closing the file descriptor releases the lock.
+		os.close(fd)
+
+
+def _temp_file(path: PathPlus) -> PathPlus:
+	return path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+
+def atomic_write(path: PathLike, content: str) -> None:
+	"""
+	Write ``content`` to a temporary file which then replaces ``path``,
+	so readers never see a partially written file.
+
+	The parent directory is created if it does not exist. No lock is taken.
+
+	:param path:
+	:param content:
+	"""  # noqa: D400
+
+	path = PathPlus(path)
+	path.parent.maybe_make(parents=True)
+	temp_file = _temp_file(path)
+
+	try:
+		temp_file.write_text(content)
+		os.replace(temp_file, path)
+	except BaseException:
+		temp_file.unlink(missing_ok=True)
+		raise
+
+
+class IdeaTransaction:
+	"""
+	Collects the changes to files in a ``.idea`` directory, and writes them together with :meth:`~.commit`.
+
+	When used as a context manager the ``.idea`` directory is locked for the duration of the ``with`` block,
+	and the changes are committed on exit, unless an exception was raised, in which case they are discarded.
+	The files to be changed should be read inside the block (or inside :meth:`~.locked`),
+	so another process can't change them between being read and being written.
+
+	Files can be added from multiple threads.
+
+	:param idea_dir: The ``.idea`` directory.
+	:param fsync: Whether to flush each changed file to disk before it replaces the original.
+	"""
+
+	def __init__(self, idea_dir: PathLike, fsync: bool = True):
+		self.idea_dir = PathPlus(idea_dir)
+		self.fsync = fsync
+		self._pending: Dict[PathPlus, Union[bytes, PathPlus]] = {}
+		self._lock = threading.Lock()
+		self._directory_lock = ExitStack()
+		self._lock_depth = 0
+		self._depth_lock = threading.Lock()
+		self._exit_stack = ExitStack()
+
+	@contextmanager
+	def locked(self) -> Iterator[None]:
+		"""
+		Context manager to hold the lock on the ``.idea`` directory within its body.
+
+		The lock is reentrant, and is also held while the transaction is used as a context manager
+		and while it is being committed.
+		"""
+
+		with self._depth_lock:
+			if not self._lock_depth:
+				self._directory_lock.enter_context(lock_directory(self.idea_dir))
+			self._lock_depth += 1
+
+		try:
+			yield
+		finally:
+			with self._depth_lock:
+				self._lock_depth -= 1
+				if not self._lock_depth:
+					self._directory_lock.close()
+
+	def write(self, path: PathLike, content: Union[str, bytes]) -> None:
+		"""
+		Set the new content of ``path``.
+
+		:param path:
+		:param content: The content, which is encoded as UTF-8 if it is a string.
+		"""
+
+		if isinstance(content, str):
+			content = content.encode("UTF-8")
+
+		self._add(PathPlus(path), content)
+
+	def replace(self, path: PathLike, temp_file: PathLike) -> None:
+		"""
+		Replace ``path`` with ``temp_file``, which must be on the same filesystem.
+
+		This avoids holding large files in memory.
+		``temp_file`` is deleted if the transaction is discarded.
+
+		:param path:
+		:param temp_file:
+		"""
+
+		self._add(PathPlus(path), PathPlus(temp_file))
+
+	def _add(self, path: PathPlus, content: Union[bytes, PathPlus]) -> None:
+		with self._lock:
+			previous = self._pending.get(path)
+			self._pending[path] = content
+
+		if isinstance(previous, PathPlus) and previous != content:
+			previous.unlink(missing_ok=True)
+
+	@property
+	def pending(self) -> List[PathPlus]:
+		"""
+		The files which will be written when the transaction is committed.
+		"""
+
+		return list(self._pending)
+
+	def commit(self) -> List[PathPlus]:
+		"""
+		Write the pending files, skipping any whose content hasn't changed.
+
+		Every changed file is written to a temporary file before any of them replace the originals,
+		so if writing one fails none of the files are changed.
+
+		:returns: The files which were changed.
+		"""
+
+		with self._lock:
+			pending, self._pending = self._pending, {}
+
+		if not pending:
+			return []
+
+		staged: Dict[PathPlus, PathPlus] = {}
+		changed: List[PathPlus] = []
+
+		try:
+			with self.locked():
+				for path, content in pending.items():
+					if isinstance(content, PathPlus):
+						staged[path] = content
+						if self.fsync:
+							_fsync_file(content)
+					elif not _unchanged(path, content):
+						staged[path] = _temp_file(path)
+						_write_bytes(staged[path], content, self.fsync)
+
+				for path, temp_file in staged.items():
+					if path.is_file():
+						shutil.copymode(path, temp_file)
+					os.replace(temp_file, path)
+					changed.append(path)
+
+		finally:
+			for path, content in pending.items():
+				if path not in changed:
+					if isinstance(content, PathPlus):
+						content.unlink(missing_ok=True)
+					if path in staged:
+						staged[path].unlink(missing_ok=True)
+
+		return changed
+
+	def rollback(self) -> None:
+		"""
+		Discard the pending files.
+		"""
+
+		with self._lock:
+			pending, self._pending = self._pending, {}
+
+		for content in pending.values():
+			if isinstance(content, PathPlus):
+				content.unlink(missing_ok=True)
+
+	def __enter__(self) -> "IdeaTransaction":
+		self._exit_stack.enter_context(self.locked())
+		return self
+
+	def __exit__(
+			self,
+			exc_type: Optional[Type[BaseException]],
+			exc_val: Optional[BaseException],
+			exc_tb: Optional[TracebackType],
+			) -> None:
+		with self._exit_stack:
+			if exc_type is None:
+				self.commit()
+			else:
+				self.rollback()
+
+
+def _unchanged(path: PathPlus, content: bytes) -> bool:
+	try:
+		return path.stat().st_size == len(content) and path.read_bytes() == content
+	except FileNotFoundError:
+		return False
+
+
+def _write_bytes(path: PathPlus, content: bytes, fsync: bool) -> None:
+	with open(path, "wb") as fp:
+		fp.write(content)
+		if fsync:
+			fp.flush()
+			os.fsync(fp.fileno())
+
+
+def _fsync_file(path: PathPlus) -> None:
+	with open(path, "rb") as fp:
+		os.fsync(fp.fileno())
@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+#
+#  transforms.py
+"""
+Transforms applied to the components of PyCharm's ``*.iml`` configuration files.
+
+Each transform is registered for a single component name,
+and all transforms are applied in a single pass over the file's components.
+
+Third-party packages can provide additional transforms
+by defining an entry point in the ``repo_helper_pycharm.transforms`` group
+which refers to a :class:`~.Transform` object:
+
+.. code-block:: ini
+
+	[repo_helper_pycharm.transforms]
+	my_transform = my_package:my_transform
+
+.. versionadded:: 0.4.0
+"""
+#
+#  Copyright © 2020 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+#  EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+#  MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+#  IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+#  DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+#  OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+#  OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+# stdlib
+import copy
+import fnmatch
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+# 3rd party
+import lxml.etree  # type: ignore[import-untyped]
+from domdf_python_tools.import_tools import discover_entry_points
+
+if TYPE_CHECKING:
+	# this package
+	from repo_helper_pycharm.iml_manager import ImlManager
+
+__all__ = (
+		"Transform",
+		"TransformFunction",
+		"ChangeCallback",
+		"transform",
+		"get_transforms",
+		"select_transforms",
+		"apply_transforms",
+		"find_changes",
+		"minimal_excludes",
+		"update_excludes",
+		"update_runner",
+		"remove_docstring_format",
+		)
+
+#: The type of the function passed to :func:`~.apply_transforms` to be notified of changed components.
+#: It is called with the original component and the modified component, or :py:obj:`None` if it was removed.
+ChangeCallback = Callable[[Any, Optional[Any]], None]
+
+#: The type of a function which modifies a component in place.
+#: The function may return :py:obj:`False` to remove the component from the file.
+TransformFunction = Callable[["ImlManager", Any], Optional[bool]]
+
+
+class Transform(NamedTuple):
+	"""
+	A transform applied to components with a given name.
+	"""
+
+	#: The name of the transform, used with ``--only`` and ``--skip``.
+	name: str
+
+	#: The value of the ``name`` attribute of the components to apply the transform to.
+	component: str
+
+	#: The function which modifies the component.
+	function: TransformFunction
+
+
+_builtin_transforms: Dict[str, Transform] = {}
+
+
+def transform(name: str, component: str) -> Callable[[TransformFunction], TransformFunction]:
+	"""
+	Decorator to register a function as a built-in transform.
+
+	:param name: The name of the transform.
+	:param component: The value of the ``name`` attribute of the components to apply the transform to.
+	"""
+
+	def deco(function: TransformFunction) -> TransformFunction:
+		_builtin_transforms[name] = Transform(name, component, function)
+		return function
+
+	return deco
+
+
+@lru_cache(1)
+def get_transforms() -> Dict[str, Transform]:
+	"""
+	Returns a mapping of names to transforms, including those provided by third-party packages.
+
+	Entry points are only loaded the first time this function is called.
+	"""
+
+	transforms = dict(_builtin_transforms)
+
+	for obj in discover_entry_points(
+			"repo_helper_pycharm.transforms",
+			lambda obj: isinstance(obj, Transform),
+			):
+		transforms.setdefault(obj.name, obj)
+
+	return transforms
+
+
+def select_transforms(only: Iterable[str] = (), skip: Iterable[str] = ()) -> List[Transform]:
+	"""
+	Returns the transforms to apply.
+
+	:param only: If given, only the transforms with these names are selected.
+	:param skip: The names of transforms not to select.
+
+	:raises: :exc:`ValueError` if any of the names do not correspond to a transform.
+	"""
+
+	transforms = get_transforms()
+	only, skip = set(only), set(skip)
+
+	for name in sorted(only | skip):
+		if name not in transforms:
+			raise ValueError(f"Unknown transform {name!r}. Choose from {', '.join(map(repr, transforms))}")
+
+	return [t for name, t in transforms.items() if (not only or name in only) and name not in skip]
+
+
+def _by_component(transforms: Iterable[Transform]) -> Dict[str, List[Transform]]:
+	by_component: Dict[str, List[Transform]] = {}
+
+	for t in transforms:
+		by_component.setdefault(t.component, []).append(t)
+
+	return by_component
+
+
+def apply_transforms(
+		manager: "ImlManager",
+		root: Any,
+		transforms: Iterable[Transform],
+		on_change: Optional[ChangeCallback] = None,
+		) -> None:
+	"""
+	Apply the given transforms to the top-level components of ``root`` in a single pass.
+
+	:param manager:
+	:param root: The root element of the module file.
+	:param transforms:
+	:param on_change: A function called with a copy of each component changed by the transforms
+		and the component as modified, or :py:obj:`None` if it was removed.
+
+	.. versionchanged:: 0.4.0  Added the ``on_change`` argument.
+	"""
+
+	by_component = _by_component(transforms)
+
+	for component in list(root.iterchildren("component")):
+		component_transforms = by_component.get(component.get("name"), ())
+		if not component_transforms:
+			continue
+
+		original = copy.deepcopy(component) if on_change is not None else None
+
+		for t in component_transforms:
+			if t.function(manager, component) is False:
+				root.remove(component)
+				if on_change is not None:
+					on_change(original, None)
+				break
+		else:
+			if on_change is not None and _signature(original) != _signature(component):
+				on_change(original, component)
+
+
+def _signature(element: Any) -> Tuple:
+	# A comparable representation of an element, ignoring whitespace between elements.
+	return (
+			str(element.tag),
+			tuple(sorted(element.attrib.items())),
+			(element.text or '').strip(),
+			tuple(_signature(child) for child in element.iterchildren()),
+			)
+
+
+def find_changes(
+		manager: "ImlManager",
+		root: Any,
+		transforms: Iterable[Transform],
+		first_only: bool = False,
+		) -> List[Tuple[Transform, str]]:
+	"""
+	Returns the transforms which would change the top-level components of ``root``, and the names of the components.
+
+	The transforms are applied to ``root`` in place, but nothing is serialised.
+
+	.. versionadded:: 0.4.0
+
+	:param manager:
+	:param root: The root element of the module file.
+	:param transforms:
+	:param first_only: Whether to stop at the first transform which changes a component.
+	"""
+
+	by_component = _by_component(transforms)
+	changes = []
+
+	for component in list(root.iterchildren("component")):
+		name = component.get("name")
+
+		for t in by_component.get(name, ()):
+			before = _signature(component)
+			removed = t.function(manager, component) is False
+
+			if removed or _signature(component) != before:
+				changes.append((t, name))
+				if first_only:
+					return changes
+
+			if removed:
+				root.remove(component)
+				break
+
+	return changes
+
+
+def minimal_excludes(paths: Iterable[str], patterns: Iterable[str] = ()) -> List[str]:
+	"""
+	Returns the smallest list of directories which covers all of ``paths``, in sorted order.
+
+	Directories within another directory in ``paths`` are omitted, as excluding a directory also excludes its contents.
+
+	.. versionadded:: 0.4.0
+
+	:param paths: Directories relative to the module directory, separated by forward slashes.
+	:param patterns: Glob patterns matching the names of excluded files and directories.
+		Directories within a directory whose name matches are omitted.
+	"""
+
+	patterns = tuple(patterns)
+	trie: Dict[Optional[str], Any] = {}
+
+	for path in paths:
+		parts = [part for part in path.split('/') if part not in {'', '.'}]
+
+		if not parts or any(fnmatch.fnmatchcase(part, pattern) for part in parts for pattern in patterns):
+			continue
+
+		node = trie
+		for part in parts:
+			node = node.setdefault(part, {})
+			if None in node:
+				# A parent directory is already excluded.
+				break
+		else:
+			node.clear()
+			node[None] = True
+
+	minimal: List[str] = []
+	stack: List[Tuple[str, Dict[Optional[str], Any]]] = [('', trie)]
+
+	while stack:
+		prefix, node = stack.pop()
+
+		if None in node:
+			minimal.append(prefix)
+		else:
+			# Only leaves have the ``None`` key, so each ``part`` here is a directory name.
+			stack.extend((f"{prefix}/{part}" if prefix else str(part), child) for part, child in node.items())
+
+	return sorted(minimal)
+
+
+@transform("excludes", "NewModuleRootManager")
+def update_excludes(manager: "ImlManager", component: Any) -> None:
+	"""
+	Update the list of directories which should be excluded from indexing.
+
+	Only the smallest set of directories covering the excluded directories is written.
+	Patterns in :attr:`ImlManager.exclude_patterns <.ImlManager.exclude_patterns>`
+	are written as ``excludePattern`` elements.
+
+	:param manager:
+	:param component:
+
+	.. versionchanged:: 0.4.0
+
+		Nested directories are no longer listed, and ``excludePattern`` elements are supported.
+	"""
+
+	file_module_dir = "file://$MODULE_DIR$/"
+	mypy_cache_dir = f"{file_module_dir}.mypy_cache"
+
+	content = component.find("content")
+	if content is None:
+		return
+
+	for exclude_node in content.findall("excludeFolder"):
+		manager.excluded_dirs.add(exclude_node.get("url", mypy_cache_dir).split(file_module_dir)[-1])
+		content.remove(exclude_node)
+
+	for pattern_node in content.findall("excludePattern"):
+		if pattern_node.get("pattern"):
+			manager.exclude_patterns.add(pattern_node.get("pattern"))
+		content.remove(pattern_node)
+
+	for directory in minimal_excludes(manager.excluded_dirs, manager.exclude_patterns):
+		lxml.etree.SubElement(content, "excludeFolder", url=file_module_dir + directory)
+
+	for pattern in sorted(manager.exclude_patterns):
+		lxml.etree.SubElement(content, "excludePattern", pattern=pattern)
+
+
+@transform("test-runner", "TestRunnerService")
+def update_runner(manager: "ImlManager", component: Any) -> None:
+	"""
+	Set the project's test runner to pytest.
+
+	:param manager:
+	:param component:
+	"""
+
+	for option in component.findall("option"):
+		if option.get("name") == "PROJECT_TEST_RUNNER":
+			option.set("value", "pytest")
+
+
+@transform("docstring-format", "PyDocumentationSettings")
+def remove_docstring_format(manager: "ImlManager", component: Any) -> bool:
+	"""
+	Remove any existing option for "PyDocumentationSettings", to revert to the default of reStructuredText.
+
+	:param manager:
+	:param component:
+	"""
+
+	return False
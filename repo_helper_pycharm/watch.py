@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+#
+#  watch.py
+"""
+Watch repositories and reconfigure PyCharm when their configuration changes.
+
+This uses Linux's inotify API, so the process sleeps until a file actually changes.
+
+.. versionadded:: 0.4.0
+"""
+#
+#  Copyright © 2020 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+#  EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+#  MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+#  IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+#  DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+#  OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+#  OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+# stdlib
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+# 3rd party
+import click  # type: ignore[import-untyped]
+from domdf_python_tools.paths import PathPlus, traverse_to_file
+from domdf_python_tools.typing import PathLike
+
+# this package
+from repo_helper_pycharm.settings import PycharmSettings, load_settings
+
+__all__ = ("InotifyEvent", "Inotify", "Watcher")
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_IGNORED = 0x00008000
+IN_CLOEXEC = 0o2000000
+
+_event_header = struct.Struct("iIII")
+
+CONFIG_FILE = "repo_helper.yml"
+SCHEMA_MAPPING_FILE = "jsonSchemas.xml"
+SCHEMAS_FILE = "pycharm_schemas.yml"
+
+
+class InotifyEvent(NamedTuple):
+	"""
+	An event read from an inotify file descriptor.
+	"""
+
+	#: The watch descriptor the event is for.
+	wd: int
+
+	#: Bitmask describing the event.
+	mask: int
+
+	#: Links the two halves of a rename.
+	cookie: int
+
+	#: The name of the file within the watched directory.
+	name: str
+
+
+class Inotify:
+	"""
+	Minimal wrapper around Linux's inotify API.
+
+	:raises: :exc:`OSError` if inotify is not available.
+	"""
+
+	def __init__(self):
+		if not sys.platform.startswith("linux"):
+			raise OSError("inotify is only available on Linux.")
+
+		self._libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+		self.fd: int = self._libc.inotify_init1(IN_CLOEXEC)
+
+		if self.fd < 0:  # pragma: no cover
+			errno = ctypes.get_errno()
+			raise OSError(errno, os.strerror(errno))
+
+	def add_watch(self, path: PathLike, mask: int = IN_CLOSE_WRITE | IN_MOVED_TO) -> int:
+		"""
+		Start watching the given directory.
+
+		:param path:
+		:param mask: The events to watch for.
+
+		:returns: The watch descriptor.
+		"""
+
+		wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+
+		if wd < 0:
+			errno = ctypes.get_errno()
+			raise OSError(errno, os.strerror(errno), str(path))
+
+		return wd
+
+	def read_events(self, timeout: Optional[float] = None) -> List[InotifyEvent]:
+		"""
+		Wait for events, and return them.
+
+		:param timeout: The maximum time to wait, in seconds. If :py:obj:`None`, wait indefinitely.
+
+		:returns: The events, or an empty list if the timeout expired first.
+		"""
+
+		readable, _, _ = select.select([self.fd], [], [], timeout)
+		if not readable:
+			return []
+
+		data = os.read(self.fd, 65536)
+		events = []
+		pos = 0
+
+		while pos < len(data):
+			wd, mask, cookie, length = _event_header.unpack_from(data, pos)
+			pos += _event_header.size
+			name = os.fsdecode(data[pos:pos + length].rstrip(b'\0'))
+			pos += length
+			events.append(InotifyEvent(wd, mask, cookie, name))
+
+		return events
+
+	def close(self) -> None:
+		"""
+		Stop watching and close the file descriptor.
+		"""
+
+		if self.fd >= 0:
+			os.close(self.fd)
+			self.fd = -1
+
+
+class _WatchedRepo:
+
+	def __init__(self, target_repo: PathPlus):
+		self.target_repo = target_repo
+		self.settings: Optional[PycharmSettings] = None
+
+	def get_settings(self) -> PycharmSettings:
+		if self.settings is None:
+			self.settings = load_settings(self.target_repo)
+		return self.settings
+
+
+class Watcher:
+	"""
+	Watch one or more repositories and reconfigure them when files change.
+
+	* When ``repo_helper.yml`` changes, its settings are reloaded and the ``excludes`` transform reapplied.
+	* When a ``.idea/*.iml`` file changes, all transforms are reapplied.
+	* When ``.idea/jsonSchemas.xml`` or ``pycharm_schemas.yml`` changes, the schema mappings are registered again.
+
+	:param repo_dirs:
+	:param debounce: Changes are processed once no further events have arrived for this many seconds.
+	:param show_diff: Whether to show a diff when changes are made.
+	"""
+
+	def __init__(self, repo_dirs: Iterable[PathLike], debounce: float = 0.5, show_diff: bool = False):
+		self.debounce = debounce
+		self.show_diff = show_diff
+		self.inotify = Inotify()
+
+		# Mapping of watch descriptors to the repository and whether the directory is ``.idea``.
+		self._watches: Dict[int, Tuple[_WatchedRepo, bool]] = {}
+
+		for repo_dir in repo_dirs:
+			repo = _WatchedRepo(traverse_to_file(PathPlus(repo_dir), CONFIG_FILE))
+			self._watches[self.inotify.add_watch(repo.target_repo)] = (repo, False)
+			self._watches[self.inotify.add_watch(repo.target_repo / ".idea")] = (repo, True)
+
+	def wait(self, timeout: Optional[float] = None) -> Set[Tuple[_WatchedRepo, str]]:
+		"""
+		Wait for a burst of changes to the watched files, and return them.
+
+		:param timeout: The maximum time to wait for the first event, in seconds.
+			If :py:obj:`None`, wait indefinitely.
+
+		:returns: A set of ``(repository, filename)`` tuples.
+		"""
+
+		changes: Set[Tuple[_WatchedRepo, str]] = set()
+		events = self.inotify.read_events(timeout)
+
+		while events:
+			for event in events:
+				if event.wd not in self._watches or event.mask & IN_IGNORED:
+					continue
+
+				repo, is_idea = self._watches[event.wd]
+
+				if is_idea and (event.name.endswith(".iml") or event.name == SCHEMA_MAPPING_FILE):
+					changes.add((repo, event.name))
+				elif not is_idea and event.name in {CONFIG_FILE, SCHEMAS_FILE}:
+					changes.add((repo, event.name))
+
+			events = self.inotify.read_events(self.debounce)
+
+		return changes
+
+	def handle(self, changes: Iterable[Tuple[_WatchedRepo, str]]) -> None:
+		"""
+		Redo the work affected by the given changes.
+
+		:param changes: A set of ``(repository, filename)`` tuples, as returned by :meth:`~.wait`.
+		"""
+
+		# this package
+		from repo_helper_pycharm.iml_manager import ImlManager
+		from repo_helper_pycharm.register_schema import register_schema
+		from repo_helper_pycharm.transforms import Transform, get_transforms
+
+		by_repo: Dict[_WatchedRepo, Set[str]] = {}
+		for repo, filename in changes:
+			by_repo.setdefault(repo, set()).add(filename)
+
+		for repo, filenames in by_repo.items():
+			try:
+				if CONFIG_FILE in filenames:
+					repo.settings = None
+
+				transforms: List[Transform]
+
+				if any(filename.endswith(".iml") for filename in filenames):
+					transforms = list(get_transforms().values())
+				elif CONFIG_FILE in filenames:
+					transforms = [get_transforms()["excludes"]]
+				else:
+					transforms = []
+
+				if transforms:
+					iml_manager = ImlManager(repo.target_repo, settings=repo.get_settings())
+					iml_manager.run(self.show_diff, transforms)
+					for module_file in iml_manager.changed_files:
+						click.echo(f"Updated {module_file}")
+
+				if SCHEMA_MAPPING_FILE in filenames or SCHEMAS_FILE in filenames:
+					register_schema(repo.target_repo)
+
+			except Exception as e:
+				click.echo(f"{repo.target_repo}: {type(e).__name__}: {e}", err=True)
+
+	def run(self) -> None:  # pragma: no cover
+		"""
+		Watch for changes until interrupted.
+		"""
+
+		try:
+			while True:
+				self.handle(self.wait())
+		finally:
+			self.inotify.close()
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+#
+#  xml_diff.py
+"""
+Structural comparison of the components of PyCharm's XML configuration files.
+
+Rather than comparing the serialised files line by line, the old and new versions of each changed
+component are compared element by element and attribute by attribute.
+Child elements are matched by their tag and identifying attribute, such as ``name`` or ``url``,
+so the work done depends on the size of the changed components rather than the whole file.
+
+.. versionadded:: 0.4.0
+"""
+#
+#  Copyright © 2020 Dominic Davis-Foster <dominic@davis-foster.co.uk>
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+#  EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+#  MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+#  IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+#  DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+#  OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE
+#  OR OTHER DEALINGS IN THE SOFTWARE.
+#
+
+# stdlib
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+# 3rd party
+import click  # type: ignore[import-untyped]
+from domdf_python_tools.paths import PathPlus
+
+__all__ = ("identity_attributes", "StructuralChange", "diff_components", "format_changes", "changes_to_json")
+
+#: Attributes which identify an element among its siblings, in order of preference.
+identity_attributes = ("name", "url", "type", "key", "pattern", "value")
+
+_Key = Tuple[str, Optional[str], int]
+
+
+class StructuralChange(NamedTuple):
+	"""
+	A single difference between the old and new versions of a component.
+	"""
+
+	#: The module file containing the component.
+	module_file: PathPlus
+
+	#: The name of the component.
+	component: str
+
+	#: One of ``'added'``, ``'removed'`` or ``'changed'``.
+	change: str
+
+	#: The path to the element within the component, such as ``content[url=file://$MODULE_DIR$]/excludeFolder``.
+	#: This is empty for the component itself.
+	path: str
+
+	#: For changed elements, the name of the attribute which changed, or ``'#text'`` for the element's text.
+	attribute: Optional[str] = None
+
+	#: The old value of the attribute, or :py:obj:`None` if it was added.
+	old: Optional[str] = None
+
+	#: The new value of the attribute, or :py:obj:`None` if it was removed.
+	new: Optional[str] = None
+
+
+def _label(element: Any) -> str:
+	tag = str(element.tag)
+
+	for attribute in identity_attributes:
+		value = element.get(attribute)
+		if value is not None:
+			return f"{tag}[{attribute}={value}]"
+
+	return tag
+
+
+def _keyed_children(element: Any) -> Dict[_Key, Any]:
+	children: Dict[_Key, Any] = {}
+	counts: Dict[Tuple[str, Optional[str]], int] = {}
+
+	for child in element.iterchildren():
+		tag = str(child.tag)
+		ident = next((child.get(a) for a in identity_attributes if child.get(a) is not None), None)
+		count = counts[(tag, ident)] = counts.get((tag, ident), -1) + 1
+		children[(tag, ident, count)] = child
+
+	return children
+
+
+def _join(path: str, label: str) -> str:
+	return f"{path}/{label}" if path else label
+
+
+def _diff_element(old: Any, new: Any, path: str, record: Any) -> None:
+	for attribute in sorted({*old.attrib, *new.attrib}):
+		old_value, new_value = old.get(attribute), new.get(attribute)
+		if old_value != new_value:
+			record("changed", path, attribute, old_value, new_value)
+
+	old_text, new_text = (old.text or '').strip(), (new.text or '').strip()
+	if old_text != new_text:
+		record("changed", path, "#text", old_text or None, new_text or None)
+
+	old_children = _keyed_children(old)
+	new_children = _keyed_children(new)
+
+	for key, child in old_children.items():
+		if key not in new_children:
+			record("removed", _join(path, _label(child)))
+
+	for key, child in new_children.items():
+		if key not in old_children:
+			record("added", _join(path, _label(child)))
+		else:
+			_diff_element(old_children[key], child, _join(path, _label(child)), record)
+
+
+def diff_components(module_file: PathPlus, old: Any, new: Optional[Any]) -> List[StructuralChange]:
+	"""
+	Returns the differences between two versions of a component.
+
+	:param module_file: The module file containing the component.
+	:param old: The original component.
+	:param new: The updated component, or :py:obj:`None` if it was removed.
+	"""
+
+	component = old.get("name", str(old.tag))
+
+	if new is None:
+		return [StructuralChange(module_file, component, "removed", '')]
+
+	changes: List[StructuralChange] = []
+
+	def record(
+			change: str,
+			path: str,
+			attribute: Optional[str] = None,
+			old_value: Optional[str] = None,
+			new_value: Optional[str] = None,
+			) -> None:
+		changes.append(StructuralChange(module_file, component, change, path, attribute, old_value, new_value))
+
+	_diff_element(old, new, '', record)
+	return changes
+
+
+_colours = {"added": "green", "removed": "red", "changed": "yellow"}
+
+
+def format_changes(changes: Iterable[StructuralChange], root: Optional[PathPlus] = None) -> str:
+	"""
+	Format the changes as text, grouped by module file.
+
+	:param changes:
+	:param root: If given, module files are shown relative to this directory.
+	"""
+
+	lines: List[str] = []
+	module_file = None
+
+	for change in changes:
+		if change.module_file != module_file:
+			module_file = change.module_file
+			lines.append(module_file.relative_to(root).as_posix() if root else module_file.as_posix())
+
+		description = f"{change.change} {change.path}".rstrip()
+		if change.attribute is not None:
+			description += f" {change.attribute}: {change.old!r} -> {change.new!r}"
+
+		lines.append(f"  {change.component}: {click.style(description, fg=_colours[change.change])}")
+
+	return ''.join(f"{line}\n" for line in lines)
+
+
+def changes_to_json(changes: Iterable[StructuralChange], root: Optional[PathPlus] = None) -> List[Dict[str, Any]]:
+	"""
+	Returns the changes as a list of JSON-serialisable dictionaries.
+
+	:param changes:
+	:param root: If given, module files are given relative to this directory.
+	"""
+
+	return [{
+			"module": change.module_file.relative_to(root).as_posix() if root else change.module_file.as_posix(),
+			"component": change.component,
+			"change": change.change,
+			"path": change.path,
+			"attribute": change.attribute,
+			"old": change.old,
+			"new": change.new,
+			} for change in changes]
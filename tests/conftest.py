@@ -2,6 +2,7 @@
 from typing import TYPE_CHECKING
 
 # 3rd party
+import platformdirs
 import pytest
 
 if TYPE_CHECKING:
@@ -11,6 +12,40 @@ if TYPE_CHECKING:
 pytest_plugins = ("coincidence", "repo_helper.testing", "consolekit.testing")
 
 
+@pytest.fixture(scope="session")
+def iml_contents() -> str:
+	return """\
+<?xml version="1.0" encoding="UTF-8"?>
+<module type="PYTHON_MODULE" version="4">
+  <component name="NewModuleRootManager">
+    <content url="file://$MODULE_DIR$">
+      <excludeFolder url="file://$MODULE_DIR$/venv" />
+    </content>
+    <orderEntry type="inheritedJdk" />
+    <orderEntry type="sourceFolder" forTests="false" />
+  </component>
+  <component name="PackageRequirementsSettings">
+    <option name="requirementsPath" value="" />
+  </component>
+  <component name="PyDocumentationSettings">
+    <option name="format" value="PLAIN" />
+    <option name="myDocStringFormat" value="Plain" />
+  </component>
+  <component name="TestRunnerService">
+    <option name="PROJECT_TEST_RUNNER" value="nose" />
+  </component>
+</module>
+"""
+
+
+@pytest.fixture()
+def fake_iml(tmp_pathplus: "PathPlus", iml_contents: str) -> "PathPlus":
+	module_file = tmp_pathplus / ".idea" / "repo_helper_demo.iml"
+	module_file.parent.maybe_make()
+	module_file.write_clean(iml_contents)
+	return module_file
+
+
 @pytest.fixture()
 def tmp_project(tmp_pathplus: "PathPlus", example_config: str) -> None:
 	(tmp_pathplus / "repo_helper.yml").write_clean(example_config)
@@ -19,3 +54,10 @@ def tmp_project(tmp_pathplus: "PathPlus", example_config: str) -> None:
 @pytest.fixture(scope="session")
 def no_idea() -> str:
 	return "'.idea' directory not found. Perhaps this isn't a PyCharm project?"
+
+
+@pytest.fixture(autouse=True)
+def user_cache_dir(tmp_path_factory, monkeypatch) -> str:
+	cache_dir = str(tmp_path_factory.mktemp("cache"))
+	monkeypatch.setattr(platformdirs, "user_cache_dir", lambda *args: cache_dir)
+	return cache_dir
@@ -0,0 +1,125 @@
+# stdlib
+from concurrent.futures import ThreadPoolExecutor
+
+# 3rd party
+import click  # type: ignore[import-untyped]
+import pytest
+from consolekit.testing import CliRunner, Result
+from domdf_python_tools.paths import PathPlus, in_directory
+
+# this package
+from repo_helper_pycharm import configure
+from repo_helper_pycharm.batch import ConfigureOptions, configure_many
+from repo_helper_pycharm.cache import FingerprintCache
+
+
+@pytest.fixture()
+def many_projects(tmp_pathplus: PathPlus, example_config: str, iml_contents: str) -> PathPlus:
+	for name in ("alpha", "beta", "group/gamma"):
+		repo_dir = tmp_pathplus / name
+		(repo_dir / ".idea").mkdir(parents=True)
+		(repo_dir / "repo_helper.yml").write_clean(example_config)
+		(repo_dir / ".idea" / "module.iml").write_clean(iml_contents)
+
+	# Not PyCharm projects
+	(tmp_pathplus / "delta").mkdir()
+	(tmp_pathplus / "delta" / "repo_helper.yml").write_clean(example_config)
+	(tmp_pathplus / "venv" / "epsilon" / ".idea").mkdir(parents=True)
+	(tmp_pathplus / "venv" / "epsilon" / "repo_helper.yml").write_clean(example_config)
+	(tmp_pathplus / "venv" / "epsilon" / ".idea" / "module.iml").write_clean(iml_contents)
+
+	return tmp_pathplus
+
+
+def test_configure_recursive(many_projects: PathPlus) -> None:
+	with in_directory(many_projects):
+		runner = CliRunner(mix_stderr=False)
+		result: Result = runner.invoke(configure, catch_exceptions=False, args=["--recursive", "--jobs", '2'])
+		assert result.exit_code == 1
+		assert result.stdout == "3 changed, 0 unchanged, 0 failed\n"
+
+		result = runner.invoke(configure, catch_exceptions=False, args=["--recursive", "--jobs", '2'])
+		assert result.exit_code == 0
+		assert result.stdout == "0 changed, 3 unchanged, 0 failed\n"
+
+		(many_projects / "beta" / ".idea" / "module.iml").write_text("<module")
+		result = runner.invoke(configure, catch_exceptions=False, args=["--recursive", "--no-cache", "-j", '1'])
+		assert result.exit_code == 1
+		assert result.stdout == "0 changed, 2 unchanged, 1 failed\n"
+		assert result.stderr.startswith(f"{many_projects / 'beta'}: XMLSyntaxError: ")
+
+		result = runner.invoke(configure, catch_exceptions=False, args=["--recursive", "--only", "foo"])
+		assert result.exit_code == 1
+		assert result.stderr.startswith("Unknown transform 'foo'")
+
+		result = runner.invoke(configure, catch_exceptions=False, args=["--recursive", "--jobs", '0'])
+		assert result.exit_code == 2
+		assert "Invalid value for '-j' / '--jobs'" in result.stderr
+
+
+def test_configure_recursive_no_projects(tmp_pathplus: PathPlus) -> None:
+	with in_directory(tmp_pathplus):
+		runner = CliRunner(mix_stderr=False)
+		result: Result = runner.invoke(configure, catch_exceptions=False, args=["--recursive"])
+		assert result.exit_code == 1
+		assert result.stderr == f"No PyCharm projects found in {tmp_pathplus}\nAborted!\n"
+
+
+def test_configure_many(many_projects: PathPlus, tmp_pathplus: PathPlus) -> None:
+	(many_projects / "beta" / ".idea" / "module.iml").write_text("<module")
+	repo_dirs = [many_projects / "alpha", many_projects / "beta", many_projects / "group" / "gamma"]
+
+	results = configure_many(repo_dirs, ConfigureOptions(show_diff=True, only=("test-runner", )), jobs=2)
+	assert [r.repo_dir for r in results] == repo_dirs
+
+	alpha, beta, gamma = results
+	assert alpha.changed is True
+	assert alpha.changed_files == (many_projects / "alpha" / ".idea" / "module.iml", )
+	diff = click.unstyle(alpha.diff)
+	assert diff.startswith("--- module.iml\t(original)\n")
+	assert '+    <option name="PROJECT_TEST_RUNNER" value="pytest"/>' in diff
+	assert set(alpha.timings) == {"load", "update", "write"}
+	assert alpha.error is None
+	assert gamma.changed is True
+
+	assert beta.changed is None
+	assert beta.error is not None
+	assert beta.error.startswith("XMLSyntaxError: ")
+
+	cache = FingerprintCache(tmp_pathplus / "cache")
+	with ThreadPoolExecutor(2) as executor:
+		results = configure_many(repo_dirs[::2], executor=executor, cache=cache)
+	assert [r.changed for r in results] == [True, True]
+	assert [r.cached for r in results] == [False, False]
+
+	results = configure_many(repo_dirs[::2], jobs=1, cache=cache)
+	assert [r.changed for r in results] == [False, False]
+	assert [r.cached for r in results] == [True, True]
+
+
+def test_configure_many_schema(many_projects: PathPlus, capsys) -> None:
+	results = configure_many([many_projects / "alpha"], ConfigureOptions(register_schema=True))
+	assert results[0].changed is True
+	assert "schema" in results[0].timings
+	assert (many_projects / "alpha" / ".idea" / "jsonSchemas.xml").is_file()
+	assert not capsys.readouterr().out
+
+
+def test_configure_many_schema_cached(many_projects: PathPlus, tmp_pathplus: PathPlus) -> None:
+	cache = FingerprintCache(tmp_pathplus / "cache")
+	configure_many([many_projects / "alpha"], cache=cache)
+
+	# The module files are up to date, but the schema mappings are registered anyway.
+	results = configure_many([many_projects / "alpha"], ConfigureOptions(register_schema=True), cache=cache)
+	assert results[0].cached is True
+	assert results[0].changed is True
+	assert (many_projects / "alpha" / ".idea" / "jsonSchemas.xml").is_file()
+
+	results = configure_many([many_projects / "alpha"], ConfigureOptions(register_schema=True), cache=cache)
+	assert results[0].cached is True
+	assert results[0].changed is False
+
+
+def test_configure_many_unknown_transform(many_projects: PathPlus) -> None:
+	with pytest.raises(ValueError, match="Unknown transform 'foo'"):
+		configure_many([many_projects / "alpha"], ConfigureOptions(only=("foo", )))
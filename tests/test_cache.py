@@ -0,0 +1,125 @@
+# stdlib
+import sys
+
+# 3rd party
+import pytest
+from consolekit.testing import CliRunner, Result
+from domdf_python_tools.paths import PathPlus, in_directory
+
+# this package
+from repo_helper_pycharm import cache, configure
+from repo_helper_pycharm.cache import FingerprintCache, get_cache_dir
+from repo_helper_pycharm.iml_manager import ImlManager
+
+
+def test_get_cache_dir(user_cache_dir: str) -> None:
+	assert get_cache_dir() == PathPlus(user_cache_dir)
+
+
+@pytest.mark.usefixtures("tmp_project")
+def test_fingerprint(tmp_pathplus: PathPlus, iml_contents: str) -> None:
+	assert FingerprintCache.fingerprint(tmp_pathplus) is None
+
+	(tmp_pathplus / ".idea").mkdir()
+	(tmp_pathplus / ".idea" / "repo_helper_demo.iml").write_clean(iml_contents)
+	fingerprint = FingerprintCache.fingerprint(tmp_pathplus)
+	assert fingerprint is not None
+	assert FingerprintCache.fingerprint(tmp_pathplus / ".idea") == fingerprint
+	assert FingerprintCache.fingerprint(tmp_pathplus, "--diff") != fingerprint
+
+	(tmp_pathplus / "repo_helper.yml").append_text("docs_dir: docs\n")
+	assert FingerprintCache.fingerprint(tmp_pathplus) != fingerprint
+
+	# The schema mappings are compared with jsonSchemas.xml directly, so aren't part of the fingerprint.
+	fingerprint = FingerprintCache.fingerprint(tmp_pathplus)
+	(tmp_pathplus / "pycharm_schemas.yml").write_lines(["- name: tox_ini"])
+	assert FingerprintCache.fingerprint(tmp_pathplus) == fingerprint
+
+
+@pytest.mark.usefixtures("tmp_project", "fake_iml")
+def test_fingerprint_entry_points(tmp_pathplus: PathPlus, monkeypatch) -> None:
+	fingerprint = FingerprintCache.fingerprint(tmp_pathplus)
+
+	# Installing or upgrading a package which provides transforms changes the fingerprint.
+	entry_point = "my-transform=my_package:my_transform (my-package 1.0.0)"
+	monkeypatch.setattr("repo_helper_pycharm.cache._transform_entry_points", lambda: (entry_point, ))
+	installed = FingerprintCache.fingerprint(tmp_pathplus)
+	assert installed != fingerprint
+
+	monkeypatch.setattr("repo_helper_pycharm.cache._transform_entry_points", lambda: (entry_point.replace("1.0.0", "1.1.0"), ))
+	assert FingerprintCache.fingerprint(tmp_pathplus) not in {fingerprint, installed}
+
+
+def test_transform_entry_points_cached(tmp_pathplus: PathPlus, monkeypatch) -> None:
+	# 3rd party
+	from domdf_python_tools.compat import importlib_metadata
+
+	site_packages = tmp_pathplus / "site-packages"
+	site_packages.mkdir()
+	monkeypatch.setattr(sys, "path", [str(site_packages)])
+	cache._transform_entry_points.cache_clear()
+
+	try:
+		assert cache._transform_entry_points() == ()
+
+		# Distributions aren't enumerated again until a directory on sys.path changes.
+		def fail() -> None:
+			raise AssertionError("The distributions should not be enumerated.")
+
+		with monkeypatch.context() as m:
+			m.setattr(importlib_metadata, "distributions", fail)
+			cache._transform_entry_points.cache_clear()
+			assert cache._transform_entry_points() == ()
+
+		dist_info = site_packages / "my_package-1.0.0.dist-info"
+		dist_info.mkdir()
+		(dist_info / "METADATA").write_lines(["Metadata-Version: 2.1", "Name: my-package", "Version: 1.0.0"])
+		(dist_info / "entry_points.txt").write_lines([
+				"[repo_helper_pycharm.transforms]",
+				"my-transform = my_package:my_transform",
+				])
+
+		cache._transform_entry_points.cache_clear()
+		assert cache._transform_entry_points() == ("my-transform=my_package:my_transform (my-package 1.0.0)", )
+
+	finally:
+		cache._transform_entry_points.cache_clear()
+
+
+@pytest.mark.usefixtures("tmp_project", "fake_iml")
+def test_is_fresh(tmp_pathplus: PathPlus) -> None:
+	cache = FingerprintCache()
+
+	assert not cache.is_fresh(tmp_pathplus)
+	cache.update(tmp_pathplus)
+	assert cache.is_fresh(tmp_pathplus)
+
+	(tmp_pathplus / ".idea" / "repo_helper_demo.iml").append_text("\n")
+	assert not cache.is_fresh(tmp_pathplus)
+	cache.update(tmp_pathplus)
+	assert cache.is_fresh(tmp_pathplus)
+
+	cache.clear()
+	assert not cache.is_fresh(tmp_pathplus)
+
+
+@pytest.mark.usefixtures("tmp_project", "fake_iml")
+def test_configure_cached(tmp_pathplus: PathPlus, monkeypatch) -> None:
+	with in_directory(tmp_pathplus):
+		runner = CliRunner(mix_stderr=False)
+		result: Result = runner.invoke(configure, catch_exceptions=False)
+		assert result.exit_code == 1
+
+		def fail(*args, **kwargs) -> None:
+			raise AssertionError("ImlManager should not be used when the repository is unchanged.")
+
+		monkeypatch.setattr(ImlManager, "__init__", fail)
+
+		result = runner.invoke(configure, catch_exceptions=False)
+		assert result.exit_code == 0
+
+		with pytest.raises(AssertionError, match="ImlManager should not be used"):
+			runner.invoke(configure, catch_exceptions=False, args=["--no-cache"])
+
+		with pytest.raises(AssertionError, match="ImlManager should not be used"):
+			runner.invoke(configure, catch_exceptions=False, args=["--clear-cache"])
@@ -0,0 +1,106 @@
+# stdlib
+import json
+
+# 3rd party
+import pytest
+from consolekit.testing import CliRunner, Result
+from domdf_python_tools.paths import PathPlus, in_directory
+
+# this package
+from repo_helper_pycharm import configure
+from repo_helper_pycharm.iml_manager import Change, ImlManager
+
+
+class TestCheck:
+
+	@pytest.mark.usefixtures("tmp_project")
+	def test_check(self, tmp_pathplus: PathPlus, fake_iml: PathPlus) -> None:
+		module_file = fake_iml
+		original = module_file.read_bytes()
+
+		assert ImlManager(tmp_pathplus).check() == [Change(module_file, "excludes", "NewModuleRootManager")]
+		assert ImlManager(tmp_pathplus).check(first_only=False) == [
+				Change(module_file, "excludes", "NewModuleRootManager"),
+				Change(module_file, "docstring-format", "PyDocumentationSettings"),
+				Change(module_file, "test-runner", "TestRunnerService"),
+				]
+		assert module_file.read_bytes() == original
+
+		ImlManager(tmp_pathplus).run()
+		assert ImlManager(tmp_pathplus).check(first_only=False) == []
+
+	@pytest.mark.usefixtures("tmp_project")
+	def test_check_command(self, tmp_pathplus: PathPlus, fake_iml: PathPlus) -> None:
+		module_file = fake_iml
+		original = module_file.read_bytes()
+
+		with in_directory(tmp_pathplus):
+			runner = CliRunner(mix_stderr=False)
+
+			result: Result = runner.invoke(configure, catch_exceptions=False, args=["--check"])
+			assert result.exit_code == 1
+			assert result.stdout == (
+					".idea/repo_helper_demo.iml: 'excludes' would change the 'NewModuleRootManager' component\n"
+					)
+
+			result = runner.invoke(configure, catch_exceptions=False, args=["--check", "--format", "json"])
+			assert result.exit_code == 1
+			assert json.loads(result.stdout) == {
+					"up_to_date": False,
+					"changes": [
+							{
+									"module": ".idea/repo_helper_demo.iml",
+									"transform": "excludes",
+									"component": "NewModuleRootManager",
+									},
+							{
+									"module": ".idea/repo_helper_demo.iml",
+									"transform": "docstring-format",
+									"component": "PyDocumentationSettings",
+									},
+							{
+									"module": ".idea/repo_helper_demo.iml",
+									"transform": "test-runner",
+									"component": "TestRunnerService",
+									},
+							],
+					}
+
+			assert module_file.read_bytes() == original
+
+			result = runner.invoke(configure, catch_exceptions=False)
+			assert result.exit_code == 1
+
+			result = runner.invoke(configure, catch_exceptions=False, args=["--check", "--no-cache"])
+			assert result.exit_code == 0
+			assert not result.stdout
+
+			result = runner.invoke(configure, catch_exceptions=False, args=["--check", "--format", "json"])
+			assert result.exit_code == 0
+			assert json.loads(result.stdout) == {"up_to_date": True, "changes": []}
+
+	@pytest.mark.usefixtures("tmp_project")
+	def test_check_failed(self, tmp_pathplus: PathPlus, no_idea: str) -> None:
+		with in_directory(tmp_pathplus):
+			runner = CliRunner(mix_stderr=False)
+
+			result: Result = runner.invoke(configure, catch_exceptions=False, args=["--check"])
+			assert result.exit_code == 3
+			assert result.stderr == f"{no_idea}\n"
+
+			(tmp_pathplus / ".idea").mkdir()
+			(tmp_pathplus / ".idea" / "repo_helper_demo.iml").write_text("<module")
+
+			result = runner.invoke(configure, catch_exceptions=False, args=["--check"])
+			assert result.exit_code == 3
+			assert result.stderr.startswith("XMLSyntaxError: ")
+
+			result = runner.invoke(configure, catch_exceptions=False, args=["--check", "--only", "foo"])
+			assert result.exit_code == 3
+
+			result = runner.invoke(configure, catch_exceptions=False, args=["--check", "--recursive"])
+			assert result.exit_code == 2
+
+			result = runner.invoke(configure, catch_exceptions=False, args=["--format", "json"])
+			assert result.exit_code == 2
+			assert "'--format' can only be used with '--check' or '--structural-diff'" in result.stderr
@@ -0,0 +1,193 @@
+# stdlib
+import os
+import shutil
+import subprocess
+import time
+
+# 3rd party
+import pytest
+from consolekit.testing import CliRunner, Result
+from domdf_python_tools.paths import PathPlus, in_directory
+
+# this package
+from repo_helper_pycharm import configure, detect
+from repo_helper_pycharm.detect import detect_excluded_dirs, git_ignored_dirs
+from repo_helper_pycharm.iml_manager import ImlManager
+
+
+def make_tree(root: PathPlus) -> None:
+	(root / "my_package").mkdir()
+	(root / "my_package" / "__init__.py").touch()
+	(root / "my_package" / "node_modules" / "foo").mkdir(parents=True)
+	(root / "env" / "lib").mkdir(parents=True)
+	(root / "env" / "pyvenv.cfg").touch()
+	(root / "env" / "lib" / "node_modules").mkdir()
+	(root / "tools" / "cache").mkdir(parents=True)
+	(root / "tools" / "cache" / "CACHEDIR.TAG").touch()
+	(root / "tools" / "my_tool.egg-info").mkdir()
+	(root / ".nox").mkdir()
+	(root / ".git" / "node_modules").mkdir(parents=True)
+	(root / "data").mkdir()
+
+	for i in range(20):
+		(root / "data" / f"{i}.csv").touch()
+
+
+def test_detect_excluded_dirs(tmp_pathplus: PathPlus) -> None:
+	make_tree(tmp_pathplus)
+
+	assert detect_excluded_dirs(tmp_pathplus, max_workers=2) == {
+			".nox",
+			"env",
+			"my_package/node_modules",
+			"tools/cache",
+			"tools/my_tool.egg-info",
+			}
+
+	assert "data" in detect_excluded_dirs(tmp_pathplus, large_dir_threshold=10)
+	assert "my_package" not in detect_excluded_dirs(tmp_pathplus, large_dir_threshold=1)
+
+
+def test_detect_excluded_dirs_budget(tmp_pathplus: PathPlus) -> None:
+	make_tree(tmp_pathplus)
+	assert detect_excluded_dirs(tmp_pathplus, time_budget=0) == set()
+
+
+def test_detect_excluded_dirs_budget_truncates(tmp_pathplus: PathPlus, monkeypatch) -> None:
+	(tmp_pathplus / "node_modules").mkdir()
+	(tmp_pathplus / "deep" / '1' / '2' / '3' / "node_modules").mkdir(parents=True)
+
+	real_scan = detect._scan
+
+	def slow_scan(path, large_dir_threshold):  # noqa: MAN001,MAN002
+		time.sleep(0.1)
+		return real_scan(path, large_dir_threshold)
+
+	monkeypatch.setattr(detect, "_scan", slow_scan)
+
+	# The nested directory needs five scans in turn, so the budget runs out first.
+	start = time.perf_counter()
+	assert detect_excluded_dirs(tmp_pathplus, time_budget=0.25) == {"node_modules"}
+	assert time.perf_counter() - start < 1
+
+	assert detect_excluded_dirs(tmp_pathplus, time_budget=5) == {"node_modules", "deep/1/2/3/node_modules"}
+
+
+class TestDetect:
+
+	@pytest.mark.usefixtures("fake_iml")
+	def test_detect_excludes(self, tmp_pathplus: PathPlus, example_config: str) -> None:
+		make_tree(tmp_pathplus)
+		(tmp_pathplus / "repo_helper.yml").write_clean(example_config)
+
+		manager = ImlManager(tmp_pathplus)
+		assert "env" in manager.detect_excludes()
+		manager.run()
+
+		content = (tmp_pathplus / ".idea" / "repo_helper_demo.iml").read_text()
+		assert 'url="file://$MODULE_DIR$/env"' in content
+		assert 'url="file://$MODULE_DIR$/my_package/node_modules"' in content
+
+	@pytest.mark.usefixtures("fake_iml")
+	def test_configure_detect_excludes(self, tmp_pathplus: PathPlus, example_config: str) -> None:
+		make_tree(tmp_pathplus)
+		(tmp_pathplus / "repo_helper.yml").write_clean(example_config)
+
+		with in_directory(tmp_pathplus):
+			runner = CliRunner()
+			result: Result = runner.invoke(configure, catch_exceptions=False, args=["--detect-excludes"])
+			assert result.exit_code == 1
+
+			# The cache isn't used, as new directories might have appeared.
+			(tmp_pathplus / "venv2").mkdir()
+			(tmp_pathplus / "venv2" / "pyvenv.cfg").touch()
+			result = runner.invoke(configure, catch_exceptions=False, args=["--detect-excludes"])
+			assert result.exit_code == 1
+
+		content = (tmp_pathplus / ".idea" / "repo_helper_demo.iml").read_text()
+		assert 'url="file://$MODULE_DIR$/venv2"' in content
+
+
+requires_git = pytest.mark.skipif(shutil.which("git") is None, reason="Requires git")
+
+
+def make_git_repo(root: PathPlus) -> None:
+	subprocess.run(["git", "init", "-q"], cwd=root, check=True)
+	(root / ".gitignore").write_lines(["build/", "*.egg-info/", "/.idea/"])
+	(root / "build" / "lib").mkdir(parents=True)
+	(root / "build" / "lib" / "module.py").touch()
+	(root / "src" / "my_package.egg-info").mkdir(parents=True)
+	(root / "src" / "my_package.egg-info" / "PKG-INFO").touch()
+	(root / "src" / "my_package").mkdir()
+	(root / "src" / "my_package" / "__init__.py").touch()
+	subprocess.run(["git", "add", ".gitignore"], cwd=root, check=True)
+
+
+@requires_git
+def test_git_ignored_dirs(tmp_pathplus: PathPlus, monkeypatch) -> None:
+	make_git_repo(tmp_pathplus)
+	(tmp_pathplus / ".idea").mkdir()
+	(tmp_pathplus / ".idea" / "workspace.xml").touch()
+
+	assert git_ignored_dirs(tmp_pathplus) == {"build", "src/my_package.egg-info"}
+	assert git_ignored_dirs(tmp_pathplus / "src") == {"my_package.egg-info"}
+
+	# The cached result is used until the repository changes.
+	calls = []
+	real_git = detect._git
+
+	def git(args, cwd):  # noqa: MAN001,MAN002
+		calls.append(args)
+		return real_git(args, cwd)
+
+	monkeypatch.setattr(detect, "_git", git)
+
+	assert git_ignored_dirs(tmp_pathplus) == {"build", "src/my_package.egg-info"}
+	assert not calls
+
+	assert git_ignored_dirs(tmp_pathplus, use_cache=False) == {"build", "src/my_package.egg-info"}
+	assert len(calls) == 1
+
+	(tmp_pathplus / "dist").mkdir()
+	(tmp_pathplus / "dist" / "my_package.whl").touch()
+	gitignore = tmp_pathplus / ".gitignore"
+	gitignore.append_text("dist/\n")
+	os.utime(gitignore, ns=(0, 0))
+
+	assert git_ignored_dirs(tmp_pathplus) == {"build", "dist", "src/my_package.egg-info"}
+	assert len(calls) == 2
+
+	# The global excludes file is found without running git.
+	excludes_file = tmp_pathplus / "global_ignore"
+	(tmp_pathplus / "node_modules").mkdir()
+	os.utime(tmp_pathplus, ns=(0, 0))
+	monkeypatch.setenv("XDG_CONFIG_HOME", str(tmp_pathplus / "xdg"))
+	subprocess.run(["git", "config", "core.excludesFile", str(excludes_file)], cwd=tmp_pathplus, check=True)
+	assert git_ignored_dirs(tmp_pathplus) == {"build", "dist", "src/my_package.egg-info"}
+	assert len(calls) == 3
+
+	excludes_file.write_lines(["node_modules/"])
+	os.utime(tmp_pathplus, ns=(0, 0))
+	assert git_ignored_dirs(tmp_pathplus) == {"build", "dist", "node_modules", "src/my_package.egg-info"}
+	assert len(calls) == 4
+
+
+def test_git_ignored_dirs_not_repo(tmp_pathplus: PathPlus, monkeypatch) -> None:
+	monkeypatch.setattr(detect, "_find_git_dir", lambda path: None)
+	assert git_ignored_dirs(tmp_pathplus) == set()
+
+
+@requires_git
+@pytest.mark.usefixtures("fake_iml")
+def test_configure_git_ignored(tmp_pathplus: PathPlus, example_config: str) -> None:
+	make_git_repo(tmp_pathplus)
+	(tmp_pathplus / "repo_helper.yml").write_clean(example_config)
+
+	with in_directory(tmp_pathplus):
+		runner = CliRunner()
+		result: Result = runner.invoke(configure, catch_exceptions=False, args=["--git-ignored"])
+		assert result.exit_code == 1
+
+	content = (tmp_pathplus / ".idea" / "repo_helper_demo.iml").read_text()
+	assert 'url="file://$MODULE_DIR$/src/my_package.egg-info"' in content
+	assert 'url="file://$MODULE_DIR$/.idea"' not in content
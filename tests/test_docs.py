@@ -1,7 +1,7 @@
 # stdlib
 import re
 import tempfile
-from typing import Iterator
+from typing import Iterator, Optional, Tuple
 
 # 3rd party
 import platformdirs
@@ -10,8 +10,17 @@ from consolekit.testing import CliRunner
 from domdf_python_tools.paths import PathPlus, in_directory
 
 # this package
-from repo_helper_pycharm import docs_command
-from repo_helper_pycharm.docs import get_config_dir, get_docs_port, open_in_browser
+from repo_helper_pycharm import docs, docs_command
+from repo_helper_pycharm.docs import (
+		_find_component,
+		default_port,
+		find_ide_configs,
+		get_config_dir,
+		get_docs_port,
+		get_ide_config,
+		open_in_browser,
+		parse_ide
+		)
 
 
 def re_windowspath(string: str) -> str:
@@ -103,3 +112,109 @@ def test_has_no_docs(tmp_pathplus: PathPlus) -> None:
 	assert result.exit_code == 1
 	assert not result.stdout
 	assert result.stderr == "The current project has no documentation!\nAborted!\n"
+
+
+def test_find_ide_configs(monkeypatch, tmp_pathplus: PathPlus) -> None:
+	config_dir = tmp_pathplus / "JetBrains"
+	monkeypatch.setattr(platformdirs, "user_config_dir", lambda *args: str(config_dir))
+
+	for name in ("PyCharm2020.1", "PyCharm2020.2", "PyCharmCE2021.1", "WebStorm2021.3", "Toolbox", "consentOptions"):
+		(config_dir / name).mkdir(parents=True)
+
+	(config_dir / "PyCharm2020.2" / "options").mkdir()
+	(config_dir / "PyCharm2020.2" / "options" / "other.xml").touch()
+
+	configs = {c.product + c.version: c for c in find_ide_configs()}
+	assert sorted(configs) == ["PyCharm2020.1", "PyCharm2020.2", "PyCharmCE2021.1", "WebStorm2021.3"]
+	assert configs["PyCharm2020.2"].options == {"other.xml": config_dir / "PyCharm2020.2" / "options" / "other.xml"}
+	assert configs["PyCharm2020.1"].options == {}
+
+	assert get_config_dir() == config_dir / "PyCharmCE2021.1"
+	assert get_config_dir("PyCharm") == config_dir / "PyCharm2020.2"
+	assert get_config_dir("pycharmce") == config_dir / "PyCharmCE2021.1"
+	assert get_config_dir("WebStorm", "2021.3") == config_dir / "WebStorm2021.3"
+
+	with pytest.raises(FileNotFoundError, match="PyCharm2019.3$"):
+		get_config_dir("PyCharm", "2019.3")
+
+	# The index is used until a directory changes.
+	monkeypatch.setattr(docs, "_scan_roots", None)
+	assert get_config_dir() == config_dir / "PyCharmCE2021.1"
+	monkeypatch.undo()
+	monkeypatch.setattr(platformdirs, "user_config_dir", lambda *args: str(config_dir))
+
+	# PyCharm is preferred over the Community Edition of the same version.
+	(config_dir / "PyCharm2021.1").mkdir()
+	assert get_config_dir() == config_dir / "PyCharm2021.1"
+
+	(config_dir / "PyCharm2021.1" / "options").mkdir()
+	(config_dir / "PyCharm2021.1" / "options" / "web-browsers.xml").touch()
+	assert "web-browsers.xml" in get_ide_config().options
+
+
+def test_get_ide_config_only_other_ides(monkeypatch, tmp_pathplus: PathPlus) -> None:
+	monkeypatch.setattr(platformdirs, "user_config_dir", lambda *args: str(tmp_pathplus))
+	(tmp_pathplus / "IntelliJIdea2021.1").mkdir()
+	(tmp_pathplus / "IntelliJIdea2020.3").mkdir()
+	assert get_ide_config() == ("IntelliJIdea", "2021.1", tmp_pathplus / "IntelliJIdea2021.1", {})
+
+
+@pytest.mark.parametrize(
+		"name, expected",
+		[
+				("PyCharm", ("PyCharm", None)),
+				("PyCharmCE2020.2", ("PyCharmCE", "2020.2")),
+				("PyCharm-2020.2", ("PyCharm", "2020.2")),
+				]
+		)
+def test_parse_ide(name: str, expected: Tuple[str, Optional[str]]) -> None:
+	assert parse_ide(name) == expected
+
+
+def test_parse_ide_invalid() -> None:
+	with pytest.raises(ValueError, match="Invalid IDE name '2020.2'"):
+		parse_ide("2020.2")
+
+
+@pytest.mark.usefixtures("tmp_project")
+def test_docs_command_unknown_ide(tmp_pathplus: PathPlus, mocked_config: str) -> None:
+	with in_directory(tmp_pathplus):
+		runner = CliRunner(mix_stderr=False)
+		result = runner.invoke(docs_command, args=["--ide", "WebStorm"])
+
+	assert result.exit_code == 1
+	assert result.stderr == f"{PathPlus(mocked_config) / 'WebStorm[0-9]{4}.[0-9]'}\nAborted!\n"
+
+
+def test_get_docs_port_default(monkeypatch, tmp_pathplus: PathPlus) -> None:
+	monkeypatch.setattr(platformdirs, "user_config_dir", lambda *args: str(tmp_pathplus))
+	options_dir = tmp_pathplus / "PyCharm2020.2" / "options"
+	options_dir.mkdir(parents=True)
+
+	(options_dir / "other.xml").write_lines([
+			"<application>",
+			'  <component name="PropertiesComponent" />',
+			"</application>",
+			])
+	assert get_docs_port() == default_port == 63342
+
+	(options_dir / "other.xml").write_lines([
+			"<application>",
+			'  <component name="PropertiesComponent" />',
+			'  <component name="BuiltInServerOptions" builtInServerPort="1234" />',
+			# Not well-formed, but never reached
+			"  <component",
+			])
+	assert get_docs_port() == 1234
+
+
+@pytest.mark.usefixtures("mocked_config")
+def test_find_component() -> None:
+	config = get_ide_config()
+
+	component = _find_component(config.get_options_file("web-browsers.xml"), "WebBrowsersConfiguration")
+	assert component is not None
+	assert component.get("default") == "first"
+	assert component.findall("browser")[0].findtext("settings/profile") == "default-release"
+
+	assert _find_component(config.get_options_file("other.xml"), "WebBrowsersConfiguration") is None
@@ -0,0 +1,157 @@
+# stdlib
+import os
+import subprocess
+from typing import List
+
+# 3rd party
+import pytest
+from consolekit.testing import CliRunner
+from domdf_python_tools.paths import PathPlus, in_directory
+
+# this package
+from repo_helper_pycharm import docs_command, docs_server
+from repo_helper_pycharm.docs_build import build_docs, manifest_file, scan_sources, sources_changed, sphinx_command
+
+
+@pytest.fixture()
+def docs_dir(tmp_pathplus: PathPlus) -> PathPlus:
+	docs_dir = tmp_pathplus / "doc-source"
+	(docs_dir / "_static").mkdir(parents=True)
+	(docs_dir / "conf.py").write_text("project = 'demo'\n")
+	(docs_dir / "index.rst").write_text("Demo\n====\n")
+	(docs_dir / "_static" / "style.css").write_text("body {}\n")
+	return docs_dir
+
+
+@pytest.fixture()
+def sphinx_runs(monkeypatch) -> List[List[str]]:
+	runs = []
+
+	def fake_run(command: List[str], check: bool = False) -> subprocess.CompletedProcess:
+		runs.append(command)
+		html_dir = PathPlus(command[-1])
+		html_dir.maybe_make(parents=True)
+		(html_dir / "index.html").write_text("<html></html>")
+		return subprocess.CompletedProcess(command, 0)
+
+	monkeypatch.setattr(subprocess, "run", fake_run)
+	return runs
+
+
+def touch(path: PathPlus) -> None:
+	stat = path.stat()
+	os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_scan_sources(docs_dir: PathPlus) -> None:
+	(docs_dir / "build" / "html").mkdir(parents=True)
+	(docs_dir / "build" / "html" / "index.html").write_text("<html></html>")
+	(docs_dir / "__pycache__").mkdir()
+	(docs_dir / "__pycache__" / "conf.cpython-38.pyc").write_bytes(b'')
+
+	assert sorted(scan_sources(docs_dir)) == ["_static/style.css", "conf.py", "index.rst"]
+
+
+def test_sphinx_command(docs_dir: PathPlus) -> None:
+	command = sphinx_command(docs_dir)
+	assert command[1:] == [
+			"-m",
+			"sphinx",
+			"-b",
+			"html",
+			"-d",
+			str(docs_dir / "build" / "doctrees"),
+			"-j",
+			"auto",
+			str(docs_dir),
+			str(docs_dir / "build" / "html"),
+			]
+
+
+@pytest.mark.usefixtures("sphinx_runs")
+def test_sources_changed(docs_dir: PathPlus) -> None:
+	assert sources_changed(docs_dir)
+
+	build_docs(docs_dir)
+	assert manifest_file(docs_dir).is_file()
+	assert not sources_changed(docs_dir)
+
+	# Touched, but not changed.
+	touch(docs_dir / "index.rst")
+	assert not sources_changed(docs_dir)
+
+	(docs_dir / "index.rst").write_text("Demo\n====\n\nMore text.\n")
+	assert sources_changed(docs_dir)
+
+
+@pytest.mark.usefixtures("sphinx_runs")
+def test_sources_changed_same_size(docs_dir: PathPlus) -> None:
+	build_docs(docs_dir)
+
+	(docs_dir / "index.rst").write_text("Dome\n====\n")
+	touch(docs_dir / "index.rst")
+	assert sources_changed(docs_dir)
+
+
+@pytest.mark.usefixtures("sphinx_runs")
+def test_sources_changed_added_removed(docs_dir: PathPlus) -> None:
+	build_docs(docs_dir)
+
+	(docs_dir / "usage.rst").write_text("Usage\n=====\n")
+	assert sources_changed(docs_dir)
+
+	build_docs(docs_dir)
+	(docs_dir / "usage.rst").unlink()
+	assert sources_changed(docs_dir)
+
+
+@pytest.mark.usefixtures("sphinx_runs")
+def test_sources_changed_output_missing(docs_dir: PathPlus) -> None:
+	build_docs(docs_dir)
+	(docs_dir / "build" / "html" / "index.html").unlink()
+	assert sources_changed(docs_dir)
+
+
+def test_build_docs(docs_dir: PathPlus, sphinx_runs: List[List[str]]) -> None:
+	assert build_docs(docs_dir)
+	assert sphinx_runs == [sphinx_command(docs_dir)]
+
+	assert not build_docs(docs_dir)
+	assert len(sphinx_runs) == 1
+
+	assert build_docs(docs_dir, force=True)
+	assert len(sphinx_runs) == 2
+
+	(docs_dir / "conf.py").write_text("project = 'demo'\nversion = '1.0'\n")
+	assert build_docs(docs_dir)
+	assert len(sphinx_runs) == 3
+
+
+def test_build_docs_failure(docs_dir: PathPlus, monkeypatch) -> None:
+
+	def fake_run(command: List[str], check: bool = False) -> subprocess.CompletedProcess:
+		raise subprocess.CalledProcessError(2, command)
+
+	monkeypatch.setattr(subprocess, "run", fake_run)
+
+	with pytest.raises(subprocess.CalledProcessError):
+		build_docs(docs_dir)
+
+	assert not manifest_file(docs_dir).exists()
+
+
+@pytest.mark.usefixtures("tmp_project")
+def test_docs_command_build_failure(tmp_pathplus: PathPlus, monkeypatch) -> None:
+
+	def fake_run(command: List[str], check: bool = False) -> subprocess.CompletedProcess:
+		raise subprocess.CalledProcessError(2, command)
+
+	monkeypatch.setattr(subprocess, "run", fake_run)
+	monkeypatch.setattr(docs_server, "is_port_open", lambda *args: False)
+
+	with in_directory(tmp_pathplus):
+		runner = CliRunner(mix_stderr=False)
+		result = runner.invoke(docs_command, args=["--build"])
+
+	assert result.exit_code == 1
+	assert result.stderr == "Building the documentation failed with exit code 2.\nAborted!\n"
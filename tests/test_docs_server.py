@@ -0,0 +1,145 @@
+# stdlib
+import socket
+import urllib.error
+import urllib.request
+from email.utils import formatdate
+from typing import Dict, Iterator, List, Tuple
+
+# 3rd party
+import platformdirs
+import pytest
+from consolekit.testing import CliRunner
+from domdf_python_tools.paths import PathPlus, in_directory
+
+# this package
+from repo_helper_pycharm import docs_command, docs_server
+from repo_helper_pycharm.docs_server import is_port_open, serve_in_thread
+
+
+@pytest.fixture()
+def html_server(tmp_pathplus: PathPlus) -> Iterator[Tuple[str, PathPlus]]:
+	html_dir = tmp_pathplus / "html"
+	(html_dir / "_static").mkdir(parents=True)
+	(html_dir / "index.html").write_text("<html>Index</html>")
+	(html_dir / "_static" / "style.css").write_text("body { color: red; }")
+
+	server, thread = serve_in_thread(html_dir)
+
+	try:
+		yield f"http://localhost:{server.server_address[1]}", html_dir
+	finally:
+		server.shutdown()
+		server.server_close()
+		thread.join()
+
+
+def fetch(url: str, headers: Dict[str, str] = {}, method: str = "GET") -> Tuple[int, Dict[str, str], bytes]:
+	request = urllib.request.Request(url, headers=headers, method=method)
+
+	try:
+		with urllib.request.urlopen(request) as response:
+			return response.status, dict(response.headers), response.read()
+	except urllib.error.HTTPError as e:
+		return e.code, dict(e.headers), e.read()
+
+
+def test_is_port_open() -> None:
+	with socket.socket() as sock:
+		sock.bind(("localhost", 0))
+		port = sock.getsockname()[1]
+
+		assert not is_port_open(port)
+
+		sock.listen()
+		assert is_port_open(port)
+
+
+def test_serve_file(html_server: Tuple[str, PathPlus]) -> None:
+	url, html_dir = html_server
+
+	status, headers, body = fetch(f"{url}/_static/style.css")
+	assert status == 200
+	assert body == b"body { color: red; }"
+	assert headers["Content-Type"] == "text/css"
+	assert headers["Content-Length"] == "20"
+	assert headers["ETag"]
+	mtime = (html_dir / "_static" / "style.css").stat().st_mtime
+	assert headers["Last-Modified"] == formatdate(mtime, usegmt=True)
+
+
+def test_serve_index(html_server: Tuple[str, PathPlus]) -> None:
+	url, html_dir = html_server
+
+	status, headers, body = fetch(f"{url}/")
+	assert status == 200
+	assert body == b"<html>Index</html>"
+
+	status, headers, body = fetch(f"{url}/missing.html")
+	assert status == 404
+
+
+def test_head(html_server: Tuple[str, PathPlus]) -> None:
+	url, html_dir = html_server
+
+	status, headers, body = fetch(f"{url}/index.html", method="HEAD")
+	assert status == 200
+	assert headers["Content-Length"] == "18"
+	assert body == b''
+
+
+def test_conditional_requests(html_server: Tuple[str, PathPlus]) -> None:
+	url, html_dir = html_server
+
+	status, headers, body = fetch(f"{url}/index.html")
+	etag, last_modified = headers["ETag"], headers["Last-Modified"]
+
+	status, headers, body = fetch(f"{url}/index.html", {"If-None-Match": etag})
+	assert status == 304
+	assert body == b''
+
+	status, headers, body = fetch(f"{url}/index.html", {"If-None-Match": '"other"'})
+	assert status == 200
+
+	status, headers, body = fetch(f"{url}/index.html", {"If-Modified-Since": last_modified})
+	assert status == 304
+
+	status, headers, body = fetch(f"{url}/index.html", {"If-Modified-Since": "Thu, 01 Jan 1970 00:00:00 GMT"})
+	assert status == 200
+
+	# The ETag changes when the file does.
+	(html_dir / "index.html").write_text("<html>Updated Index</html>")
+	status, headers, body = fetch(f"{url}/index.html", {"If-None-Match": etag})
+	assert status == 200
+	assert body == b"<html>Updated Index</html>"
+	assert headers["ETag"] != etag
+
+
+@pytest.mark.usefixtures("tmp_project")
+def test_docs_command_not_built(monkeypatch, tmp_pathplus: PathPlus) -> None:
+	monkeypatch.setattr(docs_server, "is_port_open", lambda *args: False)
+
+	with in_directory(tmp_pathplus):
+		runner = CliRunner(mix_stderr=False)
+		result = runner.invoke(docs_command)
+
+	assert result.exit_code == 1
+	html_dir = tmp_pathplus / "doc-source" / "build" / "html"
+	assert result.stderr == f"The documentation has not been built: {html_dir} does not exist.\nAborted!\n"
+
+
+@pytest.mark.usefixtures("tmp_project")
+def test_docs_command_no_other_xml(monkeypatch, tmp_pathplus: PathPlus) -> None:
+	# The IDE only writes 'other.xml' once one of its settings has been changed.
+	monkeypatch.setattr(platformdirs, "user_config_dir", lambda *args: str(tmp_pathplus / "JetBrains"))
+	(tmp_pathplus / "JetBrains" / "PyCharm2024.1" / "options").mkdir(parents=True)
+
+	ports: List[int] = []
+	monkeypatch.setattr(docs_server, "is_port_open", lambda port: ports.append(port))
+
+	with in_directory(tmp_pathplus):
+		runner = CliRunner(mix_stderr=False)
+		result = runner.invoke(docs_command)
+
+	assert ports == [63342]
+	assert result.exit_code == 1
+	assert result.stderr.startswith("The documentation has not been built: ")
@@ -11,6 +11,7 @@ from domdf_python_tools.stringlist import StringList
 # this package
 from repo_helper_pycharm import configure
 from repo_helper_pycharm.iml_manager import ImlManager
+from repo_helper_pycharm.modules import get_module_files
 
 iml_contents = """\
 <?xml version="1.0" encoding="UTF-8"?>
@@ -117,3 +118,92 @@ class TestClass(BaseTest):
 		assert ImlManager(tmp_pathplus).run(diff) == 1
 
 		self.check_output(tmp_pathplus, advanced_file_regression, capsys.readouterr().out)
+
+	@pytest.mark.usefixtures("tmp_project")
+	def test_to_bytes(self, tmp_pathplus: PathPlus) -> None:
+		self.make_fake_iml(tmp_pathplus)
+		iml_manager = ImlManager(tmp_pathplus)
+		iml_manager.run()
+
+		content = iml_manager.to_bytes()
+		assert content == iml_manager.module_file.read_bytes()
+		assert content.startswith(b'<?xml version="1.0" encoding="UTF-8"?>\n<module ')
+		assert content.endswith(b"</module>\n")
+
+	@pytest.mark.usefixtures("tmp_project")
+	def test_unchanged(self, tmp_pathplus: PathPlus, capsys) -> None:
+		self.make_fake_iml(tmp_pathplus)
+		assert ImlManager(tmp_pathplus).run() == 1
+		assert ImlManager(tmp_pathplus).run(show_diff=True) == 0
+
+		# Line endings alone are not a change
+		module_file = tmp_pathplus / ".idea" / "repo_helper_demo.iml"
+		module_file.write_bytes(module_file.read_bytes().replace(b"\n", b"\r\n"))
+		assert ImlManager(tmp_pathplus).run(show_diff=True) == 0
+
+		assert not capsys.readouterr().out
+
+
+modules_xml = """\
+<?xml version="1.0" encoding="UTF-8"?>
+<project version="4">
+  <component name="ProjectModuleManager">
+    <modules>
+      <module fileurl="file://$PROJECT_DIR$/.idea/repo_helper_demo.iml" filepath="$PROJECT_DIR$/.idea/repo_helper_demo.iml" />
+      <module fileurl="file://$PROJECT_DIR$/.idea/other.iml" filepath="$PROJECT_DIR$/.idea/other.iml" />
+      <module fileurl="file://$PROJECT_DIR$/.idea/missing.iml" filepath="$PROJECT_DIR$/.idea/missing.iml" />
+    </modules>
+  </component>
+</project>
+"""
+
+
+class TestModules(BaseTest):
+
+	@pytest.mark.usefixtures("tmp_project")
+	def test_get_module_files(self, tmp_pathplus: PathPlus) -> None:
+		self.make_fake_iml(tmp_pathplus)
+		(tmp_pathplus / ".idea" / "other.iml").write_clean(iml_contents)
+		(tmp_pathplus / ".idea" / "unlisted.iml").write_clean(iml_contents)
+
+		assert get_module_files(tmp_pathplus) == [
+				tmp_pathplus / ".idea" / "other.iml",
+				tmp_pathplus / ".idea" / "repo_helper_demo.iml",
+				tmp_pathplus / ".idea" / "unlisted.iml",
+				]
+
+		(tmp_pathplus / ".idea" / "modules.xml").write_clean(modules_xml)
+
+		assert get_module_files(tmp_pathplus) == [
+				tmp_pathplus / ".idea" / "repo_helper_demo.iml",
+				tmp_pathplus / ".idea" / "other.iml",
+				]
+
+	@pytest.mark.usefixtures("tmp_project")
+	def test_run_all_modules(self, tmp_pathplus: PathPlus, capsys) -> None:
+		self.make_fake_iml(tmp_pathplus)
+		(tmp_pathplus / ".idea" / "other.iml").write_clean(iml_contents)
+		(tmp_pathplus / ".idea" / "unlisted.iml").write_clean(iml_contents)
+		(tmp_pathplus / ".idea" / "modules.xml").write_clean(modules_xml)
+
+		iml_manager = ImlManager(tmp_pathplus)
+		assert iml_manager.run(show_diff=True) == 1
+		assert iml_manager.changed_files == [
+				tmp_pathplus / ".idea" / "repo_helper_demo.iml",
+				tmp_pathplus / ".idea" / "other.iml",
+				]
+
+		stdout = capsys.readouterr().out
+		assert stdout.index("--- repo_helper_demo.iml\t(original)") < stdout.index("--- other.iml\t(original)")
+
+		expected = (tmp_pathplus / ".idea" / "repo_helper_demo.iml").read_text()
+		assert (tmp_pathplus / ".idea" / "other.iml").read_text() == expected
+		assert (tmp_pathplus / ".idea" / "unlisted.iml").read_text() == iml_contents
+
+		assert ImlManager(tmp_pathplus).run() == 0
+		assert ImlManager(tmp_pathplus).run_streaming() == 0
+
+		(tmp_pathplus / ".idea" / "other.iml").write_clean(iml_contents)
+		iml_manager = ImlManager(tmp_pathplus)
+		assert iml_manager.run_streaming() == 1
+		assert iml_manager.changed_files == [tmp_pathplus / ".idea" / "other.iml"]
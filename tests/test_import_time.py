@@ -0,0 +1,78 @@
+# stdlib
+import subprocess
+import sys
+from typing import Dict
+
+# 3rd party
+import pytest
+from click.testing import CliRunner  # type: ignore[import-untyped]
+
+# this package
+from repo_helper_pycharm.cli import pycharm
+
+# Modules which must not be imported by ``import repo_helper_pycharm``.
+heavy_modules = ("click", "consolekit", "repo_helper", "lxml", "domdf_python_tools", "apeye")
+
+# The maximum cumulative import time of ``repo_helper_pycharm`` itself, in microseconds.
+import_time_budget = 25_000
+
+
+def import_times(statement: str) -> Dict[str, int]:
+	process = subprocess.run(
+			[sys.executable, "-X", "importtime", "-c", statement],
+			stdout=subprocess.PIPE,
+			stderr=subprocess.PIPE,
+			check=True,
+			)
+
+	times = {}
+
+	for line in process.stderr.decode("UTF-8").splitlines():
+		if not line.startswith("import time:") or "|" not in line:
+			continue
+
+		_, cumulative, name = line[len("import time:"):].split('|')
+		if cumulative.strip().isdigit():
+			times[name.strip()] = int(cumulative)
+
+	return times
+
+
+def test_import_time() -> None:
+	times = import_times("import repo_helper_pycharm")
+
+	assert "repo_helper_pycharm" in times
+	assert times["repo_helper_pycharm"] < import_time_budget
+
+	for module in heavy_modules:
+		assert module not in times
+
+
+@pytest.mark.parametrize("name", ["pycharm", "configure", "docs_command", "schema"])
+def test_lazy_attributes(name: str) -> None:
+	process = subprocess.run(
+			[sys.executable, "-c", f"import repo_helper_pycharm, click; print(repo_helper_pycharm.{name}.name)"],
+			stdout=subprocess.PIPE,
+			check=True,
+			)
+	assert process.stdout.decode("UTF-8").strip() in {"pycharm", "configure", "docs", "schema"}
+
+
+def test_subcommands_loaded_lazily() -> None:
+	process = subprocess.run(
+			[sys.executable, "-c", "import sys, repo_helper_pycharm; repo_helper_pycharm.pycharm; print(*sys.modules)"],
+			stdout=subprocess.PIPE,
+			check=True,
+			)
+	modules = process.stdout.decode("UTF-8").split()
+	assert "repo_helper_pycharm.cli" in modules
+	assert "repo_helper_pycharm.commands" not in modules
+	assert "lxml" not in modules
+
+
+def test_list_commands() -> None:
+	result = CliRunner().invoke(pycharm, ["--help"])
+	assert result.exit_code == 0
+	assert "configure" in result.output
+	assert "docs" in result.output
+	assert "schema" in result.output
@@ -0,0 +1,80 @@
+# stdlib
+import json
+import pstats
+
+# 3rd party
+import pytest
+from consolekit.testing import CliRunner, Result
+from domdf_python_tools.paths import PathPlus, in_directory
+
+# this package
+from repo_helper_pycharm import configure, schema
+from repo_helper_pycharm.profiling import phase, profiling
+
+
+def test_phase_disabled() -> None:
+	assert phase("foo") is phase("bar")
+
+	with phase("foo"):
+		pass
+
+
+def test_profiling(capsys) -> None:
+	with profiling() as profiler:
+		for _ in range(3):
+			with phase("foo"):
+				pass
+
+		with phase("bar"):
+			pass
+
+	assert list(profiler.timings) == ["foo", "bar"]
+	assert profiler.calls == {"foo": 3, "bar": 1}
+	assert profiler.elapsed is not None
+	assert profiler.elapsed >= sum(profiler.timings.values())
+
+	stderr = capsys.readouterr().err.splitlines()
+	assert stderr[0].split() == ["Phase", "Time", "(ms)", "Calls"]
+	assert stderr[1].split()[::2] == ["foo", '3']
+	assert stderr[2].split()[::2] == ["bar", '1']
+	assert stderr[3].split()[0] == "total"
+
+	# Profiling is disabled again afterwards
+	assert phase("foo") is phase("bar")
+
+
+class TestCommand:
+
+	@pytest.mark.usefixtures("tmp_project", "fake_iml")
+	def test_configure_profile(self, tmp_pathplus: PathPlus) -> None:
+		with in_directory(tmp_pathplus):
+			runner = CliRunner(mix_stderr=False)
+			result: Result = runner.invoke(
+					configure,
+					catch_exceptions=False,
+					args=["--diff", "--profile", "--profile-json", "profile.json", "--profile-cprofile", "profile.prof"],
+					)
+			assert result.exit_code == 1
+
+		phases = [line.split()[0] for line in result.stderr.splitlines()[1:]]
+		assert phases == ["imports", "settings", "modules", "parse", "transforms", "tostring", "diff", "write", "total"]
+
+		timings = json.loads((tmp_pathplus / "profile.json").read_text())
+		assert list(timings["phases"]) == phases[:-1]
+		assert timings["phases"]["parse"]["calls"] == 1
+		assert timings["total"] > 0
+
+		stats = pstats.Stats(str(tmp_pathplus / "profile.prof"))
+		assert any("to_bytes" in function for _, _, function in stats.stats)  # type: ignore[attr-defined]
+
+	@pytest.mark.usefixtures("tmp_project")
+	def test_schema_profile(self, tmp_pathplus: PathPlus) -> None:
+		(tmp_pathplus / ".idea").mkdir()
+
+		with in_directory(tmp_pathplus):
+			runner = CliRunner(mix_stderr=False)
+			result: Result = runner.invoke(schema, catch_exceptions=False, args=["--profile"])
+			assert result.exit_code == 0
+
+		phases = [line.split()[0] for line in result.stderr.splitlines()[1:]]
+		assert phases == ["imports", "schema", "write", "total"]
@@ -1,4 +1,5 @@
 # stdlib
+import json
 import os
 import re
 from abc import abstractmethod
@@ -10,8 +11,17 @@ from consolekit.testing import CliRunner, Result
 from domdf_python_tools.paths import PathPlus, in_directory
 
 # this package
+from repo_helper_pycharm import register_schema as register_schema_module
 from repo_helper_pycharm import schema
-from repo_helper_pycharm.register_schema import register_schema
+from repo_helper_pycharm.cache import get_cache_dir
+from repo_helper_pycharm.register_schema import (
+		SchemaMapping,
+		builtin_mappings,
+		get_schema_file,
+		get_schema_mappings,
+		load_schema_mappings,
+		register_schema
+		)
 
 
 class BaseTest:
@@ -27,12 +37,12 @@ class BaseTest:
 				stdout: str,
 				) -> None:
 			assert re.match(
-					r"Wrote schema to .*/repo_helper/repo_helper_schema\.json",
+					r"Wrote schema to .*/schema/.*/repo_helper_schema\.json",
 					stdout.splitlines()[0],
 					)
 
 			file_content = re.sub(
-					'value=".*/repo_helper/repo_helper_schema.json"',
+					'value=".*/schema/.*/repo_helper_schema.json"',
 					'value="repo_helper/repo_helper_schema.json"',
 					(tmp_pathplus / ".idea/jsonSchemas.xml").read_text(),
 					)
@@ -46,12 +56,12 @@ class BaseTest:
 				stdout: str,
 				) -> None:
 			assert re.match(
-					r"Wrote schema to .*\\repo_helper\\repo_helper_schema\.json",
+					r"Wrote schema to .*\\schema\\.*\\repo_helper_schema\.json",
 					stdout.splitlines()[0],
 					)
 
 			file_content = re.sub(
-					r'value=".*\\repo_helper\\repo_helper_schema.json"',
+					r'value=".*\\schema\\.*\\repo_helper_schema.json"',
 					r'value="repo_helper\\repo_helper_schema.json"',
 					(tmp_pathplus / ".idea/jsonSchemas.xml").read_text(),
 					)
@@ -130,3 +140,169 @@ class TestFunction(BaseTest):
 		(tmp_pathplus / ".idea").maybe_make()
 		register_schema(tmp_pathplus)
 		self.check_output(tmp_pathplus, advanced_file_regression, capsys.readouterr().out)
+
+
+def test_get_schema_file(user_cache_dir: str, capsys) -> None:
+	schema_file = get_schema_file()
+	assert schema_file.is_file()
+	assert str(schema_file).startswith(user_cache_dir)
+	assert "modname" in json.loads(schema_file.read_text())["properties"]
+	assert get_schema_file() == schema_file
+	assert not capsys.readouterr().out
+
+
+@pytest.mark.usefixtures("tmp_project")
+def test_register_schema_updates_path(tmp_pathplus: PathPlus, capsys) -> None:
+	(tmp_pathplus / ".idea").maybe_make()
+	register_schema(tmp_pathplus)
+
+	mapping_file = tmp_pathplus / ".idea/jsonSchemas.xml"
+	schema_file = str(get_schema_file())
+	old_schema_file = str(get_cache_dir() / "schema" / "old" / "repo_helper_schema.json")
+	mapping_file.write_text(mapping_file.read_text().replace(schema_file, old_schema_file))
+
+	register_schema(tmp_pathplus)
+	assert old_schema_file not in mapping_file.read_text()
+	assert schema_file in mapping_file.read_text()
+
+
+@pytest.mark.usefixtures("tmp_project")
+def test_register_schema_unchanged(tmp_pathplus: PathPlus) -> None:
+	(tmp_pathplus / ".idea").maybe_make()
+	schema_file = PathPlus("/schemas/repo_helper_schema.json")
+	assert register_schema(tmp_pathplus, schema_file)
+
+	mapping_file = tmp_pathplus / ".idea/jsonSchemas.xml"
+	os.utime(mapping_file, ns=(0, 0))
+
+	assert not register_schema(tmp_pathplus, schema_file)
+	assert mapping_file.stat().st_mtime_ns == 0
+
+
+@pytest.mark.usefixtures("tmp_project")
+def test_register_schema_other_entries(tmp_pathplus: PathPlus) -> None:
+	(tmp_pathplus / ".idea").maybe_make()
+	mapping_file = tmp_pathplus / ".idea/jsonSchemas.xml"
+	mapping_file.write_lines([
+			'<?xml version="1.0" encoding="UTF-8"?>',
+			'<project version="4">',
+			'  <component name="JsonSchemaMappingsProjectConfiguration">',
+			"    <state>",
+			"      <map>",
+			'        <entry key="my_schema">',
+			"          <value>",
+			"            <SchemaInfo>",
+			'              <option name="name" value="my_schema" />',
+			"            </SchemaInfo>",
+			"          </value>",
+			"        </entry>",
+			"      </map>",
+			"    </state>",
+			"  </component>",
+			"</project>",
+			])
+
+	mappings = [
+			SchemaMapping("first", "first.json", ("first.yml", )),
+			SchemaMapping("second", "second.json", ("*.toml", )),
+			]
+	assert register_schema(tmp_pathplus, mappings=mappings)
+
+	content = mapping_file.read_text()
+	assert content.startswith('<?xml version="1.0" encoding="UTF-8"?>\n')
+	assert re.findall(r'<entry key="(.*)">', content) == ["my_schema", "first", "second"]
+	assert '<option name="pattern" value="true"/>' in content
+
+	# Existing entries may have been edited in PyCharm, so they are only replaced with ``force``.
+	mappings[0] = SchemaMapping("first", "first.json", ("first.yml", "first.yaml"))
+	assert not register_schema(tmp_pathplus, mappings=mappings)
+	assert '<option name="path" value="first.yaml"/>' not in mapping_file.read_text()
+
+	assert register_schema(tmp_pathplus, mappings=mappings, force=True)
+	content = mapping_file.read_text()
+	assert re.findall(r'<entry key="(.*)">', content) == ["my_schema", "first", "second"]
+	assert '<option name="path" value="first.yaml"/>' in content
+
+	assert not register_schema(tmp_pathplus, mappings=mappings, force=True)
+
+
+@pytest.mark.usefixtures("tmp_project")
+def test_register_schema_user_modified(tmp_pathplus: PathPlus) -> None:
+	(tmp_pathplus / ".idea").maybe_make()
+	schema_file = get_schema_file()
+	register_schema(tmp_pathplus, schema_file)
+
+	mapping_file = tmp_pathplus / ".idea/jsonSchemas.xml"
+	mapping_file.write_text(mapping_file.read_text().replace(str(schema_file), "/my/repo_helper_schema.json"))
+
+	with in_directory(tmp_pathplus):
+		runner = CliRunner(mix_stderr=False)
+
+		result: Result = runner.invoke(schema, catch_exceptions=False)
+		assert result.exit_code == 0
+		assert "/my/repo_helper_schema.json" in mapping_file.read_text()
+
+		result = runner.invoke(schema, catch_exceptions=False, args=["--force"])
+		assert result.exit_code == 0
+		assert "/my/repo_helper_schema.json" not in mapping_file.read_text()
+
+
+def test_load_schema_mappings(tmp_pathplus: PathPlus, example_config: str) -> None:
+	(tmp_pathplus / "repo_helper.yml").write_clean(example_config)
+	assert load_schema_mappings(tmp_pathplus) == []
+
+	# The built in mappings are only registered if they are named.
+	mappings = get_schema_mappings(tmp_pathplus, PathPlus("repo_helper_schema.json"))
+	assert mappings == [SchemaMapping("repo_helper_schema", "repo_helper_schema.json", ("repo_helper.yml", ))]
+
+	(tmp_pathplus / "pycharm_schemas.yml").write_lines([
+			"- pre_commit_config",
+			"- name: tox_ini",
+			"  schema: schemas/tox.json",
+			"  patterns: tox.ini",
+			"- name: github_workflow",
+			"  schema: schemas/workflow.json",
+			"  patterns:",
+			"    - .github/workflows/*.yml",
+			])
+
+	assert load_schema_mappings(tmp_pathplus / "doc-source") == [
+			builtin_mappings[1],
+			SchemaMapping("tox_ini", "schemas/tox.json", ("tox.ini", )),
+			SchemaMapping("github_workflow", "schemas/workflow.json", (".github/workflows/*.yml", )),
+			]
+
+	mappings = get_schema_mappings(tmp_pathplus, PathPlus("repo_helper_schema.json"))
+	assert [mapping.name for mapping in mappings] == [
+			"repo_helper_schema",
+			"pre_commit_config",
+			"tox_ini",
+			"github_workflow",
+			]
+	assert mappings[0] == SchemaMapping("repo_helper_schema", "repo_helper_schema.json", ("repo_helper.yml", ))
+	assert mappings[3].schema == "schemas/workflow.json"
+
+
+def test_load_schema_mappings_invalid(tmp_pathplus: PathPlus, example_config: str) -> None:
+	(tmp_pathplus / "repo_helper.yml").write_clean(example_config)
+
+	(tmp_pathplus / "pycharm_schemas.yml").write_lines(["- name: tox_ini"])
+	with pytest.raises(ValueError, match="Invalid schema mappings in .*pycharm_schemas.yml: expected a list"):
+		load_schema_mappings(tmp_pathplus)
+
+	(tmp_pathplus / "pycharm_schemas.yml").write_lines(["name: tox_ini"])
+	with pytest.raises(ValueError, match="Invalid schema mappings in .*pycharm_schemas.yml: expected a list"):
+		load_schema_mappings(tmp_pathplus)
+
+	(tmp_pathplus / "pycharm_schemas.yml").write_lines(["- gitlab_ci"])
+	with pytest.raises(ValueError, match="Unknown schema mapping 'gitlab_ci' in .*pycharm_schemas.yml"):
+		load_schema_mappings(tmp_pathplus)
+
+
+def test_get_schema_mappings_entry_points(tmp_pathplus: PathPlus, example_config: str, monkeypatch) -> None:
+	(tmp_pathplus / "repo_helper.yml").write_clean(example_config)
+	mapping = SchemaMapping("from_plugin", "https://example.com/schema.json", ("plugin.yml", ))
+	monkeypatch.setattr(register_schema_module, "_entry_point_mappings", lambda: (mapping, ))
+
+	mappings = get_schema_mappings(tmp_pathplus, PathPlus("repo_helper_schema.json"))
+	assert mappings[-1] == mapping
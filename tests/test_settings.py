@@ -0,0 +1,121 @@
+# stdlib
+import json
+from typing import List
+
+# 3rd party
+import pytest
+from domdf_python_tools.paths import PathPlus
+
+# this package
+from repo_helper_pycharm import settings
+from repo_helper_pycharm.settings import PycharmSettings, load_settings, load_settings_full
+
+
+@pytest.mark.usefixtures("tmp_project")
+def test_load_settings(tmp_pathplus: PathPlus) -> None:
+	expected = PycharmSettings(tmp_pathplus, "doc-source", True)
+	assert load_settings(tmp_pathplus) == expected
+	assert load_settings_full(tmp_pathplus) == expected
+
+	(tmp_pathplus / "subdir").mkdir()
+	assert load_settings(tmp_pathplus / "subdir") == expected
+
+
+@pytest.mark.usefixtures("tmp_project")
+def test_load_settings_values(tmp_pathplus: PathPlus, monkeypatch) -> None:
+	(tmp_pathplus / "repo_helper.yml").append_text("docs_dir: docs\nenable_docs: false\n")
+
+	def fail(repo_dir) -> None:  # noqa: MAN001
+		raise AssertionError("The full loader should not be used.")
+
+	monkeypatch.setattr(settings, "load_settings_full", fail)
+
+	assert load_settings(tmp_pathplus) == PycharmSettings(tmp_pathplus, "docs", False)
+
+
+@pytest.mark.parametrize(
+		"extra",
+		[
+				pytest.param("docs_dir: '{{ modname }}-docs'", id="templated"),
+				pytest.param("docs_dir: 1234", id="not_str"),
+				pytest.param("enable_docs: 'yes'", id="not_bool"),
+				],
+		)
+@pytest.mark.usefixtures("tmp_project")
+def test_load_settings_fallback(tmp_pathplus: PathPlus, monkeypatch, extra: str) -> None:
+	(tmp_pathplus / "repo_helper.yml").append_text(f"{extra}\n")
+
+	calls: List[PathPlus] = []
+
+	def load_settings_full(repo_dir: PathPlus) -> PycharmSettings:
+		calls.append(repo_dir)
+		return PycharmSettings(repo_dir, "docs", True)
+
+	monkeypatch.setattr(settings, "load_settings_full", load_settings_full)
+
+	assert load_settings(tmp_pathplus) == PycharmSettings(tmp_pathplus, "docs", True)
+	assert calls == [tmp_pathplus]
+
+
+def test_load_settings_missing(tmp_pathplus: PathPlus) -> None:
+	with pytest.raises(FileNotFoundError, match="'repo_helper.yml' not found in "):
+		load_settings(tmp_pathplus)
+
+
+@pytest.mark.usefixtures("tmp_project")
+def test_load_settings_cached(tmp_pathplus: PathPlus, monkeypatch) -> None:
+	expected = PycharmSettings(tmp_pathplus, "doc-source", True)
+	assert load_settings(tmp_pathplus) == expected
+
+	def fail(target_repo, content) -> None:  # noqa: MAN001
+		raise AssertionError("repo_helper.yml should not be parsed.")
+
+	monkeypatch.setattr(settings, "_parse_settings", fail)
+
+	assert load_settings(tmp_pathplus) == expected
+	assert load_settings(tmp_pathplus / "subdir") == expected
+
+	with pytest.raises(AssertionError, match="should not be parsed"):
+		load_settings(tmp_pathplus, use_cache=False)
+
+	# A different file has a different cache entry.
+	(tmp_pathplus / "repo_helper.yml").append_text("docs_dir: docs\n")
+	with pytest.raises(AssertionError, match="should not be parsed"):
+		load_settings(tmp_pathplus)
+
+
+@pytest.mark.usefixtures("tmp_project")
+def test_load_settings_cache_full(tmp_pathplus: PathPlus, monkeypatch) -> None:
+	# The results of the full loader are cached too.
+	(tmp_pathplus / "repo_helper.yml").append_text("docs_dir: '{{ modname }}-docs'\n")
+
+	calls = []
+
+	def load_full(repo_dir) -> PycharmSettings:  # noqa: MAN001
+		calls.append(repo_dir)
+		return PycharmSettings(repo_dir, "repo_helper_demo-docs", True)
+
+	monkeypatch.setattr(settings, "load_settings_full", load_full)
+
+	expected = PycharmSettings(tmp_pathplus, "repo_helper_demo-docs", True)
+	assert load_settings(tmp_pathplus) == expected
+	assert load_settings(tmp_pathplus) == expected
+	assert calls == [tmp_pathplus]
+
+
+@pytest.mark.usefixtures("tmp_project")
+def test_load_settings_cache_invalid(tmp_pathplus: PathPlus) -> None:
+	content = (tmp_pathplus / "repo_helper.yml").read_bytes()
+	cache_file = settings._cache_file(content)
+	cache_file.parent.maybe_make(parents=True)
+	cache_file.write_text("{not json")
+
+	assert load_settings(tmp_pathplus) == PycharmSettings(tmp_pathplus, "doc-source", True)
+	assert json.loads(cache_file.read_text()) == {"docs_dir": "doc-source", "enable_docs": True}
+
+
+def test_repo_helper_version() -> None:
+	# 3rd party
+	import repo_helper
+
+	assert settings._repo_helper_version() == repo_helper.__version__
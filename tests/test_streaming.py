@@ -0,0 +1,78 @@
+# stdlib
+from io import BytesIO
+
+# 3rd party
+import pytest
+from consolekit.testing import CliRunner, Result
+from domdf_python_tools.paths import PathPlus, in_directory
+
+# this package
+from repo_helper_pycharm import configure
+from repo_helper_pycharm.iml_manager import ImlManager
+from repo_helper_pycharm.streaming import stream_transforms
+from repo_helper_pycharm.transforms import get_transforms
+
+untouched = """\
+  <component name="PackageRequirementsSettings">
+    <option name="requirementsPath" value="" />
+  </component>
+"""
+
+
+@pytest.fixture()
+def iml_manager(tmp_project: None, fake_iml: PathPlus, tmp_pathplus: PathPlus) -> ImlManager:
+	return ImlManager(tmp_pathplus)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 65536])
+def test_stream_transforms(iml_manager: ImlManager, chunk_size: int) -> None:
+	dest = BytesIO()
+	assert stream_transforms(iml_manager, iml_manager.module_file, dest, get_transforms().values(), chunk_size)
+
+	output = dest.getvalue().decode("UTF-8")
+	assert untouched in output
+	assert "PyDocumentationSettings" not in output
+	assert '    <option name="PROJECT_TEST_RUNNER" value="pytest"/>\n  </component>\n</module>\n' in output
+	assert '      <excludeFolder url="file://$MODULE_DIR$/venv"/>\n    </content>\n' in output
+
+
+def test_stream_transforms_unchanged(iml_manager: ImlManager) -> None:
+	dest = BytesIO()
+	assert not stream_transforms(iml_manager, iml_manager.module_file, dest, [])
+	assert dest.getvalue() == iml_manager.module_file.read_bytes()
+
+
+def test_run_streaming(iml_manager: ImlManager, tmp_pathplus: PathPlus, iml_contents: str) -> None:
+	assert iml_manager.run_streaming() == 1
+	streamed = iml_manager.module_file.read_text()
+	assert untouched in streamed
+	assert not list((tmp_pathplus / ".idea").glob(".*.tmp"))
+
+	# Streaming should agree with the tree-based rewrite, apart from the untouched components.
+	iml_manager.module_file.write_text(iml_contents)
+	assert ImlManager(tmp_pathplus).run() == 1
+	assert ImlManager(tmp_pathplus).run_streaming() == 0
+
+
+def test_self_closing_component(iml_manager: ImlManager, iml_contents: str) -> None:
+	iml_manager.module_file.write_text(
+			iml_contents.replace("</module>", '  <component name="PyDocumentationSettings" />\n</module>'),
+			)
+
+	assert iml_manager.run_streaming() == 1
+	assert "PyDocumentationSettings" not in iml_manager.module_file.read_text()
+	assert iml_manager.module_file.read_text().endswith("  </component>\n</module>\n")
+
+
+@pytest.mark.usefixtures("tmp_project", "fake_iml")
+def test_configure_stream(tmp_pathplus: PathPlus) -> None:
+	with in_directory(tmp_pathplus):
+		runner = CliRunner(mix_stderr=False)
+		result: Result = runner.invoke(configure, catch_exceptions=False, args=["--stream", "--diff"])
+		assert result.exit_code == 1
+		assert '-    <option name="PROJECT_TEST_RUNNER" value="nose" />' in result.stdout
+
+		result = runner.invoke(configure, catch_exceptions=False, args=["--stream", "--no-cache"])
+		assert result.exit_code == 0
+
+	assert untouched in (tmp_pathplus / ".idea" / "repo_helper_demo.iml").read_text()
@@ -0,0 +1,168 @@
+# stdlib
+import os
+import sys
+import threading
+import time
+
+# 3rd party
+import pytest
+from domdf_python_tools.paths import PathPlus
+
+# this package
+from repo_helper_pycharm import transaction
+from repo_helper_pycharm.transaction import IdeaTransaction, atomic_write, lock_directory
+
+
+@pytest.fixture()
+def idea_dir(tmp_pathplus: PathPlus) -> PathPlus:
+	idea_dir = tmp_pathplus / ".idea"
+	idea_dir.mkdir()
+	(idea_dir / "unchanged.xml").write_text("<project/>\n")
+	(idea_dir / "changed.xml").write_text("<project/>\n")
+	return idea_dir
+
+
+def test_commit(idea_dir: PathPlus) -> None:
+	os.utime(idea_dir / "unchanged.xml", ns=(0, 0))
+
+	txn = IdeaTransaction(idea_dir)
+	txn.write(idea_dir / "unchanged.xml", "<project/>\n")
+	txn.write(idea_dir / "changed.xml", b"<project version='4'/>\n")
+	txn.write(idea_dir / "new.xml", "<module/>\n")
+
+	assert (idea_dir / "changed.xml").read_text() == "<project/>\n"
+	assert not (idea_dir / "new.xml").exists()
+
+	assert txn.commit() == [idea_dir / "changed.xml", idea_dir / "new.xml"]
+	assert not txn.pending
+
+	assert (idea_dir / "changed.xml").read_text() == "<project version='4'/>\n"
+	assert (idea_dir / "new.xml").read_text() == "<module/>\n"
+	assert (idea_dir / "unchanged.xml").stat().st_mtime_ns == 0
+	assert sorted(p.name for p in idea_dir.iterdir()) == ["changed.xml", "new.xml", "unchanged.xml"]
+
+
+def test_replace(idea_dir: PathPlus) -> None:
+	temp_file = idea_dir / ".changed.xml.tmp"
+	temp_file.write_text("<project version='4'/>\n")
+
+	with IdeaTransaction(idea_dir, fsync=False) as txn:
+		txn.replace(idea_dir / "changed.xml", temp_file)
+		assert txn.pending == [idea_dir / "changed.xml"]
+
+	assert (idea_dir / "changed.xml").read_text() == "<project version='4'/>\n"
+	assert not temp_file.exists()
+
+
+def test_context_manager_exception(idea_dir: PathPlus) -> None:
+	temp_file = idea_dir / ".unchanged.xml.tmp"
+	temp_file.write_text("<project version='4'/>\n")
+
+	def stage_and_fail() -> None:
+		with IdeaTransaction(idea_dir) as txn:
+			txn.write(idea_dir / "changed.xml", "<project version='4'/>\n")
+			txn.replace(idea_dir / "unchanged.xml", temp_file)
+			raise ValueError("Oops")
+
+	with pytest.raises(ValueError, match="Oops"):
+		stage_and_fail()
+
+	assert (idea_dir / "changed.xml").read_text() == "<project/>\n"
+	assert (idea_dir / "unchanged.xml").read_text() == "<project/>\n"
+	assert not temp_file.exists()
+
+
+def test_commit_failure(idea_dir: PathPlus, monkeypatch) -> None:
+	# If any file can't be written, none of them are changed.
+	real_write_bytes = transaction._write_bytes
+
+	def write_bytes(path: PathPlus, content: bytes, fsync: bool) -> None:
+		if path.name.startswith(".new.xml"):
+			raise OSError("Disk full")
+		real_write_bytes(path, content, fsync)
+
+	monkeypatch.setattr(transaction, "_write_bytes", write_bytes)
+
+	txn = IdeaTransaction(idea_dir)
+	txn.write(idea_dir / "changed.xml", "<project version='4'/>\n")
+	txn.write(idea_dir / "new.xml", "<module/>\n")
+
+	with pytest.raises(OSError, match="Disk full"):
+		txn.commit()
+
+	assert (idea_dir / "changed.xml").read_text() == "<project/>\n"
+	assert sorted(p.name for p in idea_dir.iterdir()) == ["changed.xml", "unchanged.xml"]
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="File locking requires fcntl")
+def test_lock_directory(idea_dir: PathPlus) -> None:
+	events = []
+
+	def other_writer() -> None:
+		with lock_directory(idea_dir):
+			events.append("other")
+
+	with lock_directory(idea_dir):
+		thread = threading.Thread(target=other_writer)
+		thread.start()
+		time.sleep(0.1)
+		events.append("first")
+
+	thread.join()
+	assert events == ["first", "other"]
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="File locking requires fcntl")
+def test_interleaved_transactions(idea_dir: PathPlus) -> None:
+	# Each transaction reads the file inside its block, so neither overwrites the other's change.
+	config_file = idea_dir / "changed.xml"
+	started = threading.Event()
+
+	def append(text: str) -> None:
+		with IdeaTransaction(idea_dir) as txn:
+			started.set()
+			content = config_file.read_text()
+			time.sleep(0.1)
+			txn.write(config_file, f"{content}{text}\n")
+
+	thread = threading.Thread(target=append, args=("<first/>", ))
+	thread.start()
+	started.wait()
+	append("<second/>")
+	thread.join()
+
+	assert config_file.read_text() == "<project/>\n<first/>\n<second/>\n"
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="File locking requires fcntl")
+def test_locked_reentrant(idea_dir: PathPlus) -> None:
+	txn = IdeaTransaction(idea_dir)
+
+	with txn.locked(), txn.locked():
+		txn.write(idea_dir / "changed.xml", "<project version='4'/>\n")
+		assert txn.commit() == [idea_dir / "changed.xml"]
+
+	# The lock has been released.
+	with lock_directory(idea_dir):
+		pass
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="File modes are not supported on Windows")
+def test_commit_keeps_mode(idea_dir: PathPlus) -> None:
+	os.chmod(idea_dir / "changed.xml", 0o600)
+
+	with IdeaTransaction(idea_dir) as txn:
+		txn.write(idea_dir / "changed.xml", "<project version='4'/>\n")
+
+	assert (idea_dir / "changed.xml").stat().st_mode & 0o777 == 0o600
+
+
+def test_atomic_write(tmp_pathplus: PathPlus) -> None:
+	path = tmp_pathplus / "cache" / "entry.json"
+
+	atomic_write(path, "{}")
+	assert path.read_text() == "{}"
+
+	atomic_write(path, "[]")
+	assert path.read_text() == "[]"
+	assert [p.name for p in path.parent.iterdir()] == ["entry.json"]
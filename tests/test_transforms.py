@@ -0,0 +1,107 @@
+# 3rd party
+import pytest
+from consolekit.testing import CliRunner, Result
+from domdf_python_tools.paths import PathPlus, in_directory
+
+# this package
+from repo_helper_pycharm import configure
+from repo_helper_pycharm.iml_manager import ImlManager
+from repo_helper_pycharm.transforms import Transform, get_transforms, minimal_excludes, select_transforms
+
+
+def test_get_transforms() -> None:
+	transforms = get_transforms()
+	assert list(transforms)[:3] == ["excludes", "test-runner", "docstring-format"]
+	assert transforms["excludes"].component == "NewModuleRootManager"
+
+
+def test_select_transforms() -> None:
+	assert [t.name for t in select_transforms(only=["test-runner"])] == ["test-runner"]
+	assert "test-runner" not in [t.name for t in select_transforms(skip=["test-runner"])]
+	assert select_transforms(only=["test-runner"], skip=["test-runner"]) == []
+
+	with pytest.raises(ValueError, match="Unknown transform 'foo'"):
+		select_transforms(only=["foo"])
+
+
+@pytest.mark.usefixtures("tmp_project", "fake_iml")
+def test_single_pass(tmp_pathplus: PathPlus) -> None:
+	manager = ImlManager(tmp_pathplus)
+
+	seen = []
+
+	def record(manager: ImlManager, component) -> None:
+		seen.append(component.get("name"))
+
+	transforms = [
+			Transform("first", "TestRunnerService", record),
+			Transform("second", "TestRunnerService", record),
+			Transform("third", "PackageRequirementsSettings", record),
+			Transform("missing", "NotAComponent", record),
+			]
+
+	manager.apply_transforms(transforms)
+
+	# Components are visited in document order, with each component's transforms applied in turn
+
+	assert seen == ["PackageRequirementsSettings", "TestRunnerService", "TestRunnerService"]
+
+
+@pytest.mark.usefixtures("tmp_project", "fake_iml")
+def test_only_skip(tmp_pathplus: PathPlus) -> None:
+	iml_file = tmp_pathplus / ".idea" / "repo_helper_demo.iml"
+
+	with in_directory(tmp_pathplus):
+		runner = CliRunner(mix_stderr=False)
+		result: Result = runner.invoke(configure, catch_exceptions=False, args=["--only", "test-runner"])
+		assert result.exit_code == 1
+
+		content = iml_file.read_text()
+		assert 'value="pytest"' in content
+		assert "PyDocumentationSettings" in content
+		assert 'excludeFolder url="file://$MODULE_DIR$/build"' not in content
+
+		result = runner.invoke(configure, catch_exceptions=False, args=["--skip", "excludes"])
+		assert result.exit_code == 1
+		assert "PyDocumentationSettings" not in iml_file.read_text()
+
+		result = runner.invoke(configure, catch_exceptions=False, args=["--skip", "foo"])
+		assert result.exit_code == 1
+		assert result.stderr.startswith("Unknown transform 'foo'.")
+
+
+def test_minimal_excludes() -> None:
+	paths = ["build/lib/pkg", "build", "build/lib", "./venv/", "docs/build", "docs//build/html", "buildx", '']
+	assert minimal_excludes(paths) == ["build", "buildx", "docs/build", "venv"]
+
+	paths = ["foo.egg-info", "src/foo.egg-info/bar", "src/foo", ".tox"]
+	assert minimal_excludes(paths, ["*.egg-info", ".tox"]) == ["src/foo"]
+
+
+@pytest.mark.usefixtures("tmp_project", "fake_iml")
+def test_exclude_patterns(tmp_pathplus: PathPlus) -> None:
+	module_file = tmp_pathplus / ".idea" / "repo_helper_demo.iml"
+	module_file.write_text(
+			module_file.read_text().replace(
+					'<excludeFolder url="file://$MODULE_DIR$/venv" />',
+					'<excludeFolder url="file://$MODULE_DIR$/build/lib" />'
+					'<excludeFolder url="file://$MODULE_DIR$/my_package.egg-info" />'
+					'<excludePattern pattern="*.log" />',
+					)
+			)
+
+	with in_directory(tmp_pathplus):
+		runner = CliRunner(mix_stderr=False)
+		result: Result = runner.invoke(
+				configure,
+				catch_exceptions=False,
+				args=["--only", "excludes", "--exclude-pattern", "*.egg-info"],
+				)
+		assert result.exit_code == 1
+
+	content = module_file.read_text()
+	assert "build/lib" not in content
+	assert "my_package.egg-info" not in content
+	assert content.count('<excludeFolder url="file://$MODULE_DIR$/build"/>') == 1
+	assert content.rindex("<excludeFolder") < content.index('<excludePattern pattern="*.egg-info"/>')
+	assert content.index('<excludePattern pattern="*.egg-info"/>') < content.index('<excludePattern pattern="*.log"/>')
@@ -0,0 +1,111 @@
+# stdlib
+import sys
+from typing import Iterator
+
+# 3rd party
+import pytest
+from consolekit.testing import CliRunner, Result
+from domdf_python_tools.paths import PathPlus, in_directory
+
+# this package
+from repo_helper_pycharm import watch
+from repo_helper_pycharm.iml_manager import ImlManager
+from repo_helper_pycharm.watch import Inotify, Watcher
+
+pytestmark = pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify is only available on Linux")
+
+
+def test_inotify(tmp_pathplus: PathPlus) -> None:
+	inotify = Inotify()
+
+	try:
+		wd = inotify.add_watch(tmp_pathplus)
+		assert inotify.read_events(0) == []
+
+		(tmp_pathplus / "file.txt").write_text("Hello World")
+		events = inotify.read_events(1)
+		assert [(e.wd, e.name) for e in events] == [(wd, "file.txt")]
+
+		with pytest.raises(FileNotFoundError):
+			inotify.add_watch(tmp_pathplus / "missing")
+
+	finally:
+		inotify.close()
+
+
+@pytest.fixture()
+def watcher(tmp_project: None, fake_iml: PathPlus, tmp_pathplus: PathPlus) -> Iterator[Watcher]:
+	watcher = Watcher([tmp_pathplus], debounce=0.05)
+	yield watcher
+	watcher.inotify.close()
+
+
+def test_watch_iml(watcher: Watcher, tmp_pathplus: PathPlus, iml_contents: str, capsys) -> None:
+	module_file = tmp_pathplus / ".idea" / "repo_helper_demo.iml"
+	module_file.write_text(iml_contents)
+	module_file.write_text(iml_contents)
+
+	changes = watcher.wait(1)
+	assert {filename for repo, filename in changes} == {"repo_helper_demo.iml"}
+
+	watcher.handle(changes)
+	assert capsys.readouterr().out == f"Updated {module_file}\n"
+	assert 'value="pytest"' in module_file.read_text()
+
+	# The file written by the watcher triggers one more check, which changes nothing.
+	watcher.handle(watcher.wait(1))
+	assert not capsys.readouterr().out
+	assert watcher.wait(0) == set()
+
+
+def test_watch_config(watcher: Watcher, tmp_pathplus: PathPlus, capsys) -> None:
+	ImlManager(tmp_pathplus).run()
+	watcher.wait(1)
+	module_file = tmp_pathplus / ".idea" / "repo_helper_demo.iml"
+
+	(tmp_pathplus / "repo_helper.yml").append_text("docs_dir: docs\n")
+	changes = watcher.wait(1)
+	assert {filename for repo, filename in changes} == {"repo_helper.yml"}
+
+	watcher.handle(changes)
+	assert capsys.readouterr().out == f"Updated {module_file}\n"
+	assert 'url="file://$MODULE_DIR$/docs/build"' in module_file.read_text()
+
+
+def test_watch_schema(watcher: Watcher, tmp_pathplus: PathPlus, capsys) -> None:
+	(tmp_pathplus / ".idea" / "jsonSchemas.xml").write_text(
+			'<?xml version="1.0" encoding="UTF-8"?>\n<project version="4">\n'
+			'  <component name="JsonSchemaMappingsProjectConfiguration">\n'
+			"    <state>\n      <map />\n    </state>\n  </component>\n</project>\n"
+			)
+
+	changes = watcher.wait(1)
+	assert {filename for repo, filename in changes} == {"jsonSchemas.xml"}
+
+	watcher.handle(changes)
+	assert "repo_helper_schema" in (tmp_pathplus / ".idea" / "jsonSchemas.xml").read_text()
+
+
+def test_watch_schema_mappings(watcher: Watcher, tmp_pathplus: PathPlus) -> None:
+	(tmp_pathplus / "pycharm_schemas.yml").write_lines([
+			"- name: tox_ini",
+			"  schema: schemas/tox.json",
+			"  patterns: tox.ini",
+			])
+
+	changes = watcher.wait(1)
+	assert {filename for repo, filename in changes} == {"pycharm_schemas.yml"}
+
+	watcher.handle(changes)
+	content = (tmp_pathplus / ".idea" / "jsonSchemas.xml").read_text()
+	assert '<entry key="tox_ini">' in content
+	assert 'value="schemas/tox.json"' in content
+
+
+@pytest.mark.usefixtures("tmp_project")
+def test_watch_not_project(tmp_pathplus: PathPlus) -> None:
+	with in_directory(tmp_pathplus):
+		runner = CliRunner(mix_stderr=False)
+		result: Result = runner.invoke(watch, catch_exceptions=False)
+		assert result.exit_code == 1
+		assert result.stderr.startswith("[Errno 2] No such file or directory: ")
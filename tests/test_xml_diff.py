@@ -0,0 +1,153 @@
+# stdlib
+import json
+
+# 3rd party
+import click  # type: ignore[import-untyped]
+import pytest
+from consolekit.testing import CliRunner, Result
+from domdf_python_tools.paths import PathPlus, in_directory
+from lxml import objectify  # type: ignore[import-untyped]
+
+# this package
+from repo_helper_pycharm import configure
+from repo_helper_pycharm.iml_manager import ImlManager
+from repo_helper_pycharm.xml_diff import StructuralChange, changes_to_json, diff_components, format_changes
+
+module_file = PathPlus("/project/.idea/demo.iml")
+
+
+def test_diff_components() -> None:
+	old = objectify.fromstring(
+			'<component name="Demo">'
+			'<option name="first" value="1"/>'
+			'<option name="second" value="2"/>'
+			'<content url="file://$MODULE_DIR$"><excludeFolder url="file://$MODULE_DIR$/venv"/></content>'
+			"<list><item value='a'/><item value='a'/></list>"
+			"</component>"
+			)
+	new = objectify.fromstring(
+			'<component name="Demo" extra="yes">'
+			'<option name="first" value="one"/>'
+			'<content url="file://$MODULE_DIR$"><excludeFolder url="file://$MODULE_DIR$/build"/></content>'
+			"<list><item value='a'/></list>"
+			"</component>"
+			)
+
+	assert diff_components(module_file, old, new) == [
+			StructuralChange(module_file, "Demo", "changed", '', "extra", None, "yes"),
+			StructuralChange(module_file, "Demo", "removed", "option[name=second]"),
+			StructuralChange(module_file, "Demo", "changed", "option[name=first]", "value", '1', "one"),
+			StructuralChange(
+					module_file,
+					"Demo",
+					"removed",
+					"content[url=file://$MODULE_DIR$]/excludeFolder[url=file://$MODULE_DIR$/venv]",
+					),
+			StructuralChange(
+					module_file,
+					"Demo",
+					"added",
+					"content[url=file://$MODULE_DIR$]/excludeFolder[url=file://$MODULE_DIR$/build]",
+					),
+			StructuralChange(module_file, "Demo", "removed", "list/item[value=a]"),
+			]
+
+	assert diff_components(module_file, old, old) == []
+	assert diff_components(module_file, old, None) == [StructuralChange(module_file, "Demo", "removed", '')]
+
+
+def test_format_changes() -> None:
+	changes = [
+			StructuralChange(module_file, "Demo", "changed", "option[name=first]", "value", '1', "one"),
+			StructuralChange(module_file, "Other", "removed", ''),
+			]
+
+	assert click.unstyle(format_changes(changes, PathPlus("/project"))) == (
+			".idea/demo.iml\n"
+			"  Demo: changed option[name=first] value: '1' -> 'one'\n"
+			"  Other: removed\n"
+			)
+
+	assert changes_to_json(changes[1:]) == [{
+			"module": "/project/.idea/demo.iml",
+			"component": "Other",
+			"change": "removed",
+			"path": '',
+			"attribute": None,
+			"old": None,
+			"new": None,
+			}]
+
+
+class TestStructuralDiff:
+
+	@pytest.mark.parametrize("stream", [False, True])
+	@pytest.mark.usefixtures("tmp_project", "fake_iml")
+	def test_update(self, tmp_pathplus: PathPlus, stream: bool) -> None:
+		iml_file = tmp_pathplus / ".idea" / "repo_helper_demo.iml"
+
+		manager = ImlManager(tmp_pathplus)
+		changed_files, diff = manager.update(show_diff=True, stream=stream, structural=True)
+		assert changed_files == [iml_file]
+
+		changes = manager.structural_changes
+		assert {change.module_file for change in changes} == {iml_file}
+		assert StructuralChange(iml_file, "PyDocumentationSettings", "removed", '') in changes
+		assert StructuralChange(
+				iml_file,
+				"TestRunnerService",
+				"changed",
+				"option[name=PROJECT_TEST_RUNNER]",
+				"value",
+				"nose",
+				"pytest",
+				) in changes
+		assert StructuralChange(
+				iml_file,
+				"NewModuleRootManager",
+				"added",
+				"content[url=file://$MODULE_DIR$]/excludeFolder[url=file://$MODULE_DIR$/doc-source/build]",
+				) in changes
+
+		diff = click.unstyle(diff)
+		assert diff.startswith(".idea/repo_helper_demo.iml\n  NewModuleRootManager: added ")
+		assert "  TestRunnerService: changed option[name=PROJECT_TEST_RUNNER] value: 'nose' -> 'pytest'\n" in diff
+
+		manager = ImlManager(tmp_pathplus)
+		assert manager.update(show_diff=True, stream=stream, structural=True) == ([], '')
+		assert manager.structural_changes == []
+
+	@pytest.mark.usefixtures("tmp_project", "fake_iml")
+	def test_command(self, tmp_pathplus: PathPlus) -> None:
+		original = (tmp_pathplus / ".idea" / "repo_helper_demo.iml").read_text()
+
+		with in_directory(tmp_pathplus):
+			runner = CliRunner(mix_stderr=False)
+
+			result: Result = runner.invoke(configure, args=["--structural-diff", "--format", "json"])
+			assert result.exit_code == 1
+			output = json.loads(result.stdout)
+			assert output["changed"]
+			assert {
+					"module": ".idea/repo_helper_demo.iml",
+					"component": "PyDocumentationSettings",
+					"change": "removed",
+					"path": '',
+					"attribute": None,
+					"old": None,
+					"new": None,
+					} in output["changes"]
+
+			result = runner.invoke(configure, args=["--structural-diff", "--format", "json"])
+			assert result.exit_code == 0
+			assert json.loads(result.stdout) == {"changed": False, "changes": []}
+
+			(tmp_pathplus / ".idea" / "repo_helper_demo.iml").write_text(original)
+			result = runner.invoke(configure, args=["--structural-diff", "--no-cache"])
+			assert result.exit_code == 1
+			assert result.stdout.startswith(".idea/repo_helper_demo.iml\n")
+			assert "  PyDocumentationSettings: removed\n" in result.stdout
+
+			result = runner.invoke(configure, args=["--structural-diff", "--recursive"])
+			assert result.exit_code == 2
+			assert "'--structural-diff' cannot be used with '--recursive'" in result.stderr